@@ -7,10 +7,18 @@ from fastapi.exception_handlers import http_exception_handler
 from routers.learning_router import router as learning_router
 from routers.detection_router import router as detection_router
 from routers.mqtt_router import router as mqtt_router
+from routers.model_router import router as model_router
 from routers import rtsp_router, html_router
+from routers.event_router import router as event_router
+from routers.metrics_router import router as metrics_router
 from services.face_detection_service import startup_event
 from services.rtsp_service import rtsp_service
 from services.streaming_service import streaming_service
+from services.event_store import event_store
+from services.alert_service import alert_dispatcher
+from services.mqtt_outbox import mqtt_outbox
+from services.remote_recognition_service import remote_recognizer
+from services.dashboard_push_service import dashboard_hub
 from mqtt_handler import mqtt
 import uvicorn
 import logging
@@ -42,6 +50,12 @@ async def startup():
     
         await startup_event()
         streaming_service.set_rtsp_service(rtsp_service)
+        dashboard_hub.set_rtsp_service(rtsp_service)
+        dashboard_hub.start()
+        event_store.start()
+        alert_dispatcher.start()
+        mqtt_outbox.start(mqtt)
+        remote_recognizer.start(mqtt)
 
         if not os.path.exists(STATIC_DIR):
             logger.warning(f"정적 파일 디렉토리가 없음: {STATIC_DIR}")
@@ -64,6 +78,12 @@ async def shutdown():
             logger.info("RTSP 서비스가 초기화되지 않음.")
         except Exception as e:
             logger.error(f"RTSP 서비스 종료 오류: {e}")
+
+        # 대기 중인 알림 발행 및 감지 이벤트 기록
+        await dashboard_hub.stop()
+        await alert_dispatcher.stop()
+        await mqtt_outbox.stop()
+        event_store.stop()
         
         logger.info("애플리케이션이 종료되었습니다.")
     except Exception as e:
@@ -75,6 +95,9 @@ app.include_router(detection_router)
 app.include_router(rtsp_router.router)
 app.include_router(html_router.router)
 app.include_router(mqtt_router)
+app.include_router(model_router)
+app.include_router(event_router)
+app.include_router(metrics_router)
 
 mqtt.init_app(app)
 
@@ -1,14 +1,270 @@
+"""
+MQTT 알림 경로 지연/처리량 측정 도구
+
+sensors/motion_face_detection을 구독하여 페이로드의 시각으로 구간별 지연을 계산하고
+주기적으로 백분위수, 처리량, 메시지 간 공백을 출력합니다. 종료(Ctrl+C) 시 전체 요약을 출력합니다.
+    - 종단 간: 프레임 캡처(captured_at_ms / cap) → 수신
+      (묶음 요약(coalesced / co) 메시지는 설계상 묶음 창만큼 늦게 발행되므로 따로 집계하고 SLA에서 제외)
+    - 파이프라인: 프레임 캡처 → 발행 대기열 추가(published_at_ms / ts)
+    - 전달: 발행 대기열 추가 → 수신 (스풀 배출 + 브로커)
+서버와 같은 시계를 써야 정확하므로 로컬 브로커/같은 호스트에서 측정하세요.
+
+--load를 주면 /mqtt/direct_motion_face_publish를 지정한 속도로 호출하면서 같은 프로세스에서 측정합니다.
+부하 요청은 captured_at_ms에 요청 시각을 넣으므로 종단 간 지연은 HTTP 요청 → 수신 시간이 됩니다.
+
+사용 예:
+    python mqtt/mqtt_monitor.py
+    python mqtt/mqtt_monitor.py --interval 5 --sla-ms 1000 --csv latency.csv
+    python mqtt/mqtt_monitor.py --load --rate 50 --duration 60 --concurrency 8
+"""
+import csv
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import paho.mqtt.client as mqtt
+import requests
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+TOPIC = "sensors/motion_face_detection"
+
+def decode(payload: bytes) -> dict:
+    """JSON, MessagePack, CBOR 페이로드 자동 판별"""
+    if payload[:1] in (b"{", b"["):
+        return json.loads(payload)
+    if msgpack is not None and (0x80 <= payload[0] <= 0x8f or payload[0] in (0xde, 0xdf)):
+        return msgpack.unpackb(payload, raw=False)
+    if cbor2 is not None and 0xa0 <= payload[0] <= 0xbb:
+        return cbor2.loads(payload)
+    raise ValueError("알 수 없는 페이로드 형식 (msgpack/cbor2 설치 필요 여부 확인)")
+
+def timestamps(data: dict):
+    """(캡처 시각, 발행 시각) epoch ms. 기존 JSON 형식과 압축 스키마 모두 지원"""
+    if "v" in data:
+        return data.get("cap"), data.get("ts")
+    return data.get("captured_at_ms"), data.get("published_at_ms")
+
+def percentile(sorted_values, q: float):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class LatencyStats:
+    """수신 메시지 지연 누적 (구간 통계와 전체 통계)"""
+
+    def __init__(self, sla_ms: float, gap_sec: float, csv_path: str = None):
+        self.sla_ms = sla_ms
+        self.gap_sec = gap_sec
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.total = self._empty()
+        self.window = self._empty()
+        self.last_received = None
+        self.csv_file = open(csv_path, "w", newline="") if csv_path else None
+        self.csv = csv.writer(self.csv_file) if self.csv_file else None
+        if self.csv:
+            self.csv.writerow(["received_ms", "location", "captured_ms", "published_ms",
+                               "end_to_end_ms", "pipeline_ms", "delivery_ms", "coalesced"])
+
+    @staticmethod
+    def _empty():
+        return {"count": 0, "errors": 0, "e2e": [], "pipeline": [], "delivery": [], "coalesced": [],
+                "max_gap": 0.0, "gaps": 0, "since": time.time()}
+
+    def record(self, payload: bytes):
+        received_ms = time.time() * 1000
+        try:
+            data = decode(payload)
+        except Exception:
+            with self.lock:
+                self.window["errors"] += 1
+                self.total["errors"] += 1
+            return
+        captured_ms, published_ms = timestamps(data)
+        e2e = received_ms - captured_ms if captured_ms else None
+        coalesced = bool(data.get("coalesced", data.get("co")))
+        pipeline = published_ms - captured_ms if captured_ms and published_ms else None
+        delivery = received_ms - published_ms if published_ms else None
+
+        with self.lock:
+            gap = (received_ms / 1000 - self.last_received) if self.last_received else 0.0
+            self.last_received = received_ms / 1000
+            for bucket in (self.window, self.total):
+                bucket["count"] += 1
+                bucket["max_gap"] = max(bucket["max_gap"], gap)
+                if gap > self.gap_sec:
+                    bucket["gaps"] += 1
+                if coalesced:
+                    # 묶음 요약은 캡처 시각이 창의 첫 감지이므로 종단 간/파이프라인 지연에 섞지 않음
+                    samples = (("coalesced", e2e), ("delivery", delivery))
+                else:
+                    samples = (("e2e", e2e), ("pipeline", pipeline), ("delivery", delivery))
+                for key, value in samples:
+                    if value is not None:
+                        bucket[key].append(value)
+            if self.csv:
+                self.csv.writerow([int(received_ms), data.get("location", data.get("cam")), captured_ms,
+                                   published_ms, e2e, pipeline, delivery,
+                                   data.get("coalesced", data.get("co"))])
+
+    def snapshot(self, reset: bool = True) -> dict:
+        with self.lock:
+            bucket = self.window if reset else self.total
+            if reset:
+                self.window = self._empty()
+        elapsed = max(time.time() - bucket["since"], 1e-9)
+        summary = {"count": bucket["count"], "rate": bucket["count"] / elapsed, "errors": bucket["errors"],
+                   "max_gap": bucket["max_gap"], "gaps": bucket["gaps"]}
+        for key in ("e2e", "pipeline", "delivery", "coalesced"):
+            values = sorted(bucket[key])
+            summary[key] = {q: percentile(values, q) for q in (50, 90, 99)}
+            summary[key]["max"] = values[-1] if values else None
+        e2e = bucket["e2e"]
+        summary["sla_violations"] = sum(1 for v in e2e if v > self.sla_ms)
+        summary["sla_ratio"] = (1 - summary["sla_violations"] / len(e2e)) if e2e else None
+        return summary
+
+    def close(self):
+        if self.csv_file:
+            self.csv_file.close()
+
+def fmt(value):
+    return "-" if value is None else f"{value:7.1f}"
+
+def print_summary(title: str, s: dict, sla_ms: float):
+    print(f"[{title}] {s['count']}건 {s['rate']:.1f}건/s, 디코딩 오류 {s['errors']}, "
+          f"최대 공백 {s['max_gap']:.2f}s (공백 {s['gaps']}회)")
+    for key, label in (("e2e", "종단 간"), ("pipeline", "파이프라인"), ("delivery", "전달"), ("coalesced", "묶음 요약")):
+        p = s[key]
+        if key == "coalesced" and p["max"] is None:
+            continue
+        print(f"    {label:<6} p50 {fmt(p[50])}  p90 {fmt(p[90])}  p99 {fmt(p[99])}  max {fmt(p['max'])} ms")
+    if s["sla_ratio"] is not None:
+        print(f"    SLA {sla_ms:.0f} ms 이내: {s['sla_ratio'] * 100:.2f}% (초과 {s['sla_violations']}건)")
+
+class LoadGenerator:
+    """/mqtt/direct_motion_face_publish를 일정한 속도로 호출 (요청 시각을 captured_at_ms로 전달)"""
+
+    def __init__(self, url: str, rate: float, duration: float, concurrency: int, cameras: int):
+        self.url = url.rstrip("/") + "/mqtt/direct_motion_face_publish"
+        self.rate = rate
+        self.duration = duration
+        self.cameras = cameras
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.session = requests.Session()
+        self.stats = {"sent": 0, "ok": 0, "failed": 0, "http_ms": []}
+        self.lock = threading.Lock()
+
+    def _send(self, i: int):
+        started = time.time()
+        try:
+            response = self.session.post(self.url, params={
+                "location": f"loadgen-{i % self.cameras}",
+                "person_detected": True,
+                "confidence": 0.9,
+                "captured_at_ms": int(started * 1000)
+            }, timeout=10)
+            ok = response.ok and response.json().get("result", False)
+        except Exception:
+            ok = False
+        with self.lock:
+            self.stats["ok" if ok else "failed"] += 1
+            self.stats["http_ms"].append((time.time() - started) * 1000)
+
+    def run(self):
+        """일정 간격으로 요청을 예약 (느린 응답이 다음 요청을 늦추지 않도록 스레드 풀 사용)"""
+        started = time.time()
+        i = 0
+        while time.time() - started < self.duration:
+            target = started + i / self.rate
+            delay = target - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            self.pool.submit(self._send, i)
+            self.stats["sent"] += 1
+            i += 1
+        self.pool.shutdown(wait=True)
+
+    def summary(self) -> str:
+        http = sorted(self.stats["http_ms"])
+        return (f"[부하] 요청 {self.stats['sent']}건 (성공 {self.stats['ok']}, 실패 {self.stats['failed']}), "
+                f"HTTP p50 {fmt(percentile(http, 50))} ms, p99 {fmt(percentile(http, 99))} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="MQTT 알림 경로 지연/처리량 측정")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--topic", default=TOPIC)
+    parser.add_argument("--interval", type=float, default=5.0, help="구간 통계 출력 주기(초)")
+    parser.add_argument("--sla-ms", type=float, default=1000.0, help="종단 간 지연 목표(ms)")
+    parser.add_argument("--gap-sec", type=float, default=5.0, help="이 시간 이상 수신이 없으면 공백으로 집계")
+    parser.add_argument("--csv", default=None, help="메시지별 지연을 기록할 CSV 경로")
+    parser.add_argument("--verbose", action="store_true", help="수신 메시지 출력")
+    parser.add_argument("--load", action="store_true", help="부하 생성 모드")
+    parser.add_argument("--url", default="http://localhost:8000", help="부하 대상 서버 주소")
+    parser.add_argument("--rate", type=float, default=20.0, help="초당 요청 수")
+    parser.add_argument("--duration", type=float, default=30.0, help="부하 시간(초)")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수")
+    parser.add_argument("--cameras", type=int, default=4, help="부하 요청에 섞어 쓸 카메라(location) 수")
+    parser.add_argument("--drain-sec", type=float, default=5.0, help="부하 종료 후 남은 메시지를 기다릴 시간(초)")
+    args = parser.parse_args()
+
+    stats = LatencyStats(args.sla_ms, args.gap_sec, args.csv)
+
+    def on_connect(client, userdata, flags, reason_code, properties):
+        print("Connected with result code", reason_code)
+        client.subscribe(args.topic, qos=1)
+
+    def on_message(client, userdata, msg):
+        if args.verbose:
+            print(f"Received: {msg.topic} {msg.payload[:200]!r}")
+        stats.record(msg.payload)
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(args.host, args.port)
+    client.loop_start()
+
+    stop = threading.Event()
+
+    def reporter():
+        while not stop.wait(args.interval):
+            print_summary(time.strftime("%H:%M:%S"), stats.snapshot(), args.sla_ms)
 
-def on_connect(client, userdata, flags, reason_code, properties):
-    print("Connected with result code", reason_code)
-    client.subscribe("sensors/motion_face_detection")
+    threading.Thread(target=reporter, daemon=True).start()
 
-def on_message(client, userdata, msg):
-    print(f"Received: {msg.topic} {msg.payload.decode()}")
+    load = None
+    try:
+        if args.load:
+            load = LoadGenerator(args.url, args.rate, args.duration, args.concurrency, args.cameras)
+            load.run()
+            time.sleep(args.drain_sec)
+        else:
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        client.loop_stop()
+        client.disconnect()
+        stats.close()
+        print()
+        if load is not None:
+            print(load.summary())
+        print_summary("전체", stats.snapshot(reset=False), args.sla_ms)
 
-client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-client.on_connect = on_connect
-client.on_message = on_message
-client.connect("localhost", 1883)
-client.loop_forever()
+if __name__ == "__main__":
+    main()
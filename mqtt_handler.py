@@ -1,4 +1,6 @@
 from fastapi_mqtt import FastMQTT, MQTTConfig
+from services.mqtt_outbox import mqtt_outbox
+from services.remote_recognition_service import remote_recognizer
 
 mqtt_config = MQTTConfig()
 mqtt = FastMQTT(config=mqtt_config)
@@ -7,9 +9,21 @@ mqtt = FastMQTT(config=mqtt_config)
 def connect(client, flags, rc, properties):
     mqtt.client.subscribe("/mqtt")
     print("MQTT Connected")
+    # 연결되면 스풀에 쌓인 메시지 배출 시작
+    mqtt_outbox.set_connected(True)
+    # 분산 인식 모드면 워커 응답 토픽 구독 (재연결 시에도 다시 구독)
+    remote_recognizer.subscribe()
+
+@mqtt.on_disconnect()
+def disconnect(client, packet, exc=None):
+    print("MQTT Disconnected")
+    mqtt_outbox.set_connected(False)
 
 @mqtt.on_message()
 async def on_message(client, topic, payload, qos, properties):
+    if remote_recognizer.is_result_topic(topic):
+        remote_recognizer.handle_result(payload)
+        return
     print(f"Received: {topic}, {payload.decode()}")
 
 # 움직임 감지 핸들러 함수 추가
@@ -1,9 +1,20 @@
 from fastapi import APIRouter, File, UploadFile, HTTPException
-from services.face_detection_service import detect_and_recognize_faces
-from typing import List, Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor
+from services.face_detection_service import face_detection_service
+from services.upload_service import spool_upload, is_archive_junk, read_archive_member
+from core.config import settings
+from typing import List, Dict, Any, Optional, Tuple
+import time
+import zipfile
 
 router = APIRouter(prefix="/detection", tags=["Face Detection"])
 
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# 배치 요청의 이미지 디코딩용 스레드 풀 (cv2.imdecode는 GIL을 해제)
+_decode_pool = ThreadPoolExecutor(max_workers=settings.BATCH_DECODE_WORKERS, thread_name_prefix="batch-decode")
+
 @router.post("/detect", response_model=List[Dict[str, Any]])
 async def recognize_faces_endpoint(image: UploadFile = File(...)) -> List[Dict[str, Any]]:
     """
@@ -14,11 +25,122 @@ async def recognize_faces_endpoint(image: UploadFile = File(...)) -> List[Dict[s
     if content_type not in ["image/jpeg", "image/png"]:
         raise HTTPException(status_code=400, detail="지원하지 않는 이미지 타입입니다.")
     
-    image_bytes = await image.read()
+    upload = await spool_upload(image, settings.UPLOAD_MAX_IMAGE_BYTES)
     
     try:
-        faces = await detect_and_recognize_faces(image_bytes)
+        faces = await face_detection_service.detect_and_recognize_file(upload.path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"얼굴 인식 처리 중 오류가 발생했습니다: {e}")
+    finally:
+        upload.cleanup()
     
     return faces
+
+def _decode_item(item: Tuple[str, str, Optional[str]], archive: Optional[zipfile.ZipFile]):
+    """스풀 파일(해시 있음) 또는 zip 항목(해시 없음)에서 이미지 디코딩"""
+    _, source, sha256 = item
+    if sha256 is None:
+        data = read_archive_member(archive, source, settings.UPLOAD_MAX_IMAGE_BYTES)
+        return face_detection_service.decode_image(data, settings.BATCH_MAX_IMAGE_SIDE)
+    return face_detection_service.decode_image_file(source, settings.BATCH_MAX_IMAGE_SIDE)
+
+def _process_batch(items: List[Tuple[str, str, Optional[str]]], archive: Optional[zipfile.ZipFile]) -> Dict[str, Any]:
+    """병렬 디코딩 후 배치 인식 (스레드 풀에서 실행)
+
+    items: (파일명, 스풀 파일 경로 또는 zip 항목 이름, sha256). 같은 해시의 업로드는 한 번만 처리합니다.
+    """
+    start = time.perf_counter()
+    first_index: Dict[str, int] = {}
+    unique: List[int] = []
+    for i, (_, _, sha256) in enumerate(items):
+        if sha256 is None or sha256 not in first_index:
+            if sha256 is not None:
+                first_index[sha256] = i
+            unique.append(i)
+
+    decoded = dict(zip(unique, _decode_pool.map(lambda i: _decode_item(items[i], archive), unique)))
+    decode_ms = (time.perf_counter() - start) * 1000
+
+    face_results, timing = face_detection_service.recognize_batch([decoded[i][0] for i in unique])
+    faces_by_index = dict(zip(unique, face_results))
+
+    results = []
+    for i, (filename, _, sha256) in enumerate(items):
+        source = i if i in decoded else first_index[sha256]
+        image, factor = decoded[source]
+        if image is None:
+            results.append({"filename": filename, "error": "이미지 디코딩 실패", "faces": []})
+            continue
+        # 축소 디코딩한 경우 박스를 원본 좌표로 복원
+        faces = [dict(face, box=[int(v * factor) for v in face["box"]]) for face in faces_by_index[source]]
+        result = {
+            "filename": filename,
+            "faces": faces,
+            "total_detected": len(faces),
+            "known_detected": sum(1 for f in faces if f["is_known"]),
+            "decode_scale": round(factor, 4)
+        }
+        if sha256 is not None:
+            result["sha256"] = sha256
+            result["duplicate_of"] = items[source][0] if source != i else None
+        results.append(result)
+
+    timing["decode_ms"] = decode_ms
+    timing["total_ms"] = (time.perf_counter() - start) * 1000
+    return {"results": results, "total_images": len(items), "timing": timing}
+
+@router.post("/detect_batch")
+async def recognize_faces_batch_endpoint(
+    images: Optional[List[UploadFile]] = File(None),
+    archive: Optional[UploadFile] = File(None)
+) -> Dict[str, Any]:
+    """
+    배치 얼굴 인식 API 엔드포인트
+    - images: 여러 이미지 파일 (multipart)
+    - archive: 이미지가 담긴 zip 파일
+    """
+    # 업로드는 모두 청크 단위로 디스크에 스풀하고 디코딩 시점에 파일에서 읽음
+    uploads = []
+    zf = None
+    try:
+        if len(images or []) > settings.BATCH_MAX_IMAGES:
+            raise HTTPException(status_code=413, detail=f"한 번에 최대 {settings.BATCH_MAX_IMAGES}장까지 처리할 수 있습니다.")
+        items: List[Tuple[str, str, Optional[str]]] = []
+        for image in images or []:
+            upload = await spool_upload(image, settings.UPLOAD_MAX_IMAGE_BYTES)
+            uploads.append(upload)
+            items.append((image.filename, upload.path, upload.sha256))
+
+        if archive is not None:
+            upload = await spool_upload(archive, settings.UPLOAD_MAX_ARCHIVE_BYTES, suffix=".zip")
+            uploads.append(upload)
+            try:
+                zf = zipfile.ZipFile(upload.path)
+                uncompressed = 0
+                for info in zf.infolist():
+                    if info.is_dir() or is_archive_junk(info.filename) or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                        continue
+                    # 압축을 풀기 전에 헤더의 크기로 zip 폭탄 거부
+                    uncompressed += info.file_size
+                    if info.file_size > settings.UPLOAD_MAX_IMAGE_BYTES:
+                        raise HTTPException(status_code=413, detail=f"zip 항목 크기 제한을 초과했습니다: {info.filename}")
+                    if uncompressed > settings.UPLOAD_MAX_ARCHIVE_UNCOMPRESSED_BYTES:
+                        raise HTTPException(status_code=413, detail="zip 압축 해제 크기 제한을 초과했습니다.")
+                    items.append((info.filename, info.filename, None))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail="잘못된 zip 파일입니다.")
+
+        if not items:
+            raise HTTPException(status_code=400, detail="이미지가 없습니다.")
+        if len(items) > settings.BATCH_MAX_IMAGES:
+            raise HTTPException(status_code=413, detail=f"한 번에 최대 {settings.BATCH_MAX_IMAGES}장까지 처리할 수 있습니다.")
+
+        try:
+            return await run_in_threadpool(_process_batch, items, zf)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"배치 얼굴 인식 처리 중 오류가 발생했습니다: {e}")
+    finally:
+        if zf is not None:
+            zf.close()
+        for upload in uploads:
+            upload.cleanup()
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from core.config import settings
+from services.event_store import event_store
+from services.face_history_store import face_history_store
+from services.face_detection_service import face_detection_service
+from services.upload_service import spool_upload
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+def _epoch(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value is not None else None
+
+@router.get("")
+async def list_events(
+    camera_id: Optional[str] = None,
+    person: Optional[str] = Query(None, description="인물 이름 또는 미등록 얼굴의 클러스터 ID"),
+    start: Optional[datetime] = Query(None, description="시작 시각 (ISO 8601 또는 epoch 초)"),
+    end: Optional[datetime] = Query(None, description="종료 시각 (미포함)"),
+    known: Optional[bool] = None,
+    cursor: Optional[int] = Query(None, description="이전 응답의 next_cursor"),
+    limit: Optional[int] = Query(None, ge=1)
+):
+    """감지 이벤트 최신순 조회 (예: 특정 인물의 기간 내 이벤트)"""
+    return await run_in_threadpool(
+        event_store.query, camera_id=camera_id, identity=person, start=_epoch(start), end=_epoch(end),
+        known=known, cursor=cursor, limit=limit
+    )
+
+@router.get("/summary")
+async def event_summary(camera_id: Optional[str] = None, start: Optional[datetime] = None,
+                        end: Optional[datetime] = None):
+    """기간 내 인물별 감지 횟수, 처음/마지막 감지 시각"""
+    people = await run_in_threadpool(
+        event_store.identity_summary, start=_epoch(start), end=_epoch(end), camera_id=camera_id
+    )
+    return {"people": people}
+
+@router.get("/stats")
+async def event_store_stats():
+    return {**event_store.get_statistics(), "face_history": face_history_store.get_statistics()}
+
+def _search_by_photo(path: str, start: Optional[float], end: Optional[float], camera_id: Optional[str],
+                     threshold: Optional[float], limit: int) -> Dict[str, Any]:
+    image, _ = face_detection_service.decode_image_file(path, settings.BATCH_MAX_IMAGE_SIDE)
+    if image is None:
+        raise HTTPException(status_code=400, detail="이미지 디코딩 실패")
+    faces = face_detection_service.extract_face_embeddings(image)
+    if not faces:
+        raise HTTPException(status_code=422, detail="사진에서 얼굴을 찾을 수 없습니다.")
+    # 여러 얼굴이 있으면 탐지 점수가 가장 높은 얼굴로 검색
+    query = max(faces, key=lambda f: f["det_score"])["embedding"]
+
+    hits = face_history_store.search(query, start=start, end=end, threshold=threshold,
+                                     limit=limit, camera_id=camera_id)
+    events = event_store.get_many([hit["event_id"] for hit in hits])
+    matches = []
+    for hit in hits:
+        event = events.get(hit["event_id"])
+        if event is None:
+            continue
+        event_faces = event.get("faces") or []
+        face = event_faces[hit["face_index"]] if hit["face_index"] < len(event_faces) else None
+        matches.append({**hit, "face": face, "timestamp": event.get("timestamp")})
+    return {"matches": matches, "count": len(matches), "search_ms": face_history_store.stats["last_search_ms"]}
+
+@router.post("/search_face")
+async def search_face(
+    image: UploadFile = File(...),
+    start: Optional[datetime] = Form(None),
+    end: Optional[datetime] = Form(None),
+    camera_id: Optional[str] = Form(None),
+    threshold: Optional[float] = Form(None),
+    limit: int = Form(settings.FACE_HISTORY_SEARCH_LIMIT)
+):
+    """사진 속 얼굴과 유사한 과거 감지 이벤트를 유사도 순으로 검색 (기간/카메라 지정 가능)"""
+    upload = await spool_upload(image, settings.UPLOAD_MAX_IMAGE_BYTES)
+    try:
+        return await run_in_threadpool(
+            _search_by_photo, upload.path, _epoch(start), _epoch(end), camera_id, threshold,
+            max(1, min(limit, settings.EVENT_STORE_MAX_PAGE_SIZE))
+        )
+    finally:
+        upload.cleanup()
+
+@router.get("/{event_id}")
+async def get_event(event_id: int):
+    event = await run_in_threadpool(event_store.get, event_id)
+    if event is None:
+        raise HTTPException(status_code=404, detail="이벤트를 찾을 수 없습니다.")
+    return event
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from fastapi.responses import HTMLResponse
-import cv2
-import tempfile
 import os
 import logging
-from services.face_detection_service import detect_and_recognize_faces, face_detection_service
+from core.config import settings
+from services.face_detection_service import face_detection_service
+from services.upload_service import spool_upload
+from services.enrollment_job_service import enrollment_job_manager
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["HTML Pages"])
@@ -33,8 +34,11 @@ async def recoding_page():
 @router.post("/detect")
 async def detect_faces(image: UploadFile = File(...)):
     try:
-        image_bytes = await image.read()
-        results = await detect_and_recognize_faces(image_bytes)
+        upload = await spool_upload(image, settings.UPLOAD_MAX_IMAGE_BYTES)
+        try:
+            results = await face_detection_service.detect_and_recognize_file(upload.path)
+        finally:
+            upload.cleanup()
         formatted = [{
             "name": res["name"],
             "confidence": res["confidence"],
@@ -46,6 +50,8 @@ async def detect_faces(image: UploadFile = File(...)):
             ]
         } for res in results]
         return formatted
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"얼굴 인식 오류: {str(e)}")
 
@@ -54,30 +60,18 @@ async def learn_from_video(
     personname: str = Form(...),
     videofile: UploadFile = File(...)
 ):
+    """구버전 영상 학습 경로 (/faces/learn_video와 같은 백그라운드 등록 작업 사용)"""
     try:
-        video_bytes = await videofile.read()
-        with tempfile.NamedTemporaryFile(delete=False) as tmp:
-            tmp.write(video_bytes)
-            tmp_path = tmp.name
-
-        cap = cv2.VideoCapture(tmp_path)
-        success_count = 0
-
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            if cap.get(cv2.CAP_PROP_POS_FRAMES) % 10 == 0:
-                success = await face_detection_service.add_known_face(frame, personname)
-                if success:
-                    success_count += 1
-
-        cap.release()
-        os.unlink(tmp_path)
-
-        if success_count > 0:
-            return {"message": f"{personname}님의 얼굴 {success_count}개 학습 완료"}
-        else:
-            raise HTTPException(400, "비디오에서 얼굴을 찾을 수 없음")
+        upload = await spool_upload(videofile, settings.UPLOAD_MAX_VIDEO_BYTES)
+        job, duplicate = enrollment_job_manager.submit_upload(personname, upload)
+        return {
+            "job_id": job.job_id,
+            "status": job.status,
+            "duplicate": duplicate,
+            "sha256": upload.sha256,
+            "message": "이미 등록된 영상입니다." if duplicate else f"{personname}님의 얼굴 학습 작업이 등록되었습니다."
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"비디오 처리 오류: {str(e)}")
@@ -1,6 +1,13 @@
+import zipfile
 from fastapi import APIRouter, Form, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
-from services.face_learning_service import learn_new_face_from_video
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from core.config import settings
+from services.enrollment_job_service import enrollment_job_manager
+from services.face_learning_service import safe_filename
+from services.gallery_service import activate_gallery_version, encode_crop, list_gallery_versions
+from services.unknown_cluster_service import unknown_clusterer
+from services.upload_service import spool_upload
 
 router = APIRouter(prefix="/faces", tags=["Face Learning"])
 
@@ -10,13 +17,121 @@ async def learn_face_video(
     video_file: UploadFile = File(...)
 ):
     try:
-        video_bytes = await video_file.read()
-        if not video_bytes:
-            raise HTTPException(status_code=400, detail="빈 영상 파일입니다.")
-
-        result = await learn_new_face_from_video(person_name, video_bytes)
-        return JSONResponse(content=result)
+        # 업로드를 청크 단위로 디스크에 기록 (메모리에 전체를 올리지 않음)
+        upload = await spool_upload(video_file, settings.UPLOAD_MAX_VIDEO_BYTES, suffix=".webm")
+        # 등록은 백그라운드 작업으로 처리하고 작업 ID만 반환 (스풀 파일은 작업 종료 시 삭제)
+        try:
+            job, duplicate = enrollment_job_manager.submit_upload(person_name, upload)
+        except Exception:
+            # 작업으로 넘기지 못한 스풀 파일은 여기서 삭제
+            upload.cleanup()
+            raise
+        return JSONResponse(status_code=202, content={
+            "job_id": job.job_id,
+            "status": job.status,
+            "duplicate": duplicate,
+            "sha256": upload.sha256,
+            "message": "이미 등록된 영상입니다." if duplicate else "학습 작업이 등록되었습니다."
+        })
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail=f"서버 처리 오류: {str(e)}")
+
+@router.get("/jobs")
+async def list_learning_jobs():
+    return {"jobs": enrollment_job_manager.list_jobs()}
+
+@router.get("/jobs/{job_id}")
+async def get_learning_job(job_id: str):
+    job = enrollment_job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job.to_dict()
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_learning_job(job_id: str):
+    job = enrollment_job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job.to_dict()
+
+@router.post("/bulk_enroll")
+async def bulk_enroll_faces(archive: UploadFile = File(...)):
+    """인물/사진 구조의 zip으로 여러 사람을 한 번에 등록 (백그라운드 작업, 진행 상황은 /faces/jobs/{job_id})"""
+    upload = await spool_upload(archive, settings.UPLOAD_MAX_ARCHIVE_BYTES, suffix=".zip")
+    if not zipfile.is_zipfile(upload.path):
+        upload.cleanup()
+        raise HTTPException(status_code=400, detail="잘못된 zip 파일입니다.")
+
+    try:
+        job = enrollment_job_manager.submit("*", upload.path, kind="bulk")
+    except Exception:
+        upload.cleanup()
+        raise
+    return JSONResponse(status_code=202, content={
+        "job_id": job.job_id,
+        "status": job.status,
+        "sha256": upload.sha256,
+        "message": "일괄 등록 작업이 등록되었습니다."
+    })
+
+@router.post("/gallery/rebuild")
+async def rebuild_gallery_version(profile: str = Form(...), activate: bool = Form(True), force: bool = Form(False)):
+    """저장된 얼굴 크롭을 새 모델 프로필로 재임베딩하여 새 갤러리 버전 생성 (백그라운드 작업)
+
+    크롭이 없거나 임베딩에 실패한 인물이 있으면 버전만 만들고 전환하지 않습니다 (force=true면 전환).
+    """
+    if profile not in settings.MODEL_PROFILES:
+        raise HTTPException(status_code=404, detail=f"알 수 없는 모델 프로필입니다: {profile}")
+
+    job = enrollment_job_manager.submit("*", None, kind="rebuild", options={"profile": profile, "activate": activate, "force": force})
+    return JSONResponse(status_code=202, content={
+        "job_id": job.job_id,
+        "status": job.status,
+        "message": "갤러리 재생성 작업이 등록되었습니다."
+    })
+
+@router.get("/gallery/versions")
+async def get_gallery_versions():
+    return {"versions": list_gallery_versions()}
+
+@router.post("/gallery/versions/{version}/activate")
+async def activate_version(version: str):
+    """갤러리 버전 전환 (이전 버전으로 되돌릴 때도 사용)"""
+    versions = {v["version"]: v for v in list_gallery_versions()}
+    if version not in versions:
+        raise HTTPException(status_code=404, detail="갤러리 버전을 찾을 수 없습니다.")
+    activate_gallery_version(version, versions[version].get("profile"))
+    return {"versions": list_gallery_versions()}
+
+@router.get("/unknown")
+async def list_unknown_clusters():
+    """최근 미등록 방문자 클러스터 목록 (최근에 본 순서)"""
+    return {"clusters": unknown_clusterer.list_clusters(), "statistics": unknown_clusterer.get_statistics()}
+
+@router.get("/unknown/{cluster_id}/thumbnail")
+async def unknown_cluster_thumbnail(cluster_id: str):
+    cluster = unknown_clusterer.get(cluster_id)
+    if cluster is None or cluster.thumbnail is None:
+        raise HTTPException(status_code=404, detail="클러스터 썸네일이 없습니다.")
+    return Response(content=encode_crop(cluster.thumbnail), media_type="image/jpeg")
+
+@router.post("/unknown/{cluster_id}/promote")
+async def promote_unknown_cluster(cluster_id: str, person_name: str = Form(...)):
+    """미등록 클러스터를 등록된 인물로 승격 (구성원 임베딩과 크롭을 갤러리에 추가)"""
+    person_name = safe_filename(person_name)
+    if not person_name:
+        raise HTTPException(status_code=400, detail="이름이 올바르지 않습니다.")
+    try:
+        return await run_in_threadpool(unknown_clusterer.promote, cluster_id, person_name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="클러스터를 찾을 수 없습니다.")
+
+@router.delete("/unknown/{cluster_id}")
+async def delete_unknown_cluster(cluster_id: str):
+    if unknown_clusterer.remove(cluster_id) is None:
+        raise HTTPException(status_code=404, detail="클러스터를 찾을 수 없습니다.")
+    return {"cluster_id": cluster_id, "deleted": True}
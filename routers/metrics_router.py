@@ -0,0 +1,12 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+from services.metrics_service import metrics, CONTENT_TYPE
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus 수집용 메트릭 (카메라별 fps, 단계별 지연 히스토그램, 큐 길이, 폐기 건수, 배치 크기, 모델/갤러리 상태)"""
+    if not metrics.enabled:
+        raise HTTPException(404, "메트릭이 비활성화되어 있습니다.")
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, HTTPException
+from services.model_registry import model_registry, INSIGHTFACE_AVAILABLE
+
+router = APIRouter(prefix="/models", tags=["Models"])
+
+@router.get("/status")
+async def model_status():
+    """모델 프로필별 로드 상태 및 참조 카운트"""
+    return {"insightface_available": INSIGHTFACE_AVAILABLE, "profiles": model_registry.get_status()}
+
+@router.post("/{profile}/warmup")
+async def warmup_model(profile: str):
+    try:
+        model_registry.get_profile(profile)
+        model_registry.warmup([profile])
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"모델 로드 오류: {str(e)}")
+    return {"profile": profile, "loaded": True}
+
+@router.post("/{profile}/unload")
+async def unload_model(profile: str, force: bool = False):
+    """메모리 확보를 위한 모델 해제 (사용 중이면 force 필요)"""
+    try:
+        model_registry.get_profile(profile)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    unloaded = model_registry.unload(profile, force=force)
+    if not unloaded and model_registry.is_loaded(profile):
+        raise HTTPException(status_code=409, detail="모델이 사용 중입니다. force=true로 강제 해제할 수 있습니다.")
+    return {"profile": profile, "unloaded": unloaded}
@@ -1,5 +1,11 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
 from services.mqtt_service import MQTTService
+from services.alert_service import alert_dispatcher
+from services.mqtt_outbox import mqtt_outbox
+from services.gallery_service import encode_crop
+from services.remote_recognition_service import remote_recognizer
 
 router = APIRouter(prefix="/mqtt", tags=["mqtt"])
 
@@ -38,15 +44,41 @@ async def test_motion_and_face_detection(
 async def direct_motion_face_publish(
     location: str = "living_room",
     person_detected: bool = True,
-    confidence: float = 0.95
+    confidence: float = 0.95,
+    captured_at_ms: Optional[int] = None
 ):
-    """직접 움직임 감지 + 얼굴 인식 MQTT 메시지 발행"""
+    """직접 움직임 감지 + 얼굴 인식 MQTT 메시지 발행 (captured_at_ms: 부하 생성기가 지연 측정용으로 넣는 시각)"""
     
     sensor_data = {
         "location": location,
         "person_detected": person_detected,
         "confidence": confidence
     }
+    if captured_at_ms is not None:
+        sensor_data["captured_at"] = captured_at_ms / 1000
     
     result = await MQTTService.publish_motion_and_face_detection(sensor_data)
     return result
+
+@router.get("/alerts/stats")
+async def alert_statistics():
+    """알림 단계 통계 (발행, 병합, 억제, 큐 초과로 버린 수)"""
+    return alert_dispatcher.get_statistics()
+
+@router.get("/alerts/thumbnails/{ref}")
+async def alert_thumbnail(ref: str):
+    """알림 페이로드의 썸네일 참조(thumbnail/th)가 가리키는 대표 얼굴 크롭"""
+    crop = alert_dispatcher.get_thumbnail(ref)
+    if crop is None:
+        raise HTTPException(status_code=404, detail="썸네일이 만료되었거나 없습니다.")
+    return Response(content=encode_crop(crop), media_type="image/jpeg")
+
+@router.get("/outbox")
+async def outbox_statistics():
+    """MQTT 발행 스풀 상태 (대기 중인 메시지 수/용량, 연결 상태, 배출 통계)"""
+    return mqtt_outbox.get_statistics()
+
+@router.get("/remote_recognition")
+async def remote_recognition_statistics():
+    """분산 인식 상태 (보낸/완료/시간 초과 작업 수, 평균 왕복 시간, 워커별 처리 수)"""
+    return remote_recognizer.get_statistics()
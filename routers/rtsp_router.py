@@ -1,5 +1,5 @@
 from typing import Optional, Dict, Any, List
-from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, Form, Request, Header
 from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
 import cv2
@@ -12,6 +12,9 @@ from services.rtsp_service import rtsp_service
 from services.streaming_service import streaming_service
 from services.face_detection_service import face_detection_service, detect_and_recognize_faces
 from services.mqtt_service import MQTTService
+from services.recognition_scheduler import recognition_scheduler
+from services.load_shedding_service import load_shedder
+from services.dashboard_push_service import dashboard_hub
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/rtsp", tags=["RTSP"])
@@ -21,6 +24,11 @@ class RTSPConfig(BaseModel):
     username: Optional[str] = None
     password: Optional[str] = None
 
+class SchedulerCameraConfig(BaseModel):
+    weight: Optional[float] = None
+    max_in_flight: Optional[int] = None
+    deadline_ms: Optional[float] = None
+
 class RTSPStatus(BaseModel):
     is_connected: bool
     is_streaming: bool
@@ -35,6 +43,7 @@ async def connect_rtsp(config: RTSPConfig):
         success = await rtsp_service.connect()
         if success:
             streaming_service.set_rtsp_service(rtsp_service)
+            dashboard_hub.notify_status()
             return {
                 "status": "connected",
                 "message": "RTSP 연결 성공",
@@ -50,6 +59,7 @@ async def start_streaming(background_tasks: BackgroundTasks):
         raise HTTPException(400, "RTSP 연결 필요")
     try:
         rtsp_service.start_streaming()
+        dashboard_hub.notify_status()
         return {"status": "started", "message": "스트리밍 시작"}
     except Exception as e:
         raise HTTPException(500, f"스트리밍 시작 오류: {str(e)}")
@@ -58,6 +68,7 @@ async def start_streaming(background_tasks: BackgroundTasks):
 async def stop_streaming():
     try:
         rtsp_service.stop_streaming()
+        dashboard_hub.notify_status()
         return {"status": "stopped", "message": "스트리밍 중지"}
     except Exception as e:
         raise HTTPException(500, f"스트리밍 중지 오류: {str(e)}")
@@ -72,6 +83,42 @@ async def get_status():
         rtsp_url=rtsp_service.rtsp_url
     )
 
+@router.get("/events")
+async def dashboard_events(request: Request, cameras: Optional[str] = None,
+                           last_event_id: Optional[str] = Header(None)):
+    """대시보드 실시간 푸시 (SSE): 새 감지(detection), 상태 변화(status), 스트림 통계(stats)
+
+    cameras=cam1,cam2로 받을 카메라를 제한합니다. 처음 연결하면 현재 상태와 최근 감지 목록을
+    snapshot으로 한 번 보내고, 재연결(Last-Event-ID)이면 그 이후 놓친 이벤트만 다시 보냅니다.
+    """
+    camera_filter = {c.strip() for c in cameras.split(",") if c.strip()} if cameras else None
+    resume_from = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    async def event_stream():
+        # 응답이 시작될 때 구독하고, 스냅샷 전송 중에 끊겨도 해제되도록 전체를 try/finally로 감쌈
+        subscriber = dashboard_hub.subscribe(camera_filter, resume_from)
+        try:
+            if resume_from is None:
+                detections = rtsp_service.get_latest_detections() if subscriber.wants(rtsp_service.camera_id) else []
+                yield dashboard_hub.format("snapshot", {
+                    "status": dashboard_hub.current_status(),
+                    "latest_detections": detections
+                })
+            async for message in dashboard_hub.stream(subscriber, request.is_disconnected):
+                yield message
+        finally:
+            dashboard_hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/events/stats")
+async def dashboard_event_statistics():
+    return dashboard_hub.get_statistics()
+
 @router.post("/manual-detect")
 async def manual_detect():
     sensor_data = {
@@ -116,6 +163,29 @@ async def video_stream():
 async def stream_status():
     return streaming_service.get_status()
 
+@router.get("/statistics")
+async def stream_statistics():
+    """스트림 및 인식 파이프라인 통계 (추적기, 베스트샷, 1차 필터 포함)"""
+    return rtsp_service.get_stream_statistics()
+
+@router.get("/scheduler")
+async def scheduler_statistics():
+    """카메라별 인식 대기 시간, 처리/폐기 건수"""
+    return recognition_scheduler.get_statistics()
+
+@router.post("/scheduler/{camera_id}")
+async def configure_scheduler(camera_id: str, config: SchedulerCameraConfig):
+    """카메라별 우선순위 가중치, 동시 실행 제한, 마감 시간(0 이하면 해제) 설정"""
+    recognition_scheduler.configure_camera(
+        camera_id, weight=config.weight, max_in_flight=config.max_in_flight, deadline_ms=config.deadline_ms
+    )
+    return recognition_scheduler.get_statistics()["cameras"][camera_id]
+
+@router.get("/load-shedding")
+async def load_shedding_status():
+    """부하 제어 단계, 단계별 지연 시간, 현재 적용 중인 저하 설정"""
+    return load_shedder.get_status()
+
 @router.get("/detections")
 async def get_detections():
     return {"detections": rtsp_service.get_latest_detections()}
@@ -123,5 +193,6 @@ async def get_detections():
 @router.post("/toggle-detection")
 async def toggle_detection():
     rtsp_service.detection_enabled = not rtsp_service.detection_enabled
+    dashboard_hub.notify_status()
     status = "활성화" if rtsp_service.detection_enabled else "비활성화"
     return {"status": status, "enabled": rtsp_service.detection_enabled}
@@ -0,0 +1,203 @@
+import time
+import asyncio
+import logging
+import itertools
+import threading
+import numpy as np
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+from core.config import settings
+from services.mqtt_service import MQTTService
+
+logger = logging.getLogger(__name__)
+
+# 얼굴 없이 움직임만 감지된 이벤트의 식별자
+MOTION_ONLY = "motion"
+
+class AlertWindow:
+    """(카메라, 식별자)별 병합 구간"""
+
+    def __init__(self, camera_id: str, identity: str, confidence: float, person_detected: bool, now: float,
+                 bbox: Optional[List[int]] = None, crop: Optional[np.ndarray] = None,
+                 captured_at: Optional[float] = None):
+        self.camera_id = camera_id
+        self.identity = identity
+        self.confidence = confidence
+        self.person_detected = person_detected
+        self.bbox = bbox
+        self.crop = crop
+        self.first_seen = now
+        self.last_seen = now
+        self.closes_at = now + settings.ALERT_COALESCE_WINDOW_SEC
+        self.merged = 0
+        # 발행을 일으킨 감지의 프레임 캡처 시각 (종단 간 지연 측정용)
+        self.captured_at = captured_at or now
+
+    def update(self, confidence: float, bbox: Optional[List[int]], crop: Optional[np.ndarray], now: float,
+               captured_at: float):
+        """병합: 가장 신뢰도가 높은 감지의 박스/크롭을 대표로 유지"""
+        self.merged += 1
+        self.last_seen = now
+        self.captured_at = captured_at
+        if confidence >= self.confidence:
+            self.confidence = confidence
+            self.bbox = bbox or self.bbox
+            self.crop = crop if crop is not None else self.crop
+
+class AlertDispatcher:
+    """인식 결과 알림 발행 단계
+
+    인식 경로는 submit()으로 이벤트를 메모리 큐에 넣기만 하고, 앱 이벤트 루프의 백그라운드 태스크가
+    큐를 비우면서 (카메라, 식별자)별로 처리합니다.
+    - 병합: 구간의 첫 이벤트는 바로 발행하고, ALERT_COALESCE_WINDOW_SEC 안의 후속 이벤트는 모아서
+      구간이 끝날 때 횟수와 함께 한 번만 발행
+    - 억제: 구간이 끝난 뒤 식별자별 억제 시간(ALERT_SUPPRESS_SEC, ALERT_SUPPRESS_OVERRIDES) 동안은 발행하지 않음
+    대표 얼굴 크롭은 최근 MQTT_THUMBNAIL_CACHE_SIZE개만 메모리에 두고 알림에는 참조 경로만 싣습니다.
+    """
+
+    def __init__(self):
+        self._inbox: deque = deque()
+        self._inbox_lock = threading.Lock()
+        self._windows: Dict[Tuple[str, str], AlertWindow] = {}
+        self._suppressed_until: Dict[Tuple[str, str], float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._thumbnails: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._thumbnail_ids = itertools.count(1)
+        self.stats = {"received": 0, "published": 0, "coalesced": 0, "suppressed": 0,
+                      "dropped": 0, "failed": 0}
+
+    def start(self):
+        """앱 이벤트 루프에서 발행 태스크 시작 (startup에서 호출)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """남은 이벤트와 열린 병합 구간을 모두 발행하고 종료"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._drain()
+        # 종료 시에는 열린 구간을 모두 닫아 병합된 이벤트를 발행
+        await self._close_windows(float("inf"))
+
+    def submit(self, camera_id: str, faces: List[Dict[str, Any]],
+               crops: Optional[List[Optional[np.ndarray]]] = None, captured_at: Optional[float] = None):
+        """인식 결과(와 얼굴별 정렬 크롭, 프레임 캡처 시각)를 알림 큐에 추가 (스레드 안전, 블로킹 없음)"""
+        now = time.time()
+        with self._inbox_lock:
+            if len(self._inbox) >= settings.ALERT_QUEUE_SIZE:
+                self.stats["dropped"] += 1
+                return
+            self._inbox.append((camera_id, faces, crops, captured_at or now, now))
+
+    @staticmethod
+    def _identities(faces: List[Dict[str, Any]], crops: Optional[List[Optional[np.ndarray]]]
+                    ) -> Dict[str, Tuple[float, Optional[List[int]], Optional[np.ndarray]]]:
+        """식별자별 최고 신뢰도 얼굴의 (신뢰도, 박스, 크롭) (미등록 얼굴은 클러스터 ID 사용)"""
+        identities: Dict[str, Tuple[float, Optional[List[int]], Optional[np.ndarray]]] = {}
+        for i, face in enumerate(faces):
+            identity = face.get("cluster_id") or face.get("name")
+            confidence = float(face.get("confidence", 0.0))
+            if identity not in identities or confidence > identities[identity][0]:
+                crop = crops[i] if crops and i < len(crops) else None
+                identities[identity] = (confidence, face.get("box"), crop)
+        return identities or {MOTION_ONLY: (0.0, None, None)}
+
+    def _suppress_sec(self, identity: str) -> float:
+        return settings.ALERT_SUPPRESS_OVERRIDES.get(identity, settings.ALERT_SUPPRESS_SEC)
+
+    async def _drain(self):
+        with self._inbox_lock:
+            events = list(self._inbox)
+            self._inbox.clear()
+
+        for camera_id, faces, crops, captured_at, received_at in events:
+            self.stats["received"] += 1
+            for identity, (confidence, bbox, crop) in self._identities(faces, crops).items():
+                key = (camera_id, identity)
+                window = self._windows.get(key)
+                if window is not None:
+                    window.update(confidence, bbox, crop, received_at, captured_at)
+                    self.stats["coalesced"] += 1
+                    continue
+                if received_at < self._suppressed_until.get(key, 0.0):
+                    self.stats["suppressed"] += 1
+                    continue
+                window = AlertWindow(camera_id, identity, confidence, identity != MOTION_ONLY, received_at,
+                                     bbox, crop, captured_at)
+                self._windows[key] = window
+                await self._publish(window, coalesced=False)
+
+    async def _close_windows(self, now: float):
+        for key, window in list(self._windows.items()):
+            if window.closes_at > now:
+                continue
+            del self._windows[key]
+            if window.merged:
+                await self._publish(window, coalesced=True)
+            suppress = self._suppress_sec(window.identity)
+            if suppress > 0:
+                self._suppressed_until[key] = now + suppress
+        # 만료된 억제 기록 정리
+        for key in [k for k, until in self._suppressed_until.items() if until <= now]:
+            del self._suppressed_until[key]
+
+    def _store_thumbnail(self, crop: Optional[np.ndarray]) -> Optional[str]:
+        """대표 크롭을 캐시에 넣고 참조 경로 반환 (JPEG 인코딩은 조회 시에만 수행)"""
+        if crop is None or not settings.MQTT_THUMBNAIL_REF:
+            return None
+        ref = f"{int(time.time() * 1000)}-{next(self._thumbnail_ids)}"
+        self._thumbnails[ref] = crop
+        while len(self._thumbnails) > settings.MQTT_THUMBNAIL_CACHE_SIZE:
+            self._thumbnails.popitem(last=False)
+        return f"/mqtt/alerts/thumbnails/{ref}"
+
+    def get_thumbnail(self, ref: str) -> Optional[np.ndarray]:
+        return self._thumbnails.get(ref)
+
+    async def _publish(self, window: AlertWindow, coalesced: bool):
+        result = await MQTTService.publish_motion_and_face_detection({
+            "location": window.camera_id,
+            "person_detected": window.person_detected,
+            "confidence": window.confidence,
+            "identities": [window.identity] if window.person_detected else [],
+            "identity": window.identity,
+            "event_count": window.merged + 1 if coalesced else 1,
+            "first_seen": window.first_seen,
+            "last_seen": window.last_seen,
+            "captured_at": window.captured_at,
+            "coalesced": coalesced,
+            "bboxes": [window.bbox] if window.bbox else [],
+            "thumbnail": self._store_thumbnail(window.crop)
+        })
+        self.stats["published" if result.get("result") else "failed"] += 1
+
+    async def _run(self):
+        while True:
+            try:
+                now = time.time()
+                await self._drain()
+                await self._close_windows(now)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"알림 발행 단계 오류: {e}")
+            await asyncio.sleep(settings.ALERT_TICK_SEC)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "queue_size": len(self._inbox),
+            "open_windows": len(self._windows),
+            "suppressed_keys": len(self._suppressed_until),
+            "thumbnails": len(self._thumbnails),
+            "running": self._task is not None and not self._task.done()
+        }
+
+# 전역 인스턴스
+alert_dispatcher = AlertDispatcher()
@@ -0,0 +1,136 @@
+import cv2
+import time
+import logging
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional
+from core.config import settings
+from services.load_shedding_service import load_shedder
+
+logger = logging.getLogger(__name__)
+
+def sharpness_score(crop: np.ndarray) -> float:
+    """라플라시안 분산 기반 선명도 (0~1)"""
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    variance = cv2.Laplacian(gray, cv2.CV_64F).var()
+    return float(min(1.0, variance / settings.BEST_SHOT_SHARPNESS_REF))
+
+def frontalness_score(kps: Optional[np.ndarray]) -> float:
+    """5점 랜드마크(눈, 코, 입꼬리)로 추정한 정면도 (0~1)"""
+    if kps is None or len(kps) < 5:
+        return 0.5
+    left_eye, right_eye, nose, left_mouth, right_mouth = [np.asarray(p, dtype=np.float32) for p in kps[:5]]
+    eye_center = (left_eye + right_eye) / 2
+    mouth_center = (left_mouth + right_mouth) / 2
+    eye_dist = float(np.linalg.norm(right_eye - left_eye))
+    face_height = float(mouth_center[1] - eye_center[1])
+    if eye_dist <= 1 or face_height <= 1:
+        return 0.0
+
+    # 코가 눈 중심에서 좌우로 벗어난 정도 (yaw), 눈-입 사이 세로 위치 (pitch)
+    yaw = (nose[0] - eye_center[0]) / eye_dist
+    pitch = (nose[1] - eye_center[1]) / face_height
+    yaw_score = max(0.0, 1.0 - 2.0 * abs(yaw))
+    pitch_score = max(0.0, 1.0 - 2.0 * abs(pitch - 0.5))
+    return float(yaw_score * pitch_score)
+
+def score_face(face: Dict[str, Any], crop: np.ndarray) -> Dict[str, float]:
+    """탐지 점수, 크기, 선명도, 정면도를 곱한 얼굴 품질 점수
+
+    곱으로 결합하므로 어느 한 항목이라도 나쁘면 (흐림, 측면 등) 전체 점수가 낮아집니다.
+    """
+    x1, y1, x2, y2 = face["bbox"]
+    size = min(x2 - x1, y2 - y1)
+    size_score = min(1.0, max(0.0, size / settings.BEST_SHOT_MIN_FACE_SIZE))
+    sharp = sharpness_score(crop)
+    frontal = frontalness_score(face.get("kps"))
+    det_score = float(face["det_score"])
+    return {
+        "score": det_score * size_score * sharp * frontal,
+        "det_score": det_score,
+        "size": size_score,
+        "sharpness": sharp,
+        "frontalness": frontal
+    }
+
+class ShotCandidate:
+    """에피소드 중 수집한 얼굴 후보 (정렬된 얼굴 크롭 보관)"""
+
+    def __init__(self, face: Dict[str, Any], crop: np.ndarray, quality: Dict[str, float], captured_at: float):
+        self.bbox = face["bbox"]
+        self.det_score = float(face["det_score"])
+        self.crop = crop
+        self.quality = quality
+        self.score = quality["score"]
+        self.captured_at = captured_at
+
+class MotionEpisode:
+    """움직임 에피소드 동안 트랙별 상위 K개 얼굴 후보를 유지"""
+
+    def __init__(self, camera_id: str, started_at: float, timestamp: Any = None):
+        self.camera_id = camera_id
+        self.started_at = started_at
+        self.timestamp = timestamp
+        self.last_sample_at = 0.0
+        self.frames_sampled = 0
+        self.faces_seen = 0
+        self.candidates: Dict[int, List[ShotCandidate]] = {}
+
+    def add(self, track_id: int, candidate: ShotCandidate):
+        self.faces_seen += 1
+        shots = self.candidates.setdefault(track_id, [])
+        shots.append(candidate)
+        shots.sort(key=lambda c: c.score, reverse=True)
+        del shots[settings.BEST_SHOT_TOP_K:]
+
+    def is_due_for_sample(self, now: float) -> bool:
+        # 부하 제어 단계에 따라 샘플링 주기가 늘어남
+        return now - self.last_sample_at >= load_shedder.sample_interval
+
+    def is_expired(self, now: float) -> bool:
+        return now - self.started_at >= settings.BEST_SHOT_EPISODE_SEC
+
+class BestShotSelector:
+    """카메라별 움직임 에피소드 관리"""
+
+    def __init__(self):
+        self._episodes: Dict[str, MotionEpisode] = {}
+        self._lock = threading.Lock()
+        self.episodes_closed = 0
+        self.faces_seen = 0
+        self.faces_embedded = 0
+
+    def open(self, camera_id: str, timestamp: Any = None) -> MotionEpisode:
+        """에피소드 시작 (이미 진행 중이면 기존 에피소드 반환)"""
+        with self._lock:
+            episode = self._episodes.get(camera_id)
+            if episode is None:
+                episode = MotionEpisode(camera_id, time.time(), timestamp)
+                self._episodes[camera_id] = episode
+            return episode
+
+    def get(self, camera_id: str) -> Optional[MotionEpisode]:
+        return self._episodes.get(camera_id)
+
+    def close(self, camera_id: str) -> Optional[MotionEpisode]:
+        with self._lock:
+            episode = self._episodes.pop(camera_id, None)
+            if episode is not None:
+                self.episodes_closed += 1
+                self.faces_seen += episode.faces_seen
+            return episode
+
+    def record_embedded(self, count: int):
+        with self._lock:
+            self.faces_embedded += count
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "active_episodes": len(self._episodes),
+            "episodes_closed": self.episodes_closed,
+            "faces_seen": self.faces_seen,
+            "faces_embedded": self.faces_embedded
+        }
+
+# 전역 인스턴스
+best_shot_selector = BestShotSelector()
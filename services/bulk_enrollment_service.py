@@ -0,0 +1,184 @@
+import os
+import time
+import uuid
+import logging
+import zipfile
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from core.config import settings
+from services.face_learning_service import safe_filename
+from services.gallery_service import active_gallery_profile, commit_staged_embeddings, encode_crop
+from services.upload_service import is_archive_junk, read_archive_member
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+def scan_source(source: str) -> List[Tuple[str, str]]:
+    """인물/이미지 구조의 디렉토리 또는 zip에서 (인물, 이미지 참조) 목록 생성
+
+    디렉토리는 파일 경로, zip은 항목 이름을 참조로 사용합니다.
+    zip 안에 최상위 폴더가 하나 더 있어도 이미지 바로 위 폴더를 인물 이름으로 봅니다.
+    __MACOSX/와 숨김 파일은 이미지가 아니므로 목록에서 제외합니다.
+    """
+    items = []
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                parts = info.filename.split("/")
+                if (info.is_dir() or len(parts) < 2 or is_archive_junk(info.filename)
+                        or not parts[-1].lower().endswith(IMAGE_EXTENSIONS)):
+                    continue
+                items.append((parts[-2], info.filename))
+        return sorted(items)
+
+    for person in sorted(os.listdir(source)):
+        person_dir = os.path.join(source, person)
+        if person.startswith(".") or not os.path.isdir(person_dir):
+            continue
+        for file in sorted(os.listdir(person_dir)):
+            if not file.startswith(".") and file.lower().endswith(IMAGE_EXTENSIONS):
+                items.append((person, os.path.join(person_dir, file)))
+    return items
+
+# 워커 프로세스 전역 상태 (프로세스마다 모델 하나)
+_worker_service = None
+_worker_archive: Optional[zipfile.ZipFile] = None
+
+def _init_worker(profile: Optional[str], archive_path: Optional[str], intra_op_threads: int):
+    """워커 초기화: 프로세스 전용 모델 로드, zip은 워커마다 한 번만 열기"""
+    global _worker_service, _worker_archive
+    from services.face_detection_service import FaceDetectionService
+    from services.model_registry import model_registry, INSIGHTFACE_AVAILABLE
+
+    name = profile or active_gallery_profile() or settings.DEFAULT_MODEL_PROFILE
+    if intra_op_threads:
+        # 여러 프로세스가 코어를 나눠 쓰므로 프로세스당 onnxruntime 스레드 수 제한
+        settings.MODEL_PROFILES[name] = settings.MODEL_PROFILES[name].model_copy(
+            update={"intra_op_threads": intra_op_threads, "inter_op_threads": 1}
+        )
+    _worker_service = FaceDetectionService(model_profile=name)
+    _worker_archive = zipfile.ZipFile(archive_path) if archive_path else None
+    if INSIGHTFACE_AVAILABLE:
+        model_registry.warmup([name])
+
+def _read_image(ref: str) -> Optional[np.ndarray]:
+    if _worker_archive is not None:
+        # 큰 항목은 압축을 풀기 전에 거부 (읽기 실패로 보고됨)
+        data = read_archive_member(_worker_archive, ref, settings.UPLOAD_MAX_IMAGE_BYTES)
+        image, _ = _worker_service.decode_image(data, settings.BULK_ENROLL_MAX_IMAGE_SIDE)
+    else:
+        image, _ = _worker_service.decode_image_file(ref, settings.BULK_ENROLL_MAX_IMAGE_SIDE)
+    return image
+
+def _embed_chunk(items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """워커에서 이미지 묶음을 디코딩/탐지하고 통과한 얼굴을 한 번의 배치로 임베딩"""
+    results = []
+    crops = []
+    owners = []
+    for person, ref in items:
+        result = {"person": person, "ref": ref, "error": None, "embedding": None, "crop": None}
+        results.append(result)
+        try:
+            image = _read_image(ref)
+        except Exception as e:
+            result["error"] = f"읽기 실패: {e}"
+            continue
+        if image is None:
+            result["error"] = "디코딩 실패"
+            continue
+        faces = _worker_service.detect_faces(image)
+        if not faces:
+            result["error"] = "얼굴 없음"
+            continue
+        # add_known_face와 같이 탐지 점수가 가장 높은 얼굴 사용
+        face = max(faces, key=lambda f: f["det_score"])
+        crops.append(_worker_service.align_faces(image, [face])[0])
+        owners.append(result)
+
+    if crops:
+        for result, crop, emb in zip(owners, crops, _worker_service.embed_crops(crops)):
+            result["embedding"] = np.asarray(emb, dtype=np.float32)
+            # 갤러리 재생성용 크롭은 워커에서 JPEG로 인코딩해 전송량을 줄임
+            result["crop"] = encode_crop(crop) if settings.GALLERY_SAVE_CROPS else None
+    for result in owners:
+        if result["embedding"] is None:
+            result["error"] = "임베딩 실패"
+    return results
+
+def bulk_enroll(source: str, profile: Optional[str] = None, workers: Optional[int] = None,
+                chunk_size: Optional[int] = None,
+                progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                should_cancel: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """디렉토리/zip의 사진을 프로세스 풀로 임베딩하고 갤러리에 한 번에 반영
+
+    취소되거나 전체가 실패하면 갤러리는 변경되지 않습니다.
+    """
+    items = scan_source(source)
+    archive_path = source if zipfile.is_zipfile(source) else None
+    workers = workers or settings.BULK_ENROLL_WORKERS or max(1, (os.cpu_count() or 2) // 2)
+    chunk_size = chunk_size or settings.BULK_ENROLL_CHUNK
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    people: Dict[str, Dict[str, Any]] = {}
+    for person, _ in items:
+        people.setdefault(safe_filename(person), {"images": 0, "enrolled": 0, "failures": []})["images"] += 1
+    staged: Dict[str, List[np.ndarray]] = {}
+    staged_crops: Dict[str, List[Optional[bytes]]] = {}
+    done = 0
+    cancelled = False
+    start = time.perf_counter()
+
+    if chunks:
+        # 서버 프로세스의 스레드/모델 상태를 물려받지 않도록 spawn 사용
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)), mp_context=context, initializer=_init_worker,
+            initargs=(profile, archive_path, settings.BULK_ENROLL_WORKER_THREADS)
+        ) as pool:
+            futures = {pool.submit(_embed_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    results = future.result()
+                except Exception as e:
+                    results = [{"person": p, "ref": r, "error": f"워커 오류: {e}", "embedding": None, "crop": None}
+                               for p, r in futures[future]]
+                for result in results:
+                    person = safe_filename(result["person"])
+                    if result["embedding"] is not None:
+                        staged.setdefault(person, []).append(result["embedding"])
+                        staged_crops.setdefault(person, []).append(result["crop"])
+                        people[person]["enrolled"] += 1
+                    else:
+                        people[person]["failures"].append({"image": result["ref"], "error": result["error"]})
+                done += len(results)
+                if progress:
+                    progress({"images": done, "total": len(items), "enrolled": sum(len(v) for v in staged.values())})
+                if should_cancel and should_cancel():
+                    cancelled = True
+                    # with 블록의 shutdown(wait=True)가 실행 중인 청크를 모두 기다리지 않도록 바로 종료
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    break
+
+    committed = 0 if cancelled else commit_staged_embeddings(
+        staged, f"bulk_{int(time.time())}_{uuid.uuid4().hex[:8]}", staged_crops
+    )
+    elapsed = time.perf_counter() - start
+    report = {
+        "images": len(items),
+        "processed": done,
+        "enrolled": committed,
+        "failed": sum(len(p["failures"]) for p in people.values()),
+        "people": people,
+        "workers": workers,
+        "elapsed_sec": round(elapsed, 3),
+        "images_per_sec": round(done / elapsed, 2) if elapsed > 0 else 0.0,
+        "cancelled": cancelled
+    }
+    logger.info(
+        f"일괄 등록 완료: 이미지 {len(items)}장, 등록 {committed}개, 실패 {report['failed']}개, "
+        f"{report['images_per_sec']}장/초"
+    )
+    return report
@@ -0,0 +1,196 @@
+import json
+import time
+import asyncio
+import logging
+import itertools
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Optional, Set
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class DashboardSubscriber:
+    """대시보드 연결 하나 (카메라 필터와 보낼 메시지 큐)"""
+
+    def __init__(self, cameras: Optional[Set[str]]):
+        self.cameras = cameras
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.DASHBOARD_PUSH_QUEUE_SIZE)
+        self.dropped = 0
+
+    def wants(self, camera_id: Optional[str]) -> bool:
+        return self.cameras is None or camera_id is None or camera_id in self.cameras
+
+    def offer(self, message: str):
+        """큐가 가득 차면(느린 클라이언트) 가장 오래된 메시지를 버리고 추가"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+class DashboardPushHub:
+    """대시보드 실시간 푸시 (Server-Sent Events)
+
+    대시보드가 /rtsp/status를 주기적으로 폴링하며 최근 감지 목록 전체를 다시 받는 대신,
+    새 감지 이벤트, 연결 상태 변화, 스트림 통계 변화만 변경분으로 밀어 넣습니다.
+    메시지는 한 번만 직렬화하여 구독자별 큐에 넣고, 구독자는 카메라 필터로 필요한 이벤트만 받습니다.
+    최근 DASHBOARD_PUSH_HISTORY개 이벤트(통계 제외)를 보관하여 EventSource가 재연결할 때 Last-Event-ID 이후의
+    놓친 이벤트를 다시 보내며, 상태/통계는 백그라운드 태스크가 값이 바뀔 때만 발행합니다.
+    """
+
+    def __init__(self):
+        self._subscribers: Set[DashboardSubscriber] = set()
+        self._history: deque = deque(maxlen=settings.DASHBOARD_PUSH_HISTORY)
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._rtsp_service = None
+        self._last_status: Optional[Dict[str, Any]] = None
+        self._last_stats: Optional[Dict[str, Any]] = None
+        self._last_frames = (0, time.time())
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0, "connections": 0}
+
+    def set_rtsp_service(self, rtsp_service):
+        self._rtsp_service = rtsp_service
+
+    def start(self):
+        """앱 이벤트 루프에서 상태/통계 감시 태스크 시작"""
+        self._loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def publish(self, event: str, data: Dict[str, Any], camera_id: Optional[str] = None, replay: bool = True):
+        """이벤트 발행 (인식 워커 스레드 등 다른 스레드에서 호출해도 안전)
+
+        replay=False인 메시지(주기적 통계)는 id 없이 보내고 재연결 시 다시 보내지 않음
+        """
+        if self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._fanout(event, data, camera_id, replay)
+        else:
+            self._loop.call_soon_threadsafe(self._fanout, event, data, camera_id, replay)
+
+    def _fanout(self, event: str, data: Dict[str, Any], camera_id: Optional[str], replay: bool):
+        if replay:
+            event_id = next(self._ids)
+            message = f"id: {event_id}\n" + self.format(event, data)
+            self._history.append((event_id, camera_id, message))
+        else:
+            message = self.format(event, data)
+        self.stats["published"] += 1
+        for subscriber in self._subscribers:
+            if subscriber.wants(camera_id):
+                subscriber.offer(message)
+
+    def subscribe(self, cameras: Optional[Set[str]], last_event_id: Optional[int] = None) -> DashboardSubscriber:
+        """구독 등록. last_event_id가 있으면 보관 중인 이후 이벤트부터 다시 보냄"""
+        subscriber = DashboardSubscriber(cameras)
+        if last_event_id is not None:
+            for event_id, camera_id, message in self._history:
+                if event_id > last_event_id and subscriber.wants(camera_id):
+                    subscriber.offer(message)
+        self._subscribers.add(subscriber)
+        self.stats["connections"] += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: DashboardSubscriber):
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+            self.stats["dropped"] += subscriber.dropped
+
+    @staticmethod
+    def format(event: str, data: Dict[str, Any]) -> str:
+        """SSE 메시지 직렬화 (id 없음: 연결 직후 스냅샷 등 일회성 메시지에 그대로 사용)"""
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    async def stream(self, subscriber: DashboardSubscriber, is_disconnected) -> AsyncIterator[str]:
+        """구독자 큐를 SSE 스트림으로 내보냄. 유휴 시에는 주석 줄로 연결 유지 (구독 해제는 호출자 몫)"""
+        # EventSource 재연결 간격 (ms)
+        yield f"retry: {int(settings.DASHBOARD_PUSH_RETRY_SEC * 1000)}\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), settings.DASHBOARD_PUSH_KEEPALIVE_SEC)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            self.stats["delivered"] += 1
+            yield message
+
+    def current_status(self) -> Dict[str, Any]:
+        rtsp = self._rtsp_service
+        if rtsp is None:
+            return {"is_connected": False, "is_streaming": False, "detection_enabled": False, "rtsp_url": None}
+        return {
+            "camera_id": rtsp.camera_id,
+            "is_connected": rtsp.is_connected,
+            "is_streaming": rtsp.is_running,
+            "detection_enabled": rtsp.detection_enabled,
+            "rtsp_url": rtsp.rtsp_url
+        }
+
+    def notify_status(self):
+        """상태가 바뀌었으면 바로 발행 (연결/스트리밍/감지 토글 API에서 호출)"""
+        status = self.current_status()
+        if status != self._last_status:
+            self._last_status = status
+            self.publish("status", status, status.get("camera_id"))
+
+    def _current_stats(self) -> Optional[Dict[str, Any]]:
+        rtsp = self._rtsp_service
+        if rtsp is None:
+            return None
+        now = time.time()
+        frames, since = self._last_frames
+        fps = (rtsp.successful_frames - frames) / max(now - since, 1e-6)
+        self._last_frames = (rtsp.successful_frames, now)
+        return {
+            "camera_id": rtsp.camera_id,
+            "fps": round(max(fps, 0.0), 1),
+            "successful_frames": rtsp.successful_frames,
+            "decode_errors": rtsp.decode_errors,
+            "frame_queue_size": rtsp.frame_queue.qsize(),
+            "last_frame_time": rtsp.last_frame_time
+        }
+
+    async def _run(self):
+        while True:
+            try:
+                self.notify_status()
+                if self._subscribers:
+                    stats = self._current_stats()
+                    # 스트림이 멈춰 값이 그대로면 발행하지 않음
+                    if stats is not None and stats != self._last_stats:
+                        self._last_stats = stats
+                        self.publish("stats", stats, stats["camera_id"], replay=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"대시보드 상태 발행 오류: {e}")
+            await asyncio.sleep(settings.DASHBOARD_PUSH_STATS_SEC)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "subscribers": len(self._subscribers),
+            "history": len(self._history),
+            "running": self._task is not None and not self._task.done()
+        }
+
+# 전역 인스턴스
+dashboard_hub = DashboardPushHub()
@@ -0,0 +1,165 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from core.config import settings
+from services.face_learning_service import enroll_from_video_file
+from services.bulk_enrollment_service import bulk_enroll
+from services.gallery_rebuild_service import rebuild_gallery
+from services.upload_service import SpooledUpload, upload_hash_index
+
+logger = logging.getLogger(__name__)
+
+class EnrollmentJob:
+    """등록 작업 상태 (queued → running → done / failed / cancelled)
+
+    kind: video(영상 한 개로 한 사람 등록), bulk(인물/사진 구조의 zip 일괄 등록),
+          rebuild(저장된 크롭으로 새 모델 프로필의 갤러리 버전 생성, 입력 파일 없음)
+    """
+
+    def __init__(self, person_name: str, video_path: Optional[str], kind: str = "video",
+                 options: Optional[Dict[str, Any]] = None):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.person_name = person_name
+        self.video_path = video_path
+        self.options = options or {}
+        self.status = "queued"
+        self.progress: Dict[str, Any] = {"frames": 0, "samples": 0, "video_time": 0.0}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = False
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "person_name": self.person_name,
+            "options": self.options,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+
+class EnrollmentJobManager:
+    """영상 등록 작업 큐
+
+    HTTP 요청은 작업 ID만 받고 바로 반환하며, 실제 등록은 동시 실행 수가 제한된 워커 풀에서 수행됩니다.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, EnrollmentJob] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.ENROLL_MAX_CONCURRENT_JOBS, thread_name_prefix="enroll"
+            )
+        return self._executor
+
+    def submit(self, person_name: str, video_path: Optional[str], kind: str = "video",
+               options: Optional[Dict[str, Any]] = None) -> EnrollmentJob:
+        """등록 작업 추가. 작업이 끝나면 video_path 파일은 삭제됨"""
+        job = EnrollmentJob(person_name, video_path, kind, options)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        try:
+            self._get_executor().submit(self._run, job)
+        except Exception:
+            # 실행기에 넣지 못한 작업은 대기 중으로 남지 않도록 목록에서 제거
+            with self._lock:
+                self._jobs.pop(job.job_id, None)
+            raise
+        logger.info(f"등록 작업 추가: {job.job_id} ({person_name})")
+        return job
+
+    def submit_upload(self, person_name: str, upload: SpooledUpload) -> Tuple[EnrollmentJob, bool]:
+        """스풀된 업로드로 작업 추가. 같은 사람의 같은 영상(sha256)이 진행 중/완료면 기존 작업과 True 반환"""
+        previous = upload_hash_index.lookup("enroll", upload.sha256)
+        if previous and previous["person_name"] == person_name:
+            job = self.get(previous["job_id"])
+            if job is not None and job.status not in ("failed", "cancelled"):
+                upload.cleanup()
+                return job, True
+
+        job = self.submit(person_name, upload.path)
+        upload_hash_index.remember("enroll", upload.sha256, person_name=person_name, job_id=job.job_id)
+        return job, False
+
+    def _prune(self):
+        """완료된 오래된 작업 정리 (호출 시 _lock 보유)"""
+        finished = [job for job in self._jobs.values() if job.is_finished]
+        excess = len(finished) - settings.ENROLL_JOB_HISTORY
+        for job in sorted(finished, key=lambda j: j.finished_at or 0)[:max(0, excess)]:
+            del self._jobs[job.job_id]
+
+    def _run(self, job: EnrollmentJob):
+        try:
+            if job.cancel_requested:
+                job.status = "cancelled"
+                return
+            job.status = "running"
+            job.started_at = time.time()
+
+            def update(progress: Dict[str, Any]):
+                job.progress = progress
+
+            def should_cancel() -> bool:
+                return job.cancel_requested
+
+            if job.kind == "bulk":
+                result = bulk_enroll(job.video_path, progress=update, should_cancel=should_cancel)
+            elif job.kind == "rebuild":
+                result = rebuild_gallery(progress=update, should_cancel=should_cancel, **job.options)
+            else:
+                result = enroll_from_video_file(
+                    job.person_name, job.video_path, progress=update, should_cancel=should_cancel
+                )
+            job.result = result
+            job.status = "cancelled" if result.get("cancelled") else "done"
+        except Exception as e:
+            logger.error(f"등록 작업 실패 {job.job_id}: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            if job.video_path and os.path.exists(job.video_path):
+                try:
+                    os.remove(job.video_path)
+                except Exception as e:
+                    logger.warning(f"임시 파일 삭제 실패: {job.video_path}, {e}")
+
+    def get(self, job_id: str) -> Optional[EnrollmentJob]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[EnrollmentJob]:
+        """대기 중이면 실행하지 않고, 실행 중이면 다음 배치 전에 중단 (이미 저장된 샘플은 유지)"""
+        job = self._jobs.get(job_id)
+        if job is not None and not job.is_finished:
+            job.cancel_requested = True
+        return job
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+        return [job.to_dict() for job in jobs]
+
+# 전역 인스턴스
+enrollment_job_manager = EnrollmentJobManager()
@@ -0,0 +1,339 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from core.config import settings
+from services.face_history_store import face_history_store
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    camera_id TEXT NOT NULL,
+    motion_type TEXT,
+    image_size INTEGER,
+    face_count INTEGER NOT NULL,
+    known_count INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS event_faces (
+    event_id INTEGER NOT NULL,
+    ts REAL NOT NULL,
+    camera_id TEXT NOT NULL,
+    identity TEXT NOT NULL,
+    confidence REAL,
+    is_known INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts);
+CREATE INDEX IF NOT EXISTS idx_events_camera_ts ON events(camera_id, ts);
+CREATE INDEX IF NOT EXISTS idx_faces_identity_ts ON event_faces(identity, ts);
+CREATE INDEX IF NOT EXISTS idx_faces_camera_ts ON event_faces(camera_id, ts);
+CREATE INDEX IF NOT EXISTS idx_faces_event ON event_faces(event_id);
+"""
+
+def _json_default(value):
+    # numpy 스칼라/배열 등 JSON 기본 타입이 아닌 값
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+class EventStore:
+    """감지 이벤트 영구 저장소 (SQLite WAL)
+
+    인식 경로는 append()로 메모리 큐에 넣기만 하고, 백그라운드 쓰기 스레드가 큐를 모아
+    EVENT_STORE_BATCH개 단위의 트랜잭션으로 기록합니다. 큐가 가득 차면 대기하지 않고 버리며
+    버린 수는 통계에 남깁니다. WAL 모드이므로 조회는 쓰기를 막지 않습니다.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.EVENT_STORE_PATH
+        self._queue: "queue.Queue[Optional[Tuple[float, str, Dict[str, Any], Optional[list]]]]" = queue.Queue(
+            maxsize=settings.EVENT_STORE_QUEUE_SIZE
+        )
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._initialized = False
+        self.stats = {"appended": 0, "written": 0, "dropped": 0, "batches": 0, "last_batch_size": 0,
+                      "last_batch_ms": 0.0, "pruned": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL에서는 NORMAL이어도 전원 차단 시 마지막 트랜잭션만 잃을 수 있음
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _ensure_schema(self):
+        with self._lock:
+            if self._initialized:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            try:
+                conn.executescript(_SCHEMA)
+                conn.commit()
+            finally:
+                conn.close()
+            self._initialized = True
+
+    def start(self):
+        """쓰기 스레드 시작 (append 시 자동으로 호출됨)"""
+        if not settings.EVENT_STORE_ENABLED:
+            return
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="event-store-writer", daemon=True)
+            self._writer.start()
+
+    def stop(self, timeout: float = 5.0):
+        """큐에 남은 이벤트를 모두 기록하고 쓰기 스레드 종료"""
+        writer = self._writer
+        if writer is None or not writer.is_alive():
+            return
+        self._queue.put(None)
+        writer.join(timeout)
+        self._writer = None
+
+    def append(self, camera_id: str, timestamp: float, detection: Dict[str, Any],
+               embeddings: Optional[list] = None) -> bool:
+        """감지 이벤트를 쓰기 큐에 추가 (블로킹 없음). 큐가 가득 차면 False
+
+        embeddings: detection["faces"]와 같은 순서의 임베딩 (없는 얼굴은 None). 이벤트 id가 정해진 뒤
+        얼굴 기록 저장소에 함께 기록됩니다.
+        """
+        if not settings.EVENT_STORE_ENABLED:
+            return False
+        if self._writer is None:
+            self.start()
+        try:
+            self._queue.put_nowait((timestamp, camera_id, detection, embeddings))
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["appended"] += 1
+        return True
+
+    def _write_loop(self):
+        self._ensure_schema()
+        conn = self._connect()
+        last_prune = 0.0
+        try:
+            while True:
+                try:
+                    first = self._queue.get(timeout=settings.EVENT_STORE_FLUSH_SEC)
+                except queue.Empty:
+                    first = False
+
+                batch = []
+                stop = first is None
+                if first:
+                    batch.append(first)
+                # 쌓여 있는 이벤트를 한 트랜잭션으로 모아서 기록
+                while not stop and len(batch) < settings.EVENT_STORE_BATCH:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                    else:
+                        batch.append(item)
+
+                if batch:
+                    try:
+                        self._write_batch(conn, batch)
+                    except Exception as e:
+                        logger.error(f"이벤트 저장 실패 ({len(batch)}개): {e}")
+                        self.stats["dropped"] += len(batch)
+
+                now = time.time()
+                if now - last_prune > settings.EVENT_STORE_PRUNE_INTERVAL_SEC:
+                    last_prune = now
+                    if settings.EVENT_STORE_RETENTION_DAYS > 0:
+                        self._prune(conn, now - settings.EVENT_STORE_RETENTION_DAYS * 86400)
+                    if settings.FACE_HISTORY_RETENTION_DAYS > 0:
+                        face_history_store.prune(now - settings.FACE_HISTORY_RETENTION_DAYS * 86400)
+                    face_history_store.maintain_indexes()
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[float, str, Dict[str, Any], Optional[list]]]):
+        start = time.perf_counter()
+        vectors = []
+        with conn:
+            faces = []
+            for ts, camera_id, detection, embeddings in batch:
+                face_results = detection.get("faces") or []
+                cursor = conn.execute(
+                    "INSERT INTO events (ts, camera_id, motion_type, image_size, face_count, known_count, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        ts, camera_id, detection.get("motion_type"), detection.get("image_size"),
+                        len(face_results), sum(1 for f in face_results if f.get("is_known")),
+                        json.dumps(detection, ensure_ascii=False, default=_json_default)
+                    )
+                )
+                event_id = cursor.lastrowid
+                for index, emb in enumerate(embeddings or []):
+                    if emb is not None:
+                        vectors.append((event_id, ts, index, camera_id, emb))
+                for face in face_results:
+                    faces.append((
+                        # 미등록 얼굴은 클러스터 ID로 기록하여 같은 방문자의 이벤트를 조회할 수 있게 함
+                        event_id, ts, camera_id, str(face.get("cluster_id") or face.get("name")),
+                        float(face.get("confidence", 0.0)), int(bool(face.get("is_known")))
+                    ))
+            if faces:
+                conn.executemany(
+                    "INSERT INTO event_faces (event_id, ts, camera_id, identity, confidence, is_known) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    faces
+                )
+        # 얼굴 벡터는 이벤트가 커밋된 뒤 같은 배치 단위로 추가
+        if vectors:
+            try:
+                face_history_store.append(vectors)
+            except Exception as e:
+                logger.error(f"얼굴 기록 저장 실패 ({len(vectors)}개): {e}")
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["last_batch_size"] = len(batch)
+        self.stats["last_batch_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    def _prune(self, conn: sqlite3.Connection, cutoff: float):
+        """보관 기간이 지난 이벤트 삭제"""
+        try:
+            with conn:
+                conn.execute("DELETE FROM event_faces WHERE ts < ?", (cutoff,))
+                deleted = conn.execute("DELETE FROM events WHERE ts < ?", (cutoff,)).rowcount
+            if deleted:
+                self.stats["pruned"] += deleted
+                logger.info(f"보관 기간이 지난 이벤트 {deleted}개 삭제")
+        except Exception as e:
+            logger.error(f"이벤트 정리 실패: {e}")
+
+    def _reader(self) -> sqlite3.Connection:
+        """조회용 스레드별 연결"""
+        self._ensure_schema()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_event(row: sqlite3.Row) -> Dict[str, Any]:
+        event = json.loads(row["payload"])
+        event.update(id=row["id"], camera_id=row["camera_id"], ts=row["ts"])
+        return event
+
+    def query(self, camera_id: Optional[str] = None, identity: Optional[str] = None,
+              start: Optional[float] = None, end: Optional[float] = None,
+              known: Optional[bool] = None, cursor: Optional[int] = None,
+              limit: Optional[int] = None) -> Dict[str, Any]:
+        """조건에 맞는 이벤트를 최신순으로 조회 (cursor: 이전 페이지의 next_cursor)
+
+        id 기준 키셋 페이지네이션이므로 새 이벤트가 계속 들어와도 페이지가 밀리지 않습니다.
+        """
+        limit = max(1, min(limit or settings.EVENT_STORE_PAGE_SIZE, settings.EVENT_STORE_MAX_PAGE_SIZE))
+        # 인물 조건은 event_faces의 (identity, ts) 인덱스에서 시작
+        alias = "f" if identity is not None else "e"
+        id_column = "f.event_id" if identity is not None else "e.id"
+        conditions, params = [], []
+        if identity is not None:
+            conditions.append("f.identity = ?")
+            params.append(identity)
+        if camera_id is not None:
+            conditions.append(f"{alias}.camera_id = ?")
+            params.append(camera_id)
+        if start is not None:
+            conditions.append(f"{alias}.ts >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append(f"{alias}.ts < ?")
+            params.append(end)
+        if known is not None:
+            conditions.append("f.is_known = ?" if identity is not None else
+                              ("e.known_count > 0" if known else "e.known_count < e.face_count"))
+            if identity is not None:
+                params.append(int(known))
+        if cursor is not None:
+            conditions.append(f"{id_column} < ?")
+            params.append(cursor)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        if identity is not None:
+            sql = (f"SELECT DISTINCT e.* FROM event_faces f JOIN events e ON e.id = f.event_id {where} "
+                   f"ORDER BY e.id DESC LIMIT ?")
+        else:
+            sql = f"SELECT e.* FROM events e {where} ORDER BY e.id DESC LIMIT ?"
+        rows = self._reader().execute(sql, (*params, limit + 1)).fetchall()
+
+        events = [self._row_to_event(row) for row in rows[:limit]]
+        return {
+            "events": events,
+            "count": len(events),
+            "next_cursor": events[-1]["id"] if len(rows) > limit else None
+        }
+
+    def get(self, event_id: int) -> Optional[Dict[str, Any]]:
+        row = self._reader().execute("SELECT * FROM events WHERE id = ?", (event_id,)).fetchone()
+        return self._row_to_event(row) if row else None
+
+    def get_many(self, event_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """여러 이벤트를 한 번에 조회 ({id: 이벤트})"""
+        events = {}
+        ids = list(dict.fromkeys(event_ids))
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            rows = self._reader().execute(
+                f"SELECT * FROM events WHERE id IN ({','.join('?' * len(part))})", part
+            ).fetchall()
+            events.update((row["id"], self._row_to_event(row)) for row in rows)
+        return events
+
+    def identity_summary(self, start: Optional[float] = None, end: Optional[float] = None,
+                         camera_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """기간 내 인물별 감지 횟수와 처음/마지막 감지 시각"""
+        conditions, params = [], []
+        if camera_id is not None:
+            conditions.append("camera_id = ?")
+            params.append(camera_id)
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("ts < ?")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._reader().execute(
+            f"SELECT identity, COUNT(*) AS detections, MIN(ts) AS first_seen, MAX(ts) AS last_seen, "
+            f"MAX(confidence) AS best_confidence FROM event_faces {where} "
+            f"GROUP BY identity ORDER BY detections DESC",
+            params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "enabled": settings.EVENT_STORE_ENABLED,
+            "path": self.path,
+            "queue_size": self._queue.qsize(),
+            "writer_alive": self._writer is not None and self._writer.is_alive()
+        }
+
+# 전역 인스턴스
+event_store = EventStore()
@@ -1,54 +1,51 @@
+import io
 import os
 import cv2
+import time
+import uuid
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import logging
+from fastapi.concurrency import run_in_threadpool
 from core.config import settings
+from services.model_registry import model_registry, INSIGHTFACE_AVAILABLE
+from services.face_tracker import face_tracker_manager, UNKNOWN_NAME
+from services.gallery_index import GalleryIndex
+from services.best_shot_service import best_shot_selector, score_face, MotionEpisode, ShotCandidate
+from services.load_shedding_service import load_shedder
+from services.metrics_service import metrics
+from services.gallery_service import active_gallery_dir, active_gallery_profile, save_face_crops
 
 try:
-    from insightface.app import FaceAnalysis
-    INSIGHTFACE_AVAILABLE = True
+    from insightface.utils import face_align
 except ImportError:
-    INSIGHTFACE_AVAILABLE = False
-    logging.warning("33 설치되지 않았습니다. pip install insightface로 설치하세요.")
+    face_align = None
+
+if not INSIGHTFACE_AVAILABLE:
+    logging.warning("InsightFace가 설치되지 않았습니다. pip install insightface로 설치하세요.")
 
 logger = logging.getLogger(__name__)
 
 class FaceDetectionService:
-    def __init__(self):
-        self._app: Optional[FaceAnalysis] = None
-        self._known_faces_cache: Optional[Dict[str, List[np.ndarray]]] = None
+    def __init__(self, model_profile: Optional[str] = None):
+        self._model_profile = model_profile
+        self._known_faces_cache: Optional[GalleryIndex] = None
         self._cache_timestamp: float = 0
             
-    def _get_face_app(self) -> FaceAnalysis:
-        """FaceAnalysis 객체를 지연 초기화"""
+    def _get_face_app(self):
+        """공유 모델 레지스트리에서 FaceAnalysis 객체를 가져옴 (지연 로드)"""
         if not INSIGHTFACE_AVAILABLE:
             raise ImportError("InsightFace가 설치되지 않았습니다.")
-            
-        if self._app is None:
-            try:
-                self._app = FaceAnalysis(
-                    name='buffalo_l', 
-                    providers=['CUDAExecutionProvider','CPUExecutionProvider']
-		)
-                self._app.prepare(ctx_id=0, det_size=(640, 640))
-                logger.info("FaceAnalysis 모델이 성공적으로 로드되었습니다.")
-            except Exception as e:
-                logger.error(f"FaceAnalysis 모델 로드 실패: {e}")
-                try:
-                    self._app = FaceAnalysis(
-                        name='buffalo_l', 
-                        providers=['CUDAExecutionProvider','CPUExecutionProvider']
-                    )
-                    self._app.prepare(ctx_id=-1, det_size=(640, 640))
-                    logger.info("CPU 모드로 FaceAnalysis 모델이 로드되었습니다.")
-                except Exception as e2:
-                    logger.error(f"CPU 모드 FaceAnalysis 모델 로드도 실패: {e2}")
-                    raise e2
-        return self._app
+        return model_registry.get(self.model_profile)
+
+    @property
+    def model_profile(self) -> Optional[str]:
+        """지정된 프로필, 없으면 활성 갤러리를 만든 프로필 (갤러리와 쿼리 임베딩 모델을 일치시킴)"""
+        return self._model_profile or active_gallery_profile()
     
-    def load_known_faces(self, force_reload: bool = False) -> Dict[str, List[np.ndarray]]:
-        """알려진 얼굴 데이터를 캐시와 함께 로드"""
+    def load_known_faces(self, force_reload: bool = False) -> GalleryIndex:
+        """알려진 얼굴 데이터를 캐시와 함께 로드 (설정된 dtype으로 압축된 갤러리 인덱스 반환)"""
+        # 버전 전환도 루트 디렉토리 mtime을 갱신하므로 루트만 확인
         current_time = os.path.getmtime(settings.KNOWN_FACES_DIR) if os.path.exists(settings.KNOWN_FACES_DIR) else 0
         
         if (self._known_faces_cache is None or 
@@ -56,15 +53,17 @@ class FaceDetectionService:
             current_time > self._cache_timestamp):
             
             known_faces = {}
+            gallery_dir = active_gallery_dir()
             
-            if not os.path.exists(settings.KNOWN_FACES_DIR):
-                logger.warning(f"알려진 얼굴 디렉토리가 존재하지 않습니다: {settings.KNOWN_FACES_DIR}")
-                return known_faces
+            if not os.path.exists(gallery_dir):
+                logger.warning(f"알려진 얼굴 디렉토리가 존재하지 않습니다: {gallery_dir}")
+                return GalleryIndex.from_dict(known_faces)
             
             try:
-                for person_name in os.listdir(settings.KNOWN_FACES_DIR):
-                    person_dir = os.path.join(settings.KNOWN_FACES_DIR, person_name)
-                    if not os.path.isdir(person_dir):
+                for person_name in os.listdir(gallery_dir):
+                    person_dir = os.path.join(gallery_dir, person_name)
+                    # 숨김 디렉토리(.staging 등)는 인물이 아님
+                    if person_name.startswith(".") or not os.path.isdir(person_dir):
                         continue
                     
                     embeddings = []
@@ -80,34 +79,115 @@ class FaceDetectionService:
                         known_faces[person_name] = embeddings
                         logger.info(f"{person_name}: {len(embeddings)}개 임베딩 로드됨")
                 
-                self._known_faces_cache = known_faces
+                # 원본 리스트는 버리고 압축된 행렬만 유지
+                self._known_faces_cache = GalleryIndex.from_dict(known_faces)
                 self._cache_timestamp = current_time
+                logger.info(
+                    f"갤러리 인덱스 생성: {self._known_faces_cache.size}개 임베딩, "
+                    f"{self._known_faces_cache.dtype}, {self._known_faces_cache.nbytes / 1024:.1f}KB"
+                )
                 
             except Exception as e:
                 logger.error(f"알려진 얼굴 로드 중 오류: {e}")
-                return {}
+                return GalleryIndex.from_dict({})
         
         return self._known_faces_cache
 
-    def extract_face_embeddings(self, image: np.ndarray) -> List[Dict[str, Any]]:
+    def detect_faces(self, image: np.ndarray, input_size: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
+        """얼굴 탐지만 수행 (임베딩 추출 없음). input_size를 주면 프로필 det_size 대신 사용"""
+        if not INSIGHTFACE_AVAILABLE:
+            return []
+
+        try:
+            with model_registry.use(self.model_profile) as app, metrics.time_stage("detect"):
+                bboxes, kpss = app.det_model.detect(image, input_size=input_size, max_num=0, metric='default')
+
+            results = []
+            for i in range(bboxes.shape[0]):
+                results.append({
+                    "bbox": bboxes[i, 0:4].astype(int).tolist(),
+                    "kps": kpss[i] if kpss is not None else None,
+                    "det_score": float(bboxes[i, 4])
+                })
+            return results
+
+        except Exception as e:
+            logger.error(f"얼굴 탐지 실패: {e}")
+            return []
+
+    def align_faces(self, image: np.ndarray, faces: List[Dict[str, Any]]) -> List[np.ndarray]:
+        """랜드마크 기준으로 인식 모델 입력 크기(112x112)의 얼굴 크롭 생성"""
+        if not faces:
+            return []
+
+        with model_registry.use(self.model_profile) as app:
+            input_size = app.models["recognition"].input_size[0]
+        return [
+            face_align.norm_crop(image, landmark=face["kps"], image_size=input_size)
+            for face in faces
+        ]
+
+    def embed_crops(self, crops: List[np.ndarray]) -> List[np.ndarray]:
+        """정렬된 얼굴 크롭을 한 번의 배치로 임베딩"""
+        if not crops:
+            return []
+
+        metrics.observe_batch("recognition", len(crops))
+        with model_registry.use(self.model_profile) as app, metrics.time_stage("embed"):
+            feats = app.models["recognition"].get_feat(crops)
+        return [feat.flatten() for feat in feats]
+
+    def identify_crops(self, crops: List[np.ndarray], threshold: float
+                       ) -> Tuple[List[Optional[np.ndarray]], List[Tuple[str, float]]]:
+        """정렬된 크롭 임베딩과 갤러리 매칭 (크롭별 임베딩, (이름, 신뢰도))
+
+        RECOGNITION_MODE가 remote이면 MQTT 인식 워커에 맡기고, 시간 내 응답이 없는 크롭만
+        REMOTE_RECOGNITION_FALLBACK에 따라 로컬에서 처리하거나 미등록으로 둡니다.
+        """
+        from services.remote_recognition_service import remote_recognizer
+
+        # 앱 이벤트 루프에서 기다리면 작업 발행과 응답 수신이 모두 막히므로 로컬에서 처리
+        if settings.RECOGNITION_MODE != "remote" or remote_recognizer.on_loop_thread():
+            return self._identify_local(crops, threshold)
+
+        embeddings, matches = remote_recognizer.identify(crops, threshold)
+        missing = [i for i, match in enumerate(matches) if match is None]
+        if missing and settings.REMOTE_RECOGNITION_FALLBACK == "local" and INSIGHTFACE_AVAILABLE:
+            local_embeddings, local_matches = self._identify_local([crops[i] for i in missing], threshold)
+            for i, emb, match in zip(missing, local_embeddings, local_matches):
+                embeddings[i], matches[i] = emb, match
+        return embeddings, [match or (UNKNOWN_NAME, 0.0) for match in matches]
+
+    def _identify_local(self, crops: List[np.ndarray], threshold: float
+                        ) -> Tuple[List[np.ndarray], List[Tuple[str, float]]]:
+        embeddings = self.embed_crops(crops)
+        if not embeddings:
+            return embeddings, []
+        gallery = self.load_known_faces()
+        with metrics.time_stage("match"):
+            matches = gallery.match_many(np.stack(embeddings), threshold)
+        return embeddings, matches
+
+    def embed_faces(self, image: np.ndarray, faces: List[Dict[str, Any]]) -> List[np.ndarray]:
+        """탐지된 얼굴을 정렬한 뒤 한 번의 배치로 임베딩 추출"""
+        return self.embed_crops(self.align_faces(image, faces))
+
+    def extract_face_embeddings(self, image: np.ndarray,
+                                input_size: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
         """얼굴 탐지 및 임베딩 추출"""
         if not INSIGHTFACE_AVAILABLE:
             return []
             
         try:
-            app = self._get_face_app()
-            faces = app.get(image)
+            faces = self.detect_faces(image, input_size)
+            embeddings = self.embed_faces(image, faces)
             
             results = []
-            for face in faces:
-                bbox = face.bbox.astype(int).tolist()
-                embedding = face.embedding
-                det_score = float(face.det_score)
-                
+            for face, embedding in zip(faces, embeddings):
                 results.append({
-                    "bbox": bbox, 
+                    "bbox": face["bbox"], 
                     "embedding": embedding, 
-                    "det_score": det_score
+                    "det_score": face["det_score"]
                 })
             
             return results
@@ -130,40 +210,257 @@ class FaceDetectionService:
         except Exception:
             return 0.0
 
-    def recognize_faces(self, image: np.ndarray, threshold: float = None) -> List[Dict[str, Any]]:
-        """얼굴 인식 수행"""
+    def match_embedding(self, emb: np.ndarray, gallery: GalleryIndex,
+                        threshold: float) -> tuple[str, float]:
+        """임베딩 하나를 등록된 얼굴과 비교하여 (이름, 신뢰도) 반환"""
+        return gallery.match(emb, threshold)
+
+    def recognize_faces(self, image: np.ndarray, threshold: float = None,
+                        input_size: Optional[Tuple[int, int]] = None,
+                        include_embeddings: bool = False) -> List[Dict[str, Any]]:
+        """얼굴 인식 수행 (include_embeddings이면 결과에 "embedding" 포함, 얼굴 기록 저장용)"""
         if threshold is None:
             threshold = settings.SIMILARITY_THRESHOLD
             
-        detected = self.extract_face_embeddings(image)
-        if not detected:
+        try:
+            detected = self.detect_faces(image, input_size)
+            embeddings, matches = self.identify_crops(self.align_faces(image, detected), threshold)
+        except Exception as e:
+            logger.error(f"얼굴 임베딩 추출 실패: {e}")
             return []
-        
-        known_faces = self.load_known_faces()
         recognized = []
         
-        for face in detected:
-            name = "알 수 없음"
-            max_conf = 0.0
-            emb = face['embedding']
-
-            for person, embeddings in known_faces.items():
-                for known_emb in embeddings:
-                    sim = self.cosine_similarity(emb, known_emb)
-                    if sim > max_conf and sim >= threshold:
-                        max_conf = sim
-                        name = person
-
-            recognized.append({
+        for face, embedding, (name, max_conf) in zip(detected, embeddings, matches):
+            result = {
                 "name": name,
-                "confidence": float(max_conf),
+                "confidence": max_conf,
                 "box": face["bbox"],
-                "is_known": name != "알 수 없음",
+                "is_known": name != UNKNOWN_NAME,
                 "detection_score": face["det_score"]
-            })
+            }
+            if include_embeddings:
+                result["embedding"] = embedding
+            recognized.append(result)
             
         return recognized
 
+    def recognize_faces_tracked(self, image: np.ndarray, camera_id: str,
+                                threshold: float = None, include_embeddings: bool = False) -> List[Dict[str, Any]]:
+        """추적기를 사용한 얼굴 인식 (트랙당 필요한 경우에만 임베딩/매칭 수행)
+
+        include_embeddings이면 이번에 새로 임베딩한 얼굴에만 "embedding"과 정렬된 "crop"을 포함합니다.
+        """
+        if threshold is None:
+            threshold = settings.SIMILARITY_THRESHOLD
+
+        detected = self.detect_faces(image, load_shedder.det_size)
+        if not detected:
+            return []
+
+        tracker = face_tracker_manager.get(camera_id)
+        tracks = tracker.update([face["bbox"] for face in detected])
+        crops = self.align_faces(image, detected)
+        qualities = [score_face(face, crop)["score"] for face, crop in zip(detected, crops)]
+
+        pending = [i for i, track in enumerate(tracks) if tracker.needs_recognition(track, qualities[i])]
+        fresh = set(pending)
+        fresh_embeddings = {}
+        if pending:
+            try:
+                embeddings, matches = self.identify_crops([crops[i] for i in pending], threshold)
+            except Exception as e:
+                logger.error(f"얼굴 임베딩 추출 실패: {e}")
+                embeddings, matches = [], []
+                fresh = set()
+
+            fresh_embeddings = {i: emb for i, emb in zip(pending, embeddings) if emb is not None}
+            for i, (name, conf) in zip(pending, matches):
+                # 원격 워커가 응답하지 않은 크롭(임베딩 없음)은 미등록으로 캐시하지 않고 다음 프레임에서 다시 인식
+                if i in fresh_embeddings:
+                    tracker.set_identity(tracks[i], name, conf, qualities[i])
+
+        recognized = []
+        for i, (face, track) in enumerate(zip(detected, tracks)):
+            if i not in fresh:
+                tracker.mark_cache_hit()
+            result = self._track_result(track, face["bbox"], face["det_score"], i not in fresh)
+            if include_embeddings and i in fresh_embeddings:
+                result["embedding"] = fresh_embeddings[i]
+                result["crop"] = crops[i]
+            recognized.append(result)
+
+        return recognized
+
+    @staticmethod
+    def _track_result(track, box: List[int], det_score: float, from_cache: bool) -> Dict[str, Any]:
+        name = track.name or UNKNOWN_NAME
+        return {
+            "name": name,
+            "confidence": float(track.confidence),
+            "box": box,
+            "is_known": name != UNKNOWN_NAME,
+            "detection_score": det_score,
+            "track_id": track.track_id,
+            "from_cache": from_cache
+        }
+
+    def collect_episode_candidates(self, image: np.ndarray, episode: MotionEpisode) -> int:
+        """에피소드 프레임에서 얼굴을 탐지하고 품질 점수와 함께 후보로 추가 (임베딩 없음)"""
+        detected = self.detect_faces(image, load_shedder.det_size)
+        if not detected:
+            return 0
+
+        tracker = face_tracker_manager.get(episode.camera_id)
+        tracks = tracker.update([face["bbox"] for face in detected])
+        crops = self.align_faces(image, detected)
+        now = time.time()
+        for face, crop, track in zip(detected, crops, tracks):
+            episode.add(track.track_id, ShotCandidate(face, crop, score_face(face, crop), now))
+        return len(detected)
+
+    def recognize_episode(self, episode: MotionEpisode, threshold: float = None,
+                          include_embeddings: bool = False) -> List[Dict[str, Any]]:
+        """에피소드 종료 시 트랙별 상위 K개 얼굴만 임베딩하여 인식
+
+        include_embeddings이면 새로 인식한 트랙의 최고 품질 샷 임베딩과 크롭을 "embedding", "crop"으로 포함합니다.
+        """
+        if threshold is None:
+            threshold = settings.SIMILARITY_THRESHOLD
+
+        tracker = face_tracker_manager.get(episode.camera_id)
+        pending = []
+        cached = []
+        for track_id, shots in episode.candidates.items():
+            track = tracker.tracks.get(track_id)
+            if track is None or not shots:
+                continue
+            if tracker.needs_recognition(track, shots[0].score):
+                pending.append((track, shots))
+            else:
+                cached.append((track, shots))
+
+        crops = [shot.crop for _, shots in pending for shot in shots]
+        embeddings, matches = self.identify_crops(crops, threshold)
+        best_shot_selector.record_embedded(sum(1 for emb in embeddings if emb is not None))
+
+        recognized = []
+        offset = 0
+        for track, shots in pending:
+            best_name, best_conf = UNKNOWN_NAME, 0.0
+            for name, conf in matches[offset:offset + len(shots)]:
+                if conf > best_conf:
+                    best_name, best_conf = name, conf
+            # 원격 워커가 샷 하나도 응답하지 않았으면 트랙에 미등록으로 기록하지 않음
+            if any(emb is not None for emb in embeddings[offset:offset + len(shots)]):
+                tracker.set_identity(track, best_name, best_conf, shots[0].score)
+            result = self._track_result(track, shots[0].bbox, shots[0].det_score, False)
+            result["quality"] = shots[0].score
+            if include_embeddings:
+                result["embedding"] = embeddings[offset]
+                result["crop"] = shots[0].crop
+            offset += len(shots)
+            recognized.append(result)
+
+        for track, shots in cached:
+            tracker.mark_cache_hit()
+            result = self._track_result(track, shots[0].bbox, shots[0].det_score, True)
+            result["quality"] = shots[0].score
+            recognized.append(result)
+
+        return recognized
+
+    _DECODE_FLAGS = {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8,
+    }
+
+    @staticmethod
+    def _reduced_decode_factor(source, max_side: int = None) -> int:
+        """헤더만 읽어 원본 크기를 확인하고 축소 디코딩 배율 결정 (source: 경로 또는 파일 객체)"""
+        if not max_side:
+            return 1
+        try:
+            from PIL import Image
+            with Image.open(source) as header:
+                longest = max(header.size)
+            for candidate in (8, 4, 2):
+                if longest / candidate >= max_side:
+                    return candidate
+        except Exception:
+            pass
+        return 1
+
+    @staticmethod
+    def _fit_max_side(image: Optional[np.ndarray], factor: int, max_side: int = None) -> tuple[Optional[np.ndarray], float]:
+        """축소 디코딩은 2의 거듭제곱 배율뿐이므로 남은 초과분을 max_side에 맞춰 줄임 (이미지, 전체 축소 배율)"""
+        if image is None or not max_side:
+            return image, factor
+        longest = max(image.shape[:2])
+        if longest <= max_side:
+            return image, factor
+        scale = max_side / longest
+        resized = cv2.resize(image, (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale))),
+                             interpolation=cv2.INTER_AREA)
+        return resized, factor / scale
+
+    @classmethod
+    def decode_image(cls, image_bytes: bytes, max_side: int = None) -> tuple[Optional[np.ndarray], float]:
+        """이미지 디코딩. 큰 이미지는 축소 디코딩(1/2, 1/4, 1/8) 후 max_side에 맞춰 (이미지, 축소 배율) 반환"""
+        factor = cls._reduced_decode_factor(io.BytesIO(image_bytes), max_side)
+        image = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cls._DECODE_FLAGS[factor])
+        return cls._fit_max_side(image, factor, max_side)
+
+    @classmethod
+    def decode_image_file(cls, path: str, max_side: int = None) -> tuple[Optional[np.ndarray], float]:
+        """디스크의 이미지 파일을 바로 디코딩 (업로드 스풀 파일용)"""
+        factor = cls._reduced_decode_factor(path, max_side)
+        return cls._fit_max_side(cv2.imread(path, cls._DECODE_FLAGS[factor]), factor, max_side)
+
+    def recognize_batch(self, images: List[Optional[np.ndarray]], threshold: float = None) -> tuple[List[List[Dict[str, Any]]], Dict[str, float]]:
+        """여러 이미지를 탐지한 뒤 모든 얼굴을 배치로 임베딩/매칭 (이미지별 결과, 단계별 시간)"""
+        if threshold is None:
+            threshold = settings.SIMILARITY_THRESHOLD
+
+        timing = {"detect_ms": 0.0, "embed_ms": 0.0, "match_ms": 0.0}
+        detections: List[List[Dict[str, Any]]] = []
+        crops: List[np.ndarray] = []
+
+        start = time.perf_counter()
+        for image in images:
+            faces = self.detect_faces(image) if image is not None else []
+            detections.append(faces)
+            crops.extend(self.align_faces(image, faces))
+        timing["detect_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        embeddings: List[np.ndarray] = []
+        batch_size = settings.BATCH_EMBED_SIZE
+        for i in range(0, len(crops), batch_size):
+            embeddings.extend(self.embed_crops(crops[i:i + batch_size]))
+        timing["embed_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        matches = self.load_known_faces().match_many(np.stack(embeddings), threshold) if embeddings else []
+        timing["match_ms"] = (time.perf_counter() - start) * 1000
+
+        results = []
+        offset = 0
+        for faces in detections:
+            image_results = []
+            for face, (name, conf) in zip(faces, matches[offset:offset + len(faces)]):
+                image_results.append({
+                    "name": name,
+                    "confidence": conf,
+                    "box": face["bbox"],
+                    "is_known": name != UNKNOWN_NAME,
+                    "detection_score": face["det_score"]
+                })
+            offset += len(faces)
+            results.append(image_results)
+        return results, timing
+
     async def detect_and_recognize_faces(self, image_bytes: bytes) -> List[Dict[str, Any]]:
         """메인 얼굴 인식 함수 (바이트 데이터 처리)"""
         try:
@@ -175,33 +472,46 @@ class FaceDetectionService:
                 logger.error("이미지 디코딩 실패")
                 return []
 
-            return self.recognize_faces(image)
+            # 원격 인식은 이벤트 루프에서 응답을 받으므로 루프를 막지 않도록 스레드 풀에서 실행
+            return await run_in_threadpool(self.recognize_faces, image)
             
         except Exception as e:
             logger.error(f"얼굴 인식 처리 중 오류: {e}")
             return []
         
+    async def detect_and_recognize_file(self, path: str) -> List[Dict[str, Any]]:
+        """디스크에 저장된 이미지 파일 얼굴 인식 (업로드 스풀 파일용)"""
+        try:
+            image, _ = self.decode_image_file(path)
+            if image is None:
+                logger.error("이미지 디코딩 실패")
+                return []
+            return await run_in_threadpool(self.recognize_faces, image)
+        except Exception as e:
+            logger.error(f"얼굴 인식 처리 중 오류: {e}")
+            return []
+
     def add_known_face(self, person_name: str, image: np.ndarray) -> bool:
         """새로운 얼굴을 등록"""
         try:
-            embeddings = self.extract_face_embeddings(image)
-            if not embeddings:
+            faces = self.detect_faces(image)
+            if not faces:
                 logger.warning("이미지에서 얼굴을 찾을 수 없습니다.")
                 return False
             
             # 가장 높은 detection score를 가진 얼굴 선택
-            best_face = max(embeddings, key=lambda x: x['det_score'])
+            best_face = max(faces, key=lambda x: x['det_score'])
+            crop = self.align_faces(image, [best_face])[0]
+            embedding = self.embed_crops([crop])[0]
             
-            # 기존 임베딩 개수 확인
-            person_dir = os.path.join(settings.KNOWN_FACES_DIR, person_name)
-            existing_count = 0
-            if os.path.exists(person_dir):
-                existing_count = len([f for f in os.listdir(person_dir) if f.endswith('.npy')])
+            person_dir = os.path.join(active_gallery_dir(), person_name)
             
-            # 임베딩 저장
+            # 임베딩 저장 (모델 교체 시 재생성할 수 있도록 정렬된 크롭도 함께 보관)
+            # 압축으로 파일이 정리되어도 기존 임베딩/크롭 이름과 겹치지 않도록 고유 이름 사용
             os.makedirs(person_dir, exist_ok=True)
-            file_path = os.path.join(person_dir, f"{person_name}_{existing_count}.npy")
-            np.save(file_path, best_face['embedding'])
+            stem = f"{person_name}_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+            np.save(os.path.join(person_dir, f"{stem}.npy"), embedding)
+            save_face_crops(person_dir, {stem: crop})
             
             # 캐시 무효화
             self._known_faces_cache = None
@@ -215,13 +525,13 @@ class FaceDetectionService:
 
     def get_known_people(self) -> List[Dict[str, Any]]:
         """등록된 사람 목록 반환"""
-        known_faces = self.load_known_faces()
+        gallery = self.load_known_faces()
         people = []
         
-        for person_name, embeddings in known_faces.items():
+        for person_name, count in gallery.person_counts().items():
             people.append({
                 "name": person_name,
-                "embedding_count": len(embeddings)
+                "embedding_count": count
             })
         
         return people
@@ -237,7 +547,8 @@ async def startup_event():
     try:
         if INSIGHTFACE_AVAILABLE:
             logger.info("얼굴 인식 서비스 사전 로드 중...")
-            face_detection_service._get_face_app()
+            if settings.MODEL_WARMUP_ON_STARTUP:
+                model_registry.warmup([face_detection_service.model_profile or settings.DEFAULT_MODEL_PROFILE])
             face_detection_service.load_known_faces()
             logger.info("얼굴 인식 서비스 사전 로드 완료!")
         else:
@@ -0,0 +1,323 @@
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 파티션별 메타데이터 레코드 (벡터 파일과 같은 순서로 한 행씩 추가)
+META_DTYPE = np.dtype([("event_id", "<i8"), ("ts", "<f8"), ("face", "<i2"), ("camera", "S32")])
+VECTORS_FILE = "vectors.f16"
+META_FILE = "meta.bin"
+INFO_FILE = "info.json"
+INDEX_FILE = "ivf.npz"
+
+class FaceHistoryStore:
+    """감지된 얼굴 임베딩의 시간 분할 저장소
+
+    하루 단위 파티션 폴더에 L2 정규화된 float16 벡터와 고정 길이 메타데이터를 추가 기록만 하며,
+    검색은 기간과 겹치는 파티션만 memmap으로 한 번씩 열어 FACE_HISTORY_SEARCH_CHUNK행씩 행렬 곱을 수행하므로
+    전체를 메모리에 올리지 않습니다. 블록은 스레드 풀에서 병렬로 검색합니다.
+    행이 많은 파티션은 백그라운드에서 IVF 색인(ivf.npz)을 만들어 질의와 가까운 목록만 검색합니다.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.FACE_HISTORY_DIR
+        self._lock = threading.Lock()
+        self._search_pool: Optional[ThreadPoolExecutor] = None
+        self._index_pool: Optional[ThreadPoolExecutor] = None
+        # 파티션 → (색인 파일 mtime, 색인 배열)
+        self._indexes: Dict[str, Tuple[float, Dict[str, np.ndarray]]] = {}
+        self._indexing: Set[str] = set()
+        self.stats = {"stored": 0, "skipped": 0, "searches": 0, "last_search_ms": 0.0, "last_search_rows": 0,
+                      "indexes_built": 0}
+
+    @staticmethod
+    def partition_name(ts: float) -> str:
+        return time.strftime("%Y%m%d", time.localtime(ts))
+
+    def _partition_range(self, name: str) -> Tuple[float, float]:
+        start = time.mktime(time.strptime(name, "%Y%m%d"))
+        return start, start + 86400
+
+    def list_partitions(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if name.isdigit() and len(name) == 8)
+
+    def append(self, rows: List[Tuple[int, float, int, str, np.ndarray]]):
+        """(event_id, ts, 얼굴 번호, 카메라, 임베딩) 목록을 파티션별로 모아 한 번에 추가"""
+        if not settings.FACE_HISTORY_ENABLED or not rows:
+            return
+        by_partition: Dict[str, List[Tuple[int, float, int, str, np.ndarray]]] = {}
+        for row in rows:
+            by_partition.setdefault(self.partition_name(row[1]), []).append(row)
+
+        with self._lock:
+            for name, part_rows in by_partition.items():
+                directory = os.path.join(self.root, name)
+                os.makedirs(directory, exist_ok=True)
+                matrix = np.stack([np.asarray(r[4], dtype=np.float32).flatten() for r in part_rows])
+                dim = self._partition_dim(directory, matrix.shape[1])
+                if matrix.shape[1] != dim:
+                    # 다른 모델 프로필의 임베딩은 같은 파티션에 섞지 않음
+                    self.stats["skipped"] += len(part_rows)
+                    continue
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                vectors = (matrix / norms).astype(np.float16)
+                meta = np.array(
+                    [(r[0], r[1], r[2], str(r[3]).encode("utf-8")[:32]) for r in part_rows], dtype=META_DTYPE
+                )
+                # 벡터를 먼저 기록하므로 중간에 중단되어도 메타데이터 행 수 이하의 벡터는 항상 유효
+                with open(os.path.join(directory, VECTORS_FILE), "ab") as f:
+                    f.write(vectors.tobytes())
+                with open(os.path.join(directory, META_FILE), "ab") as f:
+                    f.write(meta.tobytes())
+                self.stats["stored"] += len(part_rows)
+
+    @staticmethod
+    def _partition_dim(directory: str, dim: int) -> int:
+        """파티션의 임베딩 차원 (처음 기록할 때 info.json에 고정)"""
+        path = os.path.join(directory, INFO_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)["dim"]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"dim": dim, "created_at": time.time()}, f)
+        return dim
+
+    def _open_partition(self, name: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        directory = os.path.join(self.root, name)
+        info_path = os.path.join(directory, INFO_FILE)
+        meta_path = os.path.join(directory, META_FILE)
+        vectors_path = os.path.join(directory, VECTORS_FILE)
+        if not (os.path.exists(info_path) and os.path.exists(meta_path) and os.path.exists(vectors_path)):
+            return None
+        with open(info_path, encoding="utf-8") as f:
+            dim = json.load(f)["dim"]
+        rows = min(os.path.getsize(meta_path) // META_DTYPE.itemsize,
+                   os.path.getsize(vectors_path) // (dim * 2))
+        if rows == 0:
+            return None
+        meta = np.memmap(meta_path, dtype=META_DTYPE, mode="r", shape=(rows,))
+        vectors = np.memmap(vectors_path, dtype=np.float16, mode="r", shape=(rows, dim))
+        return meta, vectors
+
+    # 거친 색인 (파티션별 IVF)
+
+    def _load_index(self, name: str) -> Optional[Dict[str, np.ndarray]]:
+        """파티션의 IVF 색인 (파일이 바뀐 경우에만 다시 읽음)"""
+        path = os.path.join(self.root, name, INDEX_FILE)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            self._indexes.pop(name, None)
+            return None
+        cached = self._indexes.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with np.load(path) as data:
+            index = {key: data[key] for key in ("centroids", "order", "offsets", "rows")}
+        self._indexes[name] = (mtime, index)
+        return index
+
+    def _needs_index(self, name: str) -> bool:
+        opened = self._open_partition(name)
+        if opened is None or len(opened[0]) < settings.FACE_HISTORY_IVF_MIN_ROWS:
+            return False
+        index = self._load_index(name)
+        # 색인 이후 추가된 행(끝부분 전체 검색)이 일정 비율을 넘으면 다시 생성
+        return index is None or len(opened[0]) - int(index["rows"]) > len(opened[0]) * settings.FACE_HISTORY_IVF_REBUILD_RATIO
+
+    def build_index(self, name: str) -> bool:
+        """파티션 벡터를 구면 k-means로 목록(list)에 나누어 IVF 색인 생성
+
+        표본으로 중심을 학습한 뒤 전체 행을 가장 가까운 중심에 배정하고, 목록 순서의 행 번호와
+        목록 경계를 저장합니다. 색인 이후에 추가된 행은 검색 시 전체 검색으로 처리됩니다.
+        """
+        opened = self._open_partition(name)
+        if opened is None:
+            return False
+        _, vectors = opened
+        rows = len(vectors)
+        lists = int(min(settings.FACE_HISTORY_IVF_MAX_LISTS, max(16, np.sqrt(rows))))
+        if rows < max(settings.FACE_HISTORY_IVF_MIN_ROWS, lists):
+            return False
+        begin = time.perf_counter()
+        rng = np.random.default_rng(0)
+        sample_size = min(rows, settings.FACE_HISTORY_IVF_TRAIN_SAMPLE)
+        sample = np.asarray(vectors[np.sort(rng.choice(rows, sample_size, replace=False))], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, lists, replace=False)].copy()
+        for _ in range(settings.FACE_HISTORY_IVF_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            order = np.argsort(assign, kind="stable")
+            counts = np.bincount(assign, minlength=lists)
+            used = np.flatnonzero(counts)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[used]
+            # 빈 목록은 이전 중심 유지
+            centroids[used] = np.add.reduceat(sample[order], starts, axis=0)
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True).clip(1e-12)
+
+        chunk = settings.FACE_HISTORY_SEARCH_CHUNK
+        assign = np.concatenate([
+            np.argmax(np.asarray(vectors[i:i + chunk], dtype=np.float32) @ centroids.T, axis=1)
+            for i in range(0, rows, chunk)
+        ])
+        order = np.argsort(assign, kind="stable").astype(np.int32)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=lists))]).astype(np.int64)
+
+        path = os.path.join(self.root, name, INDEX_FILE)
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, centroids=centroids.astype(np.float32), order=order, offsets=offsets, rows=np.int64(rows))
+        os.replace(tmp, path)
+        self.stats["indexes_built"] += 1
+        logger.info(f"얼굴 기록 색인 생성: {name} ({rows}행, 목록 {lists}개, "
+                    f"{(time.perf_counter() - begin):.1f}초)")
+        return True
+
+    def maintain_indexes(self):
+        """색인이 없거나 오래된 파티션의 색인을 백그라운드 스레드 하나에서 생성 (주기적 정리에서 호출)"""
+        if settings.FACE_HISTORY_IVF_NPROBE <= 0:
+            return
+        if self._index_pool is None:
+            self._index_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="face-index")
+        for name in self.list_partitions():
+            if name in self._indexing or not self._needs_index(name):
+                continue
+            self._indexing.add(name)
+            self._index_pool.submit(self._build_index_task, name)
+
+    def _build_index_task(self, name: str):
+        try:
+            self.build_index(name)
+        except Exception as e:
+            logger.error(f"얼굴 기록 색인 생성 실패 ({name}): {e}")
+        finally:
+            self._indexing.discard(name)
+
+    # 검색
+
+    def _scan(self, meta: np.ndarray, vectors: np.ndarray, rows, query: np.ndarray, start: Optional[float],
+              end: Optional[float], threshold: float, limit: int,
+              camera: Optional[bytes]) -> Tuple[List[Tuple[float, np.void]], int]:
+        """rows(연속 구간 슬라이스 또는 정렬된 행 번호 배열)만 검색 (유사도 상위 limit개)"""
+        block_meta = meta[rows]
+        mask = np.ones(len(block_meta), dtype=bool)
+        if start is not None:
+            mask &= block_meta["ts"] >= start
+        if end is not None:
+            mask &= block_meta["ts"] < end
+        if camera is not None:
+            mask &= block_meta["camera"] == camera
+        if not mask.any():
+            return [], 0
+
+        sims = np.asarray(vectors[rows], dtype=np.float32) @ query
+        sims[~mask] = -np.inf
+        candidates = np.flatnonzero(sims >= threshold)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-sims[candidates], limit - 1)[:limit]]
+        return [(float(sims[i]), block_meta[i]) for i in candidates], len(sims)
+
+    def _tasks(self, start: Optional[float], end: Optional[float], query: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray, Any]]:
+        """기간과 겹치고 차원이 같은 파티션을 한 번씩 열어 (메타, 벡터, 검색할 행) 작업 목록 생성
+
+        색인이 있으면 질의와 가까운 FACE_HISTORY_IVF_NPROBE개 목록의 행과 색인 이후 추가된 행만,
+        없으면 전체를 FACE_HISTORY_SEARCH_CHUNK행 단위로 검색합니다.
+        """
+        chunk = settings.FACE_HISTORY_SEARCH_CHUNK
+        nprobe = settings.FACE_HISTORY_IVF_NPROBE
+        tasks = []
+        for name in self.list_partitions():
+            p_start, p_end = self._partition_range(name)
+            if (start is not None and p_end <= start) or (end is not None and p_start >= end):
+                continue
+            opened = self._open_partition(name)
+            if opened is None or opened[1].shape[1] != len(query):
+                continue
+            meta, vectors = opened
+            index = self._load_index(name) if nprobe > 0 else None
+            indexed = 0
+            if index is not None and index["centroids"].shape[1] == len(query):
+                indexed = min(int(index["rows"]), len(meta))
+                centroids, order, offsets = index["centroids"], index["order"], index["offsets"]
+                probe = np.argsort(-(centroids @ query))[:nprobe]
+                rows = np.sort(np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probe]))
+                rows = rows[rows < indexed]
+                tasks.extend((meta, vectors, rows[i:i + chunk]) for i in range(0, len(rows), chunk))
+            tasks.extend((meta, vectors, slice(i, min(i + chunk, len(meta))))
+                         for i in range(indexed, len(meta), chunk))
+        return tasks
+
+    def search(self, embedding: np.ndarray, start: Optional[float] = None, end: Optional[float] = None,
+               threshold: Optional[float] = None, limit: int = 100,
+               camera_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """기간 내 저장된 얼굴 중 유사도가 threshold 이상인 것을 유사도 순으로 반환
+
+        색인된 파티션은 근사 검색이므로 가까운 목록 밖의 얼굴은 놓칠 수 있습니다
+        (FACE_HISTORY_IVF_NPROBE를 늘리면 정확도가, 0이면 전체 검색이 됩니다).
+        """
+        query = np.asarray(embedding, dtype=np.float32).flatten()
+        query = query / (np.linalg.norm(query) or 1.0)
+        threshold = settings.FACE_HISTORY_SEARCH_THRESHOLD if threshold is None else threshold
+        camera = str(camera_id).encode("utf-8")[:32] if camera_id is not None else None
+
+        begin = time.perf_counter()
+        if self._search_pool is None:
+            self._search_pool = ThreadPoolExecutor(
+                max_workers=settings.FACE_HISTORY_SEARCH_WORKERS, thread_name_prefix="face-search"
+            )
+        # numpy 변환/행렬 곱은 GIL을 해제하므로 블록 단위로 병렬 검색
+        results = list(self._search_pool.map(
+            lambda task: self._scan(task[0], task[1], task[2], query, start, end, threshold, limit, camera),
+            self._tasks(start, end, query)
+        ))
+        hits = sorted((hit for block_hits, _ in results for hit in block_hits), key=lambda h: -h[0])[:limit]
+
+        self.stats["searches"] += 1
+        self.stats["last_search_rows"] = sum(scanned for _, scanned in results)
+        self.stats["last_search_ms"] = round((time.perf_counter() - begin) * 1000, 2)
+        return [
+            {
+                "event_id": int(meta["event_id"]),
+                "face_index": int(meta["face"]),
+                "ts": float(meta["ts"]),
+                "camera_id": meta["camera"].decode("utf-8", errors="replace"),
+                "similarity": round(sim, 4)
+            }
+            for sim, meta in hits
+        ]
+
+    def prune(self, cutoff: float) -> int:
+        """cutoff 이전에 끝나는 파티션 삭제"""
+        removed = 0
+        with self._lock:
+            for name in self.list_partitions():
+                if self._partition_range(name)[1] <= cutoff:
+                    shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+                    self._indexes.pop(name, None)
+                    removed += 1
+        if removed:
+            logger.info(f"보관 기간이 지난 얼굴 기록 파티션 {removed}개 삭제")
+        return removed
+
+    def get_statistics(self) -> Dict[str, Any]:
+        partitions = self.list_partitions()
+        size = 0
+        for name in partitions:
+            path = os.path.join(self.root, name, META_FILE)
+            if os.path.exists(path):
+                size += os.path.getsize(path) // META_DTYPE.itemsize
+        indexed = sum(1 for name in partitions if os.path.exists(os.path.join(self.root, name, INDEX_FILE)))
+        return {**self.stats, "enabled": settings.FACE_HISTORY_ENABLED, "partitions": len(partitions),
+                "indexed_partitions": indexed, "faces": size}
+
+# 전역 인스턴스
+face_history_store = FaceHistoryStore()
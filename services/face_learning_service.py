@@ -1,14 +1,19 @@
 import os
 import re
 import cv2
-import numpy as np
-import tempfile
-import asyncio
+import time
+import uuid
+import json
 import logging
-from typing import Dict, Any
+import subprocess
+import numpy as np
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
 from core.config import settings
-from insightface.app import FaceAnalysis
- 
+from services.best_shot_service import score_face
+from services.face_detection_service import face_detection_service
+from services.gallery_service import compact_person, mark_gallery_changed, person_dir_path, save_face_crops
+from services.load_shedding_service import load_shedder
+
 logger = logging.getLogger(__name__)
 
 MIN_FACE_SIZE = 60
@@ -17,88 +22,220 @@ def safe_filename(name: str) -> str:
     """파일명으로 안전한 문자열로 변환"""
     return re.sub(r'[^a-zA-Z0-9_\-가-힣]', '_', name)
 
-async def run_ffmpeg_convert(input_path: str, output_path: str) -> None:
-    """ffmpeg를 실행하여 webm -> mp4 변환 (비동기 wrapper)"""
-    proc = await asyncio.create_subprocess_exec(
-        "ffmpeg", "-i", input_path, "-c:v", "libx264", "-preset", "ultrafast", output_path, "-y",
-        stdout=asyncio.subprocess.DEVNULL,
-        stderr=asyncio.subprocess.PIPE
+def _stream_rotation(stream: dict) -> int:
+    """스트림의 회전 메타데이터(도) 확인 (구형 rotate 태그 또는 Display Matrix side data)"""
+    rotation = stream.get("tags", {}).get("rotate")
+    for side_data in stream.get("side_data_list", []):
+        if "rotation" in side_data:
+            rotation = side_data["rotation"]
+    try:
+        return int(float(rotation or 0))
+    except (TypeError, ValueError):
+        return 0
+
+def probe_video_size(video_path: str) -> Optional[Tuple[int, int]]:
+    """ffprobe로 첫 번째 비디오 스트림의 표시 기준 (너비, 높이) 확인
+
+    ffmpeg는 회전 메타데이터를 자동 적용해 프레임을 출력하므로
+    ±90도 회전된 영상(휴대폰 촬영 등)은 너비와 높이를 바꿔서 돌려줍니다.
+    """
+    proc = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "stream=width,height:stream_tags=rotate:stream_side_data=rotation",
+         "-of", "json", video_path],
+        capture_output=True, timeout=30
     )
-    _, stderr = await proc.communicate()
     if proc.returncode != 0:
-        err_msg = stderr.decode().strip()
-        raise RuntimeError(f"ffmpeg 변환 실패: {err_msg}")
-
-face_app = FaceAnalysis(
-    name="buffalo_l",
-    root= settings.KNOWN_FACES_DIR,
-    providers = ['CUDAExecutionProvi','CPUExecutionProvider']
-)
-# GPU 사용 위해 ctx_id=0, CPU는 -1
-face_app.prepare(ctx_id=0, det_size=(640, 640))
-
-async def learn_new_face_from_video(person_name: str, video_bytes: bytes) -> Dict[str, Any]:
-    person_name = safe_filename(person_name)
-    person_dir = os.path.join(settings.KNOWN_FACES_DIR, person_name)
-    os.makedirs(person_dir, exist_ok=True)
-
-    webm_path = None
-    mp4_path = None
-
+        raise RuntimeError(f"ffprobe 실패: {proc.stderr.decode().strip()}")
+    streams = json.loads(proc.stdout or b"{}").get("streams", [])
+    if not streams:
+        return None
+    width, height = int(streams[0]["width"]), int(streams[0]["height"])
+    if _stream_rotation(streams[0]) % 180 != 0:
+        width, height = height, width
+    return width, height
+
+def output_size(width: int, height: int, max_side: int) -> Tuple[int, int, float]:
+    """긴 변을 max_side 이하로 줄인 짝수 크기와 축소 배율"""
+    scale = min(1.0, max_side / float(max(width, height)))
+    out_w = max(2, int(width * scale) // 2 * 2)
+    out_h = max(2, int(height * scale) // 2 * 2)
+    return out_w, out_h, out_w / float(width)
+
+def iter_video_frames(video_path: str, fps: float, max_side: int) -> Iterator[Tuple[float, np.ndarray, float]]:
+    """ffmpeg 파이프로 (시각, BGR 프레임, 축소 배율)을 순서대로 생성
+
+    트랜스코딩 없이 fps 필터로 시간 기준 샘플링과 축소를 디코더 쪽에서 수행하고 raw 프레임만 읽습니다.
+    제너레이터를 중간에 닫으면 ffmpeg 프로세스도 종료됩니다.
+    """
+    size = probe_video_size(video_path)
+    if size is None:
+        return
+    out_w, out_h, scale = output_size(size[0], size[1], max_side)
+    frame_bytes = out_w * out_h * 3
+
+    proc = subprocess.Popen(
+        ["ffmpeg", "-v", "error", "-i", video_path,
+         "-vf", f"fps={fps},scale={out_w}:{out_h}",
+         "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=frame_bytes
+    )
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm", dir= settings.KNOWN_FACES_DIR + "/tmp") as webm_file:
-            webm_file.write(video_bytes)
-            webm_path = webm_file.name
-
-        mp4_path = webm_path.replace(".webm", ".mp4")
-
-        try:
-            await run_ffmpeg_convert(webm_path, mp4_path)
-        except FileNotFoundError:
-            return {"error": "ffmpeg가 설치되어 있지 않습니다."}
-        except RuntimeError as e:
-            return {"error": str(e)}
-
-        cap = cv2.VideoCapture(mp4_path)
-        if not cap.isOpened():
-            return {"error": "비디오 파일을 열 수 없습니다."}
-
-        frame_count = 0
-        saved_count = 0
-
+        index = 0
+        while True:
+            data = proc.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            frame = np.frombuffer(data, np.uint8).reshape(out_h, out_w, 3)
+            yield index / fps, frame, scale
+            index += 1
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+def iter_video_frames_opencv(video_path: str, fps: float, max_side: int) -> Iterator[Tuple[float, np.ndarray, float]]:
+    """ffmpeg가 없을 때의 대체 경로 (OpenCV로 직접 디코딩, 재생 시각 기준 샘플링)"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError("비디오 파일을 열 수 없습니다.")
+    try:
+        next_at = 0.0
         while True:
             ret, frame = cap.read()
             if not ret:
                 break
+            t = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            if t + 1e-6 < next_at:
+                continue
+            next_at = t + 1.0 / fps
+            height, width = frame.shape[:2]
+            out_w, out_h, scale = output_size(width, height, max_side)
+            if scale < 1.0:
+                frame = cv2.resize(frame, (out_w, out_h), interpolation=cv2.INTER_AREA)
+            yield t, frame, scale
+    finally:
+        cap.release()
 
-            if frame_count % 3 == 0: 
-                faces = face_app.get(frame)
-                valid_faces = [face for face in faces
-                               if (face.bbox[3] - face.bbox[1]) >= MIN_FACE_SIZE and
-                                  (face.bbox[2] - face.bbox[0]) >= MIN_FACE_SIZE]
+def _best_enroll_crop(frame: np.ndarray, scale: float):
+    """프레임에서 가장 큰 얼굴의 정렬 크롭 (얼굴 없음: None, 품질 미달: False)
+
+    등록 영상에는 본인이 가장 크게 나온다고 보고 가장 큰 얼굴만 사용합니다.
+    """
+    min_size = MIN_FACE_SIZE * scale
+    faces = [f for f in face_detection_service.detect_faces(frame)
+             if f["bbox"][2] - f["bbox"][0] >= min_size and f["bbox"][3] - f["bbox"][1] >= min_size]
+    if not faces:
+        return None
+    face = max(faces, key=lambda f: (f["bbox"][2] - f["bbox"][0]) * (f["bbox"][3] - f["bbox"][1]))
+    crop = face_detection_service.align_faces(frame, [face])[0]
+    if score_face(face, crop)["score"] < settings.ENROLL_MIN_QUALITY:
+        return False
+    return crop
+
+def enroll_from_video_file(person_name: str, video_path: str,
+                           progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                           should_cancel: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """영상 파일에서 품질이 좋고 서로 다른 얼굴 임베딩을 모아 등록 (동기, 스레드에서 실행)
+
+    프레임마다 가장 큰 얼굴 하나만 사용하고, 품질 점수가 ENROLL_MIN_QUALITY 미만이거나
+    이미 모은 임베딩과 ENROLL_DIVERSITY_THRESHOLD 이상 유사한 얼굴은 버립니다.
+    ffmpeg 디코딩은 별도 프로세스에서 진행되고, 추론은 ENROLL_FRAME_BATCH개 프레임 단위로 수행하며
+    ENROLL_TARGET_SAMPLES개가 모이면 디코딩을 즉시 중단합니다.
+    """
+    person_name = safe_filename(person_name)
+    person_dir = person_dir_path(person_name)
+    os.makedirs(person_dir, exist_ok=True)
 
-                for i, face in enumerate(valid_faces):
-                    try:
-                        embedding = face.embedding  # (512,) numpy array
-                        np.save(os.path.join(person_dir, f"{frame_count}_{i}.npy"), embedding)
-                        saved_count += 1
-                    except Exception as e:
-                        logger.warning(f"[인코딩 에러] frame {frame_count} 얼굴 {i}: {e}")
+    try:
+        frames = iter_video_frames(video_path, settings.ENROLL_SAMPLE_FPS, settings.ENROLL_MAX_SIDE)
+        first = next(frames, None)
+    except FileNotFoundError:
+        logger.warning("ffmpeg가 설치되어 있지 않아 OpenCV로 직접 디코딩합니다.")
+        frames = iter_video_frames_opencv(video_path, settings.ENROLL_SAMPLE_FPS, settings.ENROLL_MAX_SIDE)
+        first = next(frames, None)
+
+    start = time.perf_counter()
+    # 같은 초에 같은 인물의 학습이 두 번 실행되어도 파일 이름이 겹치지 않도록 uuid 접미사 사용
+    session = f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
+    accepted = []
+    frames_seen = 0
+    rejected_quality = 0
+    rejected_duplicate = 0
+    cancelled = False
 
-            frame_count += 1
+    try:
+        pending = first
+        while pending is not None:
+            # 프레임 배치 단위로 탐지/품질 평가 후 통과한 얼굴만 한 번에 임베딩
+            batch = [pending]
+            for item in frames:
+                batch.append(item)
+                if len(batch) >= settings.ENROLL_FRAME_BATCH:
+                    break
+            if should_cancel and should_cancel():
+                cancelled = True
+                break
 
-        cap.release()
+            crops = []
+            for _, frame, scale in batch:
+                frames_seen += 1
+                crop = _best_enroll_crop(frame, scale)
+                if crop is None:
+                    continue
+                if crop is False:
+                    rejected_quality += 1
+                else:
+                    crops.append(crop)
+
+            saved_crops = {}
+            for crop, emb in zip(crops, face_detection_service.embed_crops(crops) if crops else []):
+                unit = emb / (np.linalg.norm(emb) + 1e-12)
+                if accepted and float(np.max(np.stack(accepted) @ unit)) >= settings.ENROLL_DIVERSITY_THRESHOLD:
+                    rejected_duplicate += 1
+                    continue
+                stem = f"{session}_{len(accepted)}"
+                np.save(os.path.join(person_dir, f"{stem}.npy"), emb)
+                saved_crops[stem] = crop
+                accepted.append(unit)
+                if len(accepted) >= settings.ENROLL_TARGET_SAMPLES:
+                    break
+            save_face_crops(person_dir, saved_crops)
+
+            if progress:
+                progress({"frames": frames_seen, "samples": len(accepted), "video_time": round(batch[-1][0], 2)})
+            if len(accepted) >= settings.ENROLL_TARGET_SAMPLES:
+                break
+            # 실시간 인식이 부하 제어 중이면 등록 작업이 양보
+            if load_shedder.level > 0:
+                time.sleep(settings.ENROLL_THROTTLE_SEC)
+            pending = next(frames, None)
+    finally:
+        frames.close()
 
-        return {
-            "person_name": person_name,
-            "samples": saved_count,
-            "message": f"{saved_count}개 샘플 학습 완료 (GPU 지원)"
-        }
+    saved_count = len(accepted)
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"영상 등록 완료: {person_name} 샘플 {saved_count}개 (프레임 {frames_seen}개, "
+        f"저품질 {rejected_quality}개, 중복 {rejected_duplicate}개, {elapsed:.2f}초)"
+    )
 
-    finally:
-        for path in (webm_path, mp4_path):
-            if path and os.path.exists(path):
-                try:
-                    os.remove(path)
-                except Exception as e:
-                    logger.warning(f"임시 파일 삭제 실패: {path}, {e}")
+    result = {
+        "person_name": person_name,
+        "samples": saved_count,
+        "frames_sampled": frames_seen,
+        "rejected_quality": rejected_quality,
+        "rejected_duplicate": rejected_duplicate,
+        "elapsed_sec": round(elapsed, 3),
+        "cancelled": cancelled,
+        "message": f"{saved_count}개 샘플 학습 완료 (GPU 지원)"
+    }
+
+    # 등록 직후 거의 동일한 임베딩 정리 (선택)
+    if settings.GALLERY_COMPACT_ON_ENROLL and saved_count:
+        compaction = compact_person(person_name)
+        result["gallery_size"] = compaction["after"]
+    mark_gallery_changed()
+
+    return result
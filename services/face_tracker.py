@@ -0,0 +1,175 @@
+import time
+import itertools
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_NAME = "알 수 없음"
+
+def bbox_iou(a: List[float], b: List[float]) -> float:
+    """두 박스 [x1, y1, x2, y2]의 IoU"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    if inter <= 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+class Track:
+    """카메라 내 한 사람의 얼굴 추적 상태"""
+
+    def __init__(self, track_id: int, bbox: List[int], now: float):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.created_at = now
+        self.last_seen = now
+        self.hits = 1
+        # 캐시된 인식 결과
+        self.name: Optional[str] = None
+        self.confidence = 0.0
+        self.best_quality = 0.0
+        self.recognized_at: Optional[float] = None
+
+    @property
+    def is_known(self) -> bool:
+        return self.name is not None and self.name != UNKNOWN_NAME
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "track_id": self.track_id,
+            "box": self.bbox,
+            "name": self.name,
+            "confidence": self.confidence,
+            "hits": self.hits,
+            "last_seen": self.last_seen
+        }
+
+class FaceTracker:
+    """IoU 기반 경량 다중 얼굴 추적기
+
+    탐지 박스를 기존 트랙에 연결하고 트랙별 인식 결과를 캐시합니다.
+    인식은 새 트랙, 신뢰도가 낮은 트랙, 확실히 더 좋은 얼굴이 들어온 트랙에서만 다시 수행합니다.
+    """
+
+    def __init__(self, camera_id: str):
+        self.camera_id = camera_id
+        self.tracks: Dict[int, Track] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.recognition_calls = 0
+        self.cache_hits = 0
+
+    def update(self, boxes: List[List[int]], now: Optional[float] = None) -> List[Track]:
+        """탐지 박스 목록을 트랙에 할당 (입력 순서대로 트랙 반환)"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            # 오래 보이지 않은 트랙 정리
+            for track_id in [t.track_id for t in self.tracks.values()
+                             if now - t.last_seen > settings.TRACKER_MAX_AGE_SEC]:
+                del self.tracks[track_id]
+
+            # IoU가 큰 쌍부터 탐욕적으로 매칭
+            pairs = []
+            for i, box in enumerate(boxes):
+                for track in self.tracks.values():
+                    iou = bbox_iou(box, track.bbox)
+                    if iou >= settings.TRACKER_IOU_THRESHOLD:
+                        pairs.append((iou, i, track.track_id))
+            pairs.sort(reverse=True)
+
+            assigned: Dict[int, Track] = {}
+            used_tracks = set()
+            for _, i, track_id in pairs:
+                if i in assigned or track_id in used_tracks:
+                    continue
+                track = self.tracks[track_id]
+                track.bbox = boxes[i]
+                track.last_seen = now
+                track.hits += 1
+                assigned[i] = track
+                used_tracks.add(track_id)
+
+            for i, box in enumerate(boxes):
+                if i not in assigned:
+                    track = Track(next(self._ids), box, now)
+                    self.tracks[track.track_id] = track
+                    assigned[i] = track
+
+            return [assigned[i] for i in range(len(boxes))]
+
+    def needs_recognition(self, track: Track, quality: float, now: Optional[float] = None) -> bool:
+        """트랙에 대해 인식을 다시 수행해야 하는지 판단"""
+        now = now if now is not None else time.time()
+        if track.recognized_at is None:
+            return True
+        # 약하게 매칭된 신원은 바로 재확인, 미확인 얼굴은 일정 간격으로만 재시도
+        if track.is_known and track.confidence < settings.TRACKER_MIN_CONFIDENCE:
+            return True
+        if not track.is_known and now - track.recognized_at > settings.TRACKER_UNKNOWN_RETRY_SEC:
+            return True
+        if quality > track.best_quality * settings.TRACKER_QUALITY_GAIN:
+            return True
+        if now - track.recognized_at > settings.TRACKER_REFRESH_SEC:
+            return True
+        return False
+
+    def set_identity(self, track: Track, name: str, confidence: float, quality: float,
+                     now: Optional[float] = None):
+        """인식 결과를 트랙에 캐시"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            self.recognition_calls += 1
+            # 더 낮은 신뢰도의 결과가 기존 신원을 덮어쓰지 않도록 함
+            stale = now - (track.recognized_at or 0) > settings.TRACKER_REFRESH_SEC
+            if track.name is None or confidence >= track.confidence or stale:
+                track.name = name
+                track.confidence = confidence
+            track.best_quality = max(track.best_quality, quality)
+            track.recognized_at = now
+
+    def mark_cache_hit(self):
+        with self._lock:
+            self.cache_hits += 1
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "camera_id": self.camera_id,
+                "active_tracks": len(self.tracks),
+                "recognition_calls": self.recognition_calls,
+                "cache_hits": self.cache_hits,
+                "tracks": [t.to_dict() for t in self.tracks.values()]
+            }
+
+class FaceTrackerManager:
+    """카메라별 추적기 관리"""
+
+    def __init__(self):
+        self._trackers: Dict[str, FaceTracker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, camera_id: str) -> FaceTracker:
+        with self._lock:
+            if camera_id not in self._trackers:
+                self._trackers[camera_id] = FaceTracker(camera_id)
+            return self._trackers[camera_id]
+
+    def reset(self, camera_id: Optional[str] = None):
+        with self._lock:
+            if camera_id is None:
+                self._trackers.clear()
+            else:
+                self._trackers.pop(camera_id, None)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            trackers = list(self._trackers.values())
+        return {t.camera_id: t.get_statistics() for t in trackers}
+
+# 전역 인스턴스
+face_tracker_manager = FaceTrackerManager()
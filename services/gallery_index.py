@@ -0,0 +1,108 @@
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from core.config import settings
+from services.face_tracker import UNKNOWN_NAME
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+class GalleryIndex:
+    """압축 저장된 갤러리 행렬 (float32 / float16 / int8 + 벡터별 스케일)
+
+    모든 임베딩을 L2 정규화된 하나의 행렬로 보관하고, 매칭 시에는 일정 크기의 블록만
+    float32로 풀어 행렬 곱을 수행하므로 상주 메모리는 압축된 크기로 유지됩니다.
+    """
+
+    def __init__(self, names: List[str], labels: np.ndarray, vectors: np.ndarray,
+                 scales: Optional[np.ndarray], dtype: str):
+        self.names = names
+        self.labels = labels
+        self.vectors = vectors
+        self.scales = scales
+        self.dtype = dtype
+
+    @classmethod
+    def from_dict(cls, known_faces: Dict[str, List[np.ndarray]], dtype: Optional[str] = None) -> "GalleryIndex":
+        """{인물: [임베딩, ...]} 형태에서 인덱스 생성"""
+        dtype = dtype or settings.GALLERY_DTYPE
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"지원하지 않는 갤러리 dtype: {dtype}")
+
+        names = list(known_faces.keys())
+        rows = [np.asarray(emb, dtype=np.float32).flatten() for person in names for emb in known_faces[person]]
+        labels = np.array([i for i, person in enumerate(names) for _ in known_faces[person]], dtype=np.int32)
+        if not rows:
+            return cls(names, labels, np.zeros((0, 0), dtype=np.float32), None, dtype)
+
+        matrix = np.stack(rows)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        vectors, scales = cls.quantize(matrix, dtype)
+        return cls(names, labels, vectors, scales, dtype)
+
+    @staticmethod
+    def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """정규화된 float32 행렬을 저장용 dtype으로 변환"""
+        if dtype == "float16":
+            return matrix.astype(np.float16), None
+        if dtype == "int8":
+            scales = np.abs(matrix).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+            return codes, scales.astype(np.float32)
+        return np.ascontiguousarray(matrix, dtype=np.float32), None
+
+    @property
+    def size(self) -> int:
+        return len(self.labels)
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + (self.scales.nbytes if self.scales is not None else 0) + self.labels.nbytes
+
+    def search(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """쿼리별 가장 유사한 행 인덱스와 코사인 유사도 (블록 단위로 압축 해제)"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+
+        best_idx = np.full(len(queries), -1, dtype=np.int64)
+        best_sim = np.full(len(queries), -np.inf, dtype=np.float32)
+        chunk = settings.GALLERY_MATCH_CHUNK
+        for start in range(0, self.size, chunk):
+            block = self.vectors[start:start + chunk]
+            sims = queries @ (block.T if block.dtype == np.float32 else block.astype(np.float32).T)
+            if self.scales is not None:
+                sims *= self.scales[start:start + chunk]
+            idx = np.argmax(sims, axis=1)
+            sim = sims[np.arange(len(queries)), idx]
+            better = sim > best_sim
+            best_idx[better] = idx[better] + start
+            best_sim[better] = sim[better]
+        return best_idx, best_sim
+
+    def match_many(self, queries: np.ndarray, threshold: float) -> List[Tuple[str, float]]:
+        """여러 임베딩을 한 번에 매칭하여 [(이름, 신뢰도), ...] 반환"""
+        if len(queries) == 0:
+            return []
+        if self.size == 0:
+            return [(UNKNOWN_NAME, 0.0)] * len(queries)
+        best_idx, best_sim = self.search(queries)
+        results = []
+        for idx, sim in zip(best_idx, best_sim):
+            if idx >= 0 and sim >= threshold:
+                results.append((self.names[self.labels[idx]], float(sim)))
+            else:
+                results.append((UNKNOWN_NAME, 0.0))
+        return results
+
+    def match(self, emb: np.ndarray, threshold: float) -> Tuple[str, float]:
+        return self.match_many(np.atleast_2d(emb), threshold)[0]
+
+    def person_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.labels, minlength=len(self.names)) if self.size else [0] * len(self.names)
+        return {name: int(count) for name, count in zip(self.names, counts)}
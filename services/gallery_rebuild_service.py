@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import shutil
+import logging
+import zipfile
+import multiprocessing
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from core.config import settings
+from services.gallery_service import (
+    CROPS_FILE, VERSIONS_DIR, VERSION_META_FILE, PROTOTYPE_PREFIX,
+    active_gallery_dir, activate_gallery_version, cluster_prototypes, gallery_fingerprint, list_person_dirs,
+    split_face_crops
+)
+
+logger = logging.getLogger(__name__)
+
+# 워커 프로세스 전역 상태 (프로세스마다 모델 하나)
+_worker_service = None
+
+def _init_worker(profile: str, intra_op_threads: int):
+    """워커 초기화: 새 프로필의 모델을 프로세스 전용으로 로드"""
+    global _worker_service
+    from services.face_detection_service import FaceDetectionService
+    from services.model_registry import model_registry, INSIGHTFACE_AVAILABLE
+
+    if intra_op_threads:
+        settings.MODEL_PROFILES[profile] = settings.MODEL_PROFILES[profile].model_copy(
+            update={"intra_op_threads": intra_op_threads, "inter_op_threads": 1}
+        )
+    _worker_service = FaceDetectionService(model_profile=profile)
+    if INSIGHTFACE_AVAILABLE:
+        model_registry.warmup([profile])
+
+def _embed_crops_from_zip(zip_path: str, stems: List[str]) -> Tuple[List[str], List[np.ndarray], List[str]]:
+    """crops.zip의 크롭을 디코딩하여 GALLERY_REBUILD_BATCH개씩 임베딩 (탐지/정렬 없음)
+
+    반환: (성공한 이름, 임베딩, 실패한 이름)
+    """
+    names, embeddings, failed = [], [], []
+    with zipfile.ZipFile(zip_path) as zf:
+        for i in range(0, len(stems), settings.GALLERY_REBUILD_BATCH):
+            batch_names, crops = [], []
+            for stem in stems[i:i + settings.GALLERY_REBUILD_BATCH]:
+                crop = cv2.imdecode(np.frombuffer(zf.read(f"{stem}.jpg"), np.uint8), cv2.IMREAD_COLOR)
+                if crop is None:
+                    failed.append(stem)
+                    continue
+                batch_names.append(stem)
+                crops.append(crop)
+            if crops:
+                names.extend(batch_names)
+                embeddings.extend(np.asarray(e, dtype=np.float32) for e in _worker_service.embed_crops(crops))
+    return names, embeddings, failed
+
+def rebuild_gallery(profile: str, workers: Optional[int] = None, activate: bool = True, force: bool = False,
+                    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                    should_cancel: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+    """저장된 얼굴 크롭을 새 모델 프로필로 다시 임베딩하여 새 갤러리 버전 생성
+
+    새 버전은 .versions/ 아래 숨김 디렉토리에 모두 기록한 뒤 rename으로 확정하고,
+    activate이면 CURRENT 포인터를 교체해 한 번에 전환합니다. 실행 중에도 기존 갤러리로 인식은 계속되며,
+    실패하거나 취소되면 기존 갤러리는 그대로입니다. 크롭이 없는 인물은 건너뛰고 보고합니다.
+    크롭이 없거나 임베딩에 실패한 인물이 있으면 새 버전에서 빠지므로 force일 때만 전환하고,
+    실행 중 원본 갤러리에 등록/승격이 기록되었으면 그 변경이 사라지므로 force여도 전환하지 않습니다.
+    압축(compact_person)으로 임베딩이 정리된 크롭은 되살리지 않으며, 프로토타입으로 합쳐진 인물은
+    정리된 크롭을 새 모델로 임베딩한 뒤 같은 수의 프로토타입으로 다시 압축합니다.
+    """
+    if profile not in settings.MODEL_PROFILES:
+        raise KeyError(f"알 수 없는 모델 프로필: {profile}")
+
+    source_dir = active_gallery_dir()
+    source_fingerprint = gallery_fingerprint(source_dir)
+    people = list_person_dirs(source_dir)
+    tasks = []
+    skipped = []
+    # 인물 → 다시 만들 프로토타입 수
+    prototype_counts: Dict[str, int] = {}
+    for person in people:
+        live, archived, prototypes = split_face_crops(os.path.join(source_dir, person))
+        groups = [(live, False)]
+        if prototypes and archived:
+            prototype_counts[person] = prototypes
+            groups.append((archived, True))
+        if not any(stems for stems, _ in groups):
+            skipped.append(person)
+            continue
+        zip_path = os.path.join(source_dir, person, CROPS_FILE)
+        for stems, merged in groups:
+            for i in range(0, len(stems), settings.GALLERY_REBUILD_CHUNK):
+                tasks.append((person, zip_path, stems[i:i + settings.GALLERY_REBUILD_CHUNK], merged))
+    total = sum(len(stems) for _, _, stems, _ in tasks)
+
+    version = f"{time.strftime('%Y%m%d_%H%M%S')}_{profile}"
+    versions_dir = os.path.join(settings.KNOWN_FACES_DIR, VERSIONS_DIR)
+    staging = os.path.join(versions_dir, f".tmp_{version}")
+    os.makedirs(staging, exist_ok=True)
+
+    workers = workers or settings.GALLERY_REBUILD_WORKERS or max(1, (os.cpu_count() or 2) // 2)
+    counts: Dict[str, int] = {}
+    merged_embeddings: Dict[str, List[np.ndarray]] = {}
+    failures: Dict[str, List[str]] = {}
+    done = 0
+    cancelled = False
+    start = time.perf_counter()
+
+    try:
+        for person in {task[0] for task in tasks}:
+            os.makedirs(os.path.join(staging, person), exist_ok=True)
+            # 크롭은 다음 재생성을 위해 새 버전에도 복사 (zip에 추가하므로 하드링크는 사용하지 않음)
+            shutil.copy2(os.path.join(source_dir, person, CROPS_FILE), os.path.join(staging, person, CROPS_FILE))
+
+        if tasks:
+            # 서버 프로세스의 스레드/모델 상태를 물려받지 않도록 spawn 사용
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(tasks)), mp_context=context, initializer=_init_worker,
+                initargs=(profile, settings.GALLERY_REBUILD_WORKER_THREADS)
+            ) as pool:
+                futures = {pool.submit(_embed_crops_from_zip, zip_path, stems): (person, stems, merged)
+                           for person, zip_path, stems, merged in tasks}
+                for future in as_completed(futures):
+                    person, stems, merged = futures[future]
+                    try:
+                        names, embeddings, failed = future.result()
+                    except Exception as e:
+                        logger.error(f"갤러리 재생성 워커 오류 ({person}): {e}")
+                        names, embeddings, failed = [], [], stems
+                    if merged:
+                        merged_embeddings.setdefault(person, []).extend(embeddings)
+                    else:
+                        for stem, emb in zip(names, embeddings):
+                            np.save(os.path.join(staging, person, f"{stem}.npy"), emb)
+                        counts[person] = counts.get(person, 0) + len(names)
+                    if failed:
+                        failures.setdefault(person, []).extend(failed)
+                    done += len(stems)
+                    if progress:
+                        progress({"crops": done, "total": total, "embedded": sum(counts.values())})
+                    if should_cancel and should_cancel():
+                        cancelled = True
+                        # with 블록의 shutdown(wait=True)가 실행 중인 청크를 모두 기다리지 않도록 바로 종료
+                        pool.shutdown(wait=False, cancel_futures=True)
+                        break
+
+        if not cancelled:
+            for person, embeddings in merged_embeddings.items():
+                if not embeddings:
+                    continue
+                prototypes = cluster_prototypes(np.stack(embeddings), prototype_counts[person])
+                for i, proto in enumerate(prototypes):
+                    np.save(os.path.join(staging, person, f"{PROTOTYPE_PREFIX}{version}_{i}.npy"),
+                            proto.astype(np.float32))
+                counts[person] = counts.get(person, 0) + len(prototypes)
+
+        if cancelled or not sum(counts.values()):
+            shutil.rmtree(staging, ignore_errors=True)
+        else:
+            with open(os.path.join(staging, VERSION_META_FILE), "w", encoding="utf-8") as f:
+                json.dump({
+                    "profile": profile,
+                    "created_at": time.time(),
+                    "source": os.path.relpath(source_dir, settings.KNOWN_FACES_DIR),
+                    "people": len(counts),
+                    "embeddings": sum(counts.values())
+                }, f, ensure_ascii=False)
+            os.replace(staging, os.path.join(versions_dir, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    elapsed = time.perf_counter() - start
+    created = not cancelled and os.path.isdir(os.path.join(versions_dir, version))
+    # 전환하지 않은 이유 (새 버전은 남겨 두므로 확인 후 /faces/gallery/versions/{version}/activate로 전환 가능)
+    blocked = []
+    if created and activate:
+        if (skipped or failures) and not force:
+            blocked.append("incomplete")
+            logger.warning(f"크롭이 없거나 임베딩에 실패한 인물 {len(set(skipped) | set(failures))}명이 "
+                           f"새 버전에서 빠지므로 {version}을(를) 활성화하지 않습니다. (force로 전환 가능)")
+        if gallery_fingerprint(source_dir) != source_fingerprint:
+            blocked.append("source_changed")
+            logger.warning(f"재생성 중 원본 갤러리가 변경되어 {version}을(를) 활성화하지 않습니다. 다시 실행하세요.")
+    if created and activate and not blocked:
+        # 전환 직후 첫 인식이 모델 로드를 기다리지 않도록 서버 프로세스에서도 미리 로드
+        from services.model_registry import model_registry, INSIGHTFACE_AVAILABLE
+        if INSIGHTFACE_AVAILABLE:
+            model_registry.warmup([profile])
+        activate_gallery_version(version, profile)
+
+    report = {
+        "version": version if created else None,
+        "profile": profile,
+        "activated": created and activate and not blocked,
+        "activation_blocked": blocked,
+        "crops": total,
+        "embedded": sum(counts.values()),
+        "people": counts,
+        "failures": failures,
+        "skipped_people": skipped,
+        "workers": workers,
+        "elapsed_sec": round(elapsed, 3),
+        "crops_per_sec": round(done / elapsed, 2) if elapsed > 0 else 0.0,
+        "cancelled": cancelled
+    }
+    logger.info(
+        f"갤러리 재생성 완료: {version if created else '생성 안 됨'}, 크롭 {total}개 중 {report['embedded']}개 임베딩, "
+        f"크롭 없는 인물 {len(skipped)}명, {report['crops_per_sec']}개/초"
+    )
+    return report
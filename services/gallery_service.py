@@ -0,0 +1,341 @@
+import os
+import cv2
+import json
+import time
+import shutil
+import logging
+import zipfile
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple, Union
+from core.config import settings
+from services.gallery_index import GalleryIndex
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = ".archive"
+# 압축으로 만든 프로토타입 임베딩 파일 이름 접두사 (대응하는 크롭 없음)
+PROTOTYPE_PREFIX = "proto_"
+VERSIONS_DIR = ".versions"
+CURRENT_FILE = "CURRENT"
+VERSION_META_FILE = "version.json"
+CROPS_FILE = "crops.zip"
+# CURRENT 파일이 없을 때 사용하는 갤러리 루트 자체 (버전 도입 이전 구조)
+ROOT_VERSION = "root"
+
+_crops_lock = threading.Lock()
+_current_cache: Dict[str, Any] = {"mtime": None, "info": {}}
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    """행 단위 L2 정규화"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def mark_gallery_changed():
+    """갤러리 루트 mtime 갱신 (탐지 서비스 캐시가 변경을 감지하도록)"""
+    if os.path.exists(settings.KNOWN_FACES_DIR):
+        os.utime(settings.KNOWN_FACES_DIR, None)
+
+def read_current_version() -> Dict[str, Any]:
+    """활성 갤러리 버전 정보 {"version", "profile"} (루트 mtime 기준 캐시)"""
+    root = settings.KNOWN_FACES_DIR
+    mtime = os.path.getmtime(root) if os.path.exists(root) else None
+    if mtime != _current_cache["mtime"]:
+        info = {}
+        try:
+            with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+                info = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"활성 갤러리 버전 읽기 실패: {e}")
+        _current_cache.update(mtime=mtime, info=info)
+    return _current_cache["info"]
+
+def active_gallery_dir() -> str:
+    """현재 인식에 사용하는 갤러리 디렉토리 (버전이 활성화되지 않았으면 루트)"""
+    version = read_current_version().get("version")
+    if not version or version == ROOT_VERSION:
+        return settings.KNOWN_FACES_DIR
+    return os.path.join(settings.KNOWN_FACES_DIR, VERSIONS_DIR, version)
+
+def active_gallery_profile() -> Optional[str]:
+    """활성 갤러리 임베딩을 만든 모델 프로필 (없으면 None = 기본 프로필)"""
+    return read_current_version().get("profile")
+
+def person_dir_path(person_name: str) -> str:
+    return os.path.join(active_gallery_dir(), person_name)
+
+def activate_gallery_version(version: str, profile: Optional[str] = None):
+    """CURRENT 포인터를 원자적으로 교체하여 갤러리 버전 전환"""
+    if version != ROOT_VERSION and not os.path.isdir(os.path.join(settings.KNOWN_FACES_DIR, VERSIONS_DIR, version)):
+        raise FileNotFoundError(f"갤러리 버전이 없습니다: {version}")
+    current = os.path.join(settings.KNOWN_FACES_DIR, CURRENT_FILE)
+    tmp = current + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "profile": profile, "activated_at": time.time()}, f)
+    os.replace(tmp, current)
+    _current_cache["mtime"] = None
+    mark_gallery_changed()
+    logger.info(f"갤러리 버전 전환: {version} (프로필 {profile or settings.DEFAULT_MODEL_PROFILE})")
+
+def list_gallery_versions() -> List[Dict[str, Any]]:
+    """루트와 .versions/의 갤러리 버전 목록"""
+    active = read_current_version().get("version") or ROOT_VERSION
+    versions = [{"version": ROOT_VERSION, "active": active == ROOT_VERSION}]
+    versions_dir = os.path.join(settings.KNOWN_FACES_DIR, VERSIONS_DIR)
+    if os.path.isdir(versions_dir):
+        for name in sorted(os.listdir(versions_dir)):
+            meta_path = os.path.join(versions_dir, name, VERSION_META_FILE)
+            if name.startswith(".") or not os.path.exists(meta_path):
+                continue
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            versions.append({"version": name, "active": active == name, **meta})
+    return versions
+
+def list_person_dirs(gallery_dir: Optional[str] = None) -> List[str]:
+    """갤러리의 인물 디렉토리 목록 (기본: 활성 갤러리)"""
+    gallery_dir = gallery_dir or active_gallery_dir()
+    if not os.path.exists(gallery_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(gallery_dir)
+        if not name.startswith(".") and os.path.isdir(os.path.join(gallery_dir, name))
+    )
+
+def gallery_fingerprint(gallery_dir: str) -> List[Tuple[str, int, int]]:
+    """인물 디렉토리 파일의 (상대 경로, 크기, mtime) 목록 (작업 중 갤러리가 바뀌었는지 비교용)"""
+    entries = []
+    for person in list_person_dirs(gallery_dir):
+        for dirpath, _, filenames in os.walk(os.path.join(gallery_dir, person)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((os.path.relpath(path, gallery_dir), stat.st_size, stat.st_mtime_ns))
+    return sorted(entries)
+
+def encode_crop(crop: np.ndarray) -> bytes:
+    ok, buffer = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, settings.GALLERY_CROP_JPEG_QUALITY])
+    if not ok:
+        raise ValueError("얼굴 크롭 인코딩 실패")
+    return buffer.tobytes()
+
+def save_face_crops(person_dir: str, crops: Dict[str, Union[np.ndarray, bytes]]):
+    """정렬된 얼굴 크롭을 인물 폴더의 crops.zip에 임베딩 파일과 같은 이름(.jpg)으로 추가
+
+    JPEG는 이미 압축되어 있으므로 zip은 무압축으로 저장하며, 모델을 바꿀 때 재등록 없이
+    이 크롭들로 갤러리를 다시 만들 수 있습니다.
+    """
+    if not settings.GALLERY_SAVE_CROPS or not crops:
+        return
+    os.makedirs(person_dir, exist_ok=True)
+    with _crops_lock, zipfile.ZipFile(os.path.join(person_dir, CROPS_FILE), "a", zipfile.ZIP_STORED) as zf:
+        for stem, crop in crops.items():
+            zf.writestr(f"{stem}.jpg", crop if isinstance(crop, bytes) else encode_crop(crop))
+
+def list_face_crops(person_dir: str) -> List[str]:
+    """crops.zip에 저장된 크롭 이름(확장자 제외) 목록"""
+    path = os.path.join(person_dir, CROPS_FILE)
+    if not os.path.exists(path):
+        return []
+    with zipfile.ZipFile(path) as zf:
+        return sorted({os.path.splitext(name)[0] for name in zf.namelist() if name.endswith(".jpg")})
+
+def split_face_crops(person_dir: str) -> Tuple[List[str], List[str], int]:
+    """크롭을 (임베딩 파일이 있는 크롭, 압축으로 임베딩이 정리된 크롭, 프로토타입 수)로 분류"""
+    live, archived = [], []
+    for stem in list_face_crops(person_dir):
+        (live if os.path.exists(os.path.join(person_dir, f"{stem}.npy")) else archived).append(stem)
+    prototypes = sum(1 for f in os.listdir(person_dir) if f.startswith(PROTOTYPE_PREFIX) and f.endswith(".npy"))
+    return live, archived, prototypes
+
+def load_person_embeddings(person_dir: str) -> Tuple[List[str], np.ndarray]:
+    """인물 디렉토리의 .npy 임베딩 파일 목록과 (N, D) float32 행렬"""
+    files = sorted(f for f in os.listdir(person_dir) if f.endswith(".npy"))
+    vectors = []
+    loaded = []
+    for file in files:
+        try:
+            vectors.append(np.load(os.path.join(person_dir, file)).astype(np.float32).flatten())
+            loaded.append(file)
+        except Exception as e:
+            logger.error(f"임베딩 파일 로드 실패 {file}: {e}")
+    if not vectors:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    return loaded, np.stack(vectors)
+
+def deduplicate(embeddings: np.ndarray, threshold: float) -> List[int]:
+    """코사인 유사도가 threshold 이상인 거의 동일한 임베딩 제거 (남길 인덱스 반환)"""
+    if len(embeddings) == 0:
+        return []
+    unit = normalize(embeddings)
+    kept = [0]
+    for i in range(1, len(unit)):
+        if float(np.max(unit[kept] @ unit[i])) < threshold:
+            kept.append(i)
+    return kept
+
+def cluster_prototypes(embeddings: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """구면 k-means로 인물 임베딩을 k개의 프로토타입으로 압축"""
+    unit = normalize(embeddings)
+    if k <= 0 or len(unit) <= k:
+        return unit
+
+    rng = np.random.default_rng(seed)
+    # k-means++ 초기화 (코사인 거리 기준)
+    centers = [unit[rng.integers(len(unit))]]
+    for _ in range(1, k):
+        dist = 1.0 - np.max(unit @ np.stack(centers).T, axis=1)
+        dist = np.clip(dist, 0, None)
+        probs = dist / dist.sum() if dist.sum() > 0 else None
+        centers.append(unit[rng.choice(len(unit), p=probs)])
+    centers = np.stack(centers)
+
+    for _ in range(iterations):
+        assign = np.argmax(unit @ centers.T, axis=1)
+        new_centers = centers.copy()
+        for c in range(k):
+            members = unit[assign == c]
+            if len(members):
+                new_centers[c] = members.mean(axis=0)
+        new_centers = normalize(new_centers)
+        if np.allclose(new_centers, centers):
+            break
+        centers = new_centers
+    return centers
+
+def compact_embeddings(embeddings: np.ndarray, dedup_threshold: float, prototypes: int) -> Tuple[np.ndarray, List[int]]:
+    """중복 제거 후 (선택적으로) 프로토타입 클러스터링. (결과 행렬, 유지된 원본 인덱스) 반환"""
+    kept = deduplicate(embeddings, dedup_threshold)
+    compacted = embeddings[kept]
+    if prototypes > 0 and len(compacted) > prototypes:
+        return cluster_prototypes(compacted, prototypes), []
+    return compacted, kept
+
+def compact_person(person_name: str, dedup_threshold: Optional[float] = None,
+                   prototypes: Optional[int] = None, archive: bool = True,
+                   dry_run: bool = False) -> Dict[str, Any]:
+    """한 인물의 갤러리를 압축. 제거된 파일은 기본적으로 .archive/로 이동"""
+    dedup_threshold = settings.GALLERY_DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold
+    prototypes = settings.GALLERY_PROTOTYPES if prototypes is None else prototypes
+    person_dir = person_dir_path(person_name)
+
+    files, embeddings = load_person_embeddings(person_dir)
+    if not files:
+        return {"person_name": person_name, "before": 0, "after": 0}
+
+    compacted, kept = compact_embeddings(embeddings, dedup_threshold, prototypes)
+    result = {"person_name": person_name, "before": len(files), "after": len(compacted)}
+    if dry_run or len(compacted) == len(files):
+        return result
+
+    if kept:
+        kept_set = set(kept)
+        removed = [f for i, f in enumerate(files) if i not in kept_set]
+    else:
+        # 프로토타입은 새 파일로 저장하고 원본은 모두 정리
+        for i, proto in enumerate(compacted):
+            np.save(os.path.join(person_dir, f"{PROTOTYPE_PREFIX}{int(time.time())}_{i}.npy"), proto.astype(np.float32))
+        removed = files
+
+    archive_dir = os.path.join(person_dir, ARCHIVE_DIR)
+    if archive:
+        os.makedirs(archive_dir, exist_ok=True)
+    for file in removed:
+        path = os.path.join(person_dir, file)
+        if archive:
+            shutil.move(path, os.path.join(archive_dir, file))
+        else:
+            os.remove(path)
+
+    mark_gallery_changed()
+    logger.info(f"갤러리 압축 완료: {person_name} {result['before']} -> {result['after']}")
+    return result
+
+def commit_staged_embeddings(embeddings: Dict[str, List[np.ndarray]], prefix: str,
+                             crops: Optional[Dict[str, List[bytes]]] = None) -> int:
+    """여러 인물의 임베딩을 한 번에 갤러리에 반영
+
+    먼저 숨김 스테이징 디렉토리에 모두 기록한 뒤 같은 파일시스템 안에서 rename으로 옮기고,
+    마지막에 한 번만 갤러리 변경을 알립니다. 기록 중 실패하면 갤러리는 변경되지 않습니다.
+    crops가 있으면 같은 순서의 JPEG 크롭을 인물별 crops.zip에 추가합니다.
+    """
+    gallery_dir = active_gallery_dir()
+    staging = os.path.join(gallery_dir, f".staging_{prefix}")
+    os.makedirs(staging, exist_ok=True)
+    try:
+        staged = []
+        for person, vectors in embeddings.items():
+            os.makedirs(os.path.join(staging, person), exist_ok=True)
+            for i, emb in enumerate(vectors):
+                name = f"{prefix}_{i}.npy"
+                np.save(os.path.join(staging, person, name), np.asarray(emb, dtype=np.float32))
+                staged.append((person, name))
+
+        for person, name in staged:
+            person_dir = os.path.join(gallery_dir, person)
+            os.makedirs(person_dir, exist_ok=True)
+            os.replace(os.path.join(staging, person, name), os.path.join(person_dir, name))
+
+        for person, person_crops in (crops or {}).items():
+            save_face_crops(
+                os.path.join(gallery_dir, person),
+                {f"{prefix}_{i}": crop for i, crop in enumerate(person_crops) if crop is not None}
+            )
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    if staged:
+        mark_gallery_changed()
+    return len(staged)
+
+def _match_all(queries: np.ndarray, gallery: Dict[str, List[np.ndarray]], threshold: float):
+    """탐지 서비스와 같은 갤러리 인덱스로 쿼리를 하나씩 매칭 (결과, 소요 시간)"""
+    index = GalleryIndex.from_dict(gallery)
+    start = time.perf_counter()
+    names = [index.match(q, threshold)[0] for q in queries]
+    return names, time.perf_counter() - start
+
+def evaluate_compaction(dedup_threshold: float, prototypes: int, holdout_every: int = 5,
+                        threshold: Optional[float] = None) -> Dict[str, Any]:
+    """압축 전후 갤러리 크기, 매칭 시간, recall 비교
+
+    인물별로 holdout_every번째 임베딩을 쿼리로 떼어 내고, 나머지로 만든 갤러리를
+    압축 전/후 상태로 각각 매칭하여 top-1 recall을 측정합니다.
+    """
+    threshold = settings.SIMILARITY_THRESHOLD if threshold is None else threshold
+    before: Dict[str, List[np.ndarray]] = {}
+    after: Dict[str, List[np.ndarray]] = {}
+    queries, labels = [], []
+
+    for person in list_person_dirs():
+        _, embeddings = load_person_embeddings(person_dir_path(person))
+        if len(embeddings) < 2:
+            continue
+        mask = np.zeros(len(embeddings), dtype=bool)
+        mask[::holdout_every] = True
+        if mask.all():
+            mask[-1] = False
+        queries.extend(embeddings[mask])
+        labels.extend([person] * int(mask.sum()))
+        before[person] = list(embeddings[~mask])
+        compacted, _ = compact_embeddings(embeddings[~mask], dedup_threshold, prototypes)
+        after[person] = list(compacted)
+
+    report = {
+        "people": len(before),
+        "queries": len(queries),
+        "gallery_size_before": sum(len(v) for v in before.values()),
+        "gallery_size_after": sum(len(v) for v in after.values()),
+    }
+    for key, gallery in (("before", before), ("after", after)):
+        names, elapsed = _match_all(queries, gallery, threshold)
+        hits = sum(1 for name, label in zip(names, labels) if name == label)
+        report[f"recall_{key}"] = hits / len(labels) if labels else 0.0
+        report[f"match_ms_per_query_{key}"] = elapsed * 1000 / len(labels) if labels else 0.0
+    return report
@@ -0,0 +1,144 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+from core.config import settings
+from services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+# 성능 저하 단계 (앞에서부터 차례로 적용하고 역순으로 복구)
+DEGRADE_STEPS = ("stream", "motion_stride", "sample_interval", "det_size")
+
+class LoadShedder:
+    """측정된 단계별 지연 시간과 CPU 부하에 따라 처리 품질을 단계적으로 낮추고 복구하는 제어기
+
+    level 0은 정상 상태이며, level N은 DEGRADE_STEPS의 앞 N개 단계가 적용된 상태입니다.
+    단계 변경 후 LOAD_SHED_HOLD_SEC 동안은 다시 변경하지 않아 상태가 흔들리지 않도록 합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.level = 0
+        self.latency_ms: Dict[str, float] = {}
+        self.cpu_load: Optional[float] = None
+        self.last_evaluated = 0.0
+        self.last_changed = 0.0
+        self.history: List[Dict[str, Any]] = []
+
+    def record(self, stage: str, elapsed_ms: float):
+        """단계별 지연 시간 기록 (지수 이동 평균, 메트릭 히스토그램에도 기록)"""
+        metrics.observe_stage(stage, elapsed_ms / 1000)
+        with self._lock:
+            previous = self.latency_ms.get(stage)
+            self.latency_ms[stage] = elapsed_ms if previous is None else previous * 0.8 + elapsed_ms * 0.2
+
+    @contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    def _read_cpu_load() -> Optional[float]:
+        """1분 평균 부하를 코어 수로 나눈 값 (지원하지 않는 플랫폼에서는 None)"""
+        try:
+            return os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):
+            return None
+
+    def _overloaded_stages(self, ratio: float) -> List[str]:
+        """목표 지연 시간 × ratio를 넘은 단계 목록"""
+        return [
+            stage for stage, target in settings.LOAD_SHED_TARGET_MS.items()
+            if self.latency_ms.get(stage, 0.0) > target * ratio
+        ]
+
+    def evaluate(self, now: Optional[float] = None):
+        """주기적으로 호출되어 필요 시 단계를 한 칸 올리거나 내림"""
+        if not settings.LOAD_SHED_ENABLED:
+            if self.level:
+                self._set_level(0, "비활성화")
+            return
+        now = now or time.time()
+        if now - self.last_evaluated < settings.LOAD_SHED_EVAL_SEC:
+            return
+        self.last_evaluated = now
+        self.cpu_load = self._read_cpu_load()
+
+        with self._lock:
+            slow = self._overloaded_stages(1.0)
+            busy = self.cpu_load is not None and self.cpu_load > settings.LOAD_SHED_CPU_HIGH
+            headroom = not self._overloaded_stages(settings.LOAD_SHED_RECOVER_RATIO) and (
+                self.cpu_load is None or self.cpu_load < settings.LOAD_SHED_CPU_HIGH * settings.LOAD_SHED_RECOVER_RATIO
+            )
+
+        if now - self.last_changed < settings.LOAD_SHED_HOLD_SEC:
+            return
+        if (slow or busy) and self.level < len(DEGRADE_STEPS):
+            reason = f"지연 초과: {', '.join(slow)}" if slow else f"CPU 부하 {self.cpu_load:.2f}"
+            self._set_level(self.level + 1, reason, now)
+        elif headroom and self.level > 0:
+            self._set_level(self.level - 1, "여유 확보", now)
+
+    def _set_level(self, level: int, reason: str, now: Optional[float] = None):
+        previous, self.level = self.level, level
+        self.last_changed = now or time.time()
+        self.history.append({"at": self.last_changed, "from": previous, "to": level, "reason": reason})
+        self.history = self.history[-20:]
+        logger.warning(f"부하 제어 단계 변경 {previous} -> {level} ({reason}) 적용: {self.active_steps}")
+
+    @property
+    def active_steps(self) -> Tuple[str, ...]:
+        return DEGRADE_STEPS[:self.level]
+
+    # 각 단계가 조절하는 값
+
+    @property
+    def stream_fps(self) -> float:
+        return settings.LOAD_SHED_STREAM_FPS if "stream" in self.active_steps else settings.STREAM_MAX_FPS
+
+    @property
+    def stream_quality(self) -> int:
+        return settings.LOAD_SHED_STREAM_QUALITY if "stream" in self.active_steps else settings.STREAM_JPEG_QUALITY
+
+    @property
+    def motion_stride(self) -> int:
+        return settings.LOAD_SHED_MOTION_STRIDE if "motion_stride" in self.active_steps else 1
+
+    @property
+    def sample_interval(self) -> float:
+        factor = settings.LOAD_SHED_SAMPLE_INTERVAL_FACTOR if "sample_interval" in self.active_steps else 1.0
+        return settings.BEST_SHOT_SAMPLE_INTERVAL_SEC * factor
+
+    @property
+    def det_size(self) -> Optional[Tuple[int, int]]:
+        """축소된 탐지 입력 크기 (정상 상태에서는 None = 프로필 기본값)"""
+        return tuple(settings.LOAD_SHED_DET_SIZE) if "det_size" in self.active_steps else None
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            latency = {stage: round(value, 2) for stage, value in self.latency_ms.items()}
+        return {
+            "enabled": settings.LOAD_SHED_ENABLED,
+            "level": self.level,
+            "active_steps": list(self.active_steps),
+            "latency_ms": latency,
+            "targets_ms": settings.LOAD_SHED_TARGET_MS,
+            "cpu_load": self.cpu_load,
+            "decisions": {
+                "stream_fps": self.stream_fps,
+                "stream_quality": self.stream_quality,
+                "motion_stride": self.motion_stride,
+                "sample_interval_sec": self.sample_interval,
+                "det_size": self.det_size
+            },
+            "history": self.history
+        }
+
+# 전역 인스턴스
+load_shedder = LoadShedder()
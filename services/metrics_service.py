@@ -0,0 +1,321 @@
+import math
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Prometheus 텍스트 노출 형식 버전
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 수집 시점 값: (이름, 유형, 설명, [(레이블, 값), ...])
+Sample = Tuple[Dict[str, str], float]
+Family = Tuple[str, str, str, List[Sample]]
+
+def _escape(value: str, quote: bool = True) -> str:
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quote else value
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+class GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+class RateChild:
+    """초당 발생 수 게이지 (window_sec마다 한 번 계산, 호출당 비용은 덧셈과 시각 비교뿐)
+
+    읽을 때 마지막 계산 이후 window_sec 이상 지났으면(발생이 멈춤) 그 사이의 실제 비율을 돌려주므로
+    멈춘 카메라의 fps는 마지막 값에 머물지 않고 0으로 줄어듭니다.
+    """
+    __slots__ = ("_value", "window_sec", "_count", "_since")
+
+    def __init__(self, window_sec: float):
+        self._value = 0.0
+        self.window_sec = window_sec
+        self._count = 0
+        self._since = time.monotonic()
+
+    def tick(self, now: Optional[float] = None):
+        self._count += 1
+        now = now if now is not None else time.monotonic()
+        elapsed = now - self._since
+        if elapsed >= self.window_sec:
+            self._value = self._count / elapsed
+            self._count = 0
+            self._since = now
+
+    @property
+    def value(self) -> float:
+        elapsed = time.monotonic() - self._since
+        if elapsed >= self.window_sec:
+            return self._count / elapsed
+        return self._value
+
+class HistogramChild:
+    """고정 버킷 히스토그램 (관측 시 이진 탐색 한 번과 카운터 증가만 수행, 누적은 노출 시 계산)"""
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class MetricFamily:
+    """이름과 레이블 이름이 같은 메트릭 묶음. labels(...)로 레이블 값별 child를 얻음"""
+
+    def __init__(self, name: str, kind: str, help_text: str, labelnames: Sequence[str], factory: Callable[[], Any]):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Any:
+        """레이블 값별 child (자주 쓰는 child는 호출 측에서 보관해 두면 딕셔너리 조회도 생략됨)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: 레이블 {self.labelnames}가 필요합니다.")
+            with self._lock:
+                child = self._children.setdefault(values, self._factory())
+        return child
+
+    def items(self) -> List[Tuple[Dict[str, str], Any]]:
+        with self._lock:
+            children = list(self._children.items())
+        return [(dict(zip(self.labelnames, values)), child) for values, child in children]
+
+class MetricsRegistry:
+    """의존성 없는 Prometheus 형식 메트릭 레지스트리
+
+    핫 루프에서 기록하는 값(단계별 지연 히스토그램, 캡처 fps, 배치 크기)만 직접 누적하고,
+    큐 길이/폐기 건수/갤러리 크기/모델 로드 시간처럼 각 서비스가 이미 보관하는 값은
+    /metrics 요청 시 수집기(collector)가 읽어 오므로 평소에는 비용이 들지 않습니다.
+    METRICS_ENABLED=False이면 stage 기록은 아무것도 하지 않습니다.
+    """
+
+    def __init__(self):
+        self.enabled = settings.METRICS_ENABLED
+        self._families: Dict[str, MetricFamily] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+        self.stage_seconds = self.histogram(
+            "face_stage_duration_seconds", "파이프라인 단계별 처리 시간", ("stage",), settings.METRICS_LATENCY_BUCKETS
+        )
+        self.batch_size = self.histogram(
+            "face_inference_batch_size", "모델 추론 한 번에 처리한 입력 수", ("model",), settings.METRICS_BATCH_BUCKETS
+        )
+        self.capture_fps = self.rate("face_capture_fps", "카메라별 캡처 프레임레이트", ("camera",))
+        # 단계 이름 → child (핫 루프에서 레이블 조회 생략)
+        self._stages: Dict[str, HistogramChild] = {}
+
+    def _register(self, family: MetricFamily) -> MetricFamily:
+        with self._lock:
+            if family.name in self._families:
+                raise ValueError(f"이미 등록된 메트릭: {family.name}")
+            self._families[family.name] = family
+        return family
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, "counter", help_text, labelnames, CounterChild))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, "gauge", help_text, labelnames, GaugeChild))
+
+    def rate(self, name: str, help_text: str, labelnames: Sequence[str] = (), window_sec: float = 1.0) -> MetricFamily:
+        return self._register(MetricFamily(name, "gauge", help_text, labelnames, lambda: RateChild(window_sec)))
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str], buckets: Sequence[float]) -> MetricFamily:
+        bounds = tuple(sorted(float(b) for b in buckets))
+        return self._register(MetricFamily(name, "histogram", help_text, labelnames, lambda: HistogramChild(bounds)))
+
+    def register_collector(self, collector: Callable[[], Iterable[Family]]):
+        """노출 시 호출되어 (이름, 유형, 설명, 샘플 목록)을 돌려주는 함수 등록"""
+        self._collectors.append(collector)
+
+    # 파이프라인 계측
+
+    def _stage(self, stage: str) -> HistogramChild:
+        child = self._stages.get(stage)
+        if child is None:
+            child = self._stages.setdefault(stage, self.stage_seconds.labels(stage))
+        return child
+
+    def observe_stage(self, stage: str, seconds: float):
+        if self.enabled:
+            self._stage(stage).observe(seconds)
+
+    @contextmanager
+    def time_stage(self, stage: str):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stage(stage).observe(time.perf_counter() - start)
+
+    def observe_batch(self, model: str, size: int):
+        if self.enabled:
+            self.batch_size.labels(model).observe(size)
+
+    def tick_frame(self, camera_id: str):
+        if self.enabled:
+            self.capture_fps.labels(camera_id).tick()
+
+    # 노출
+
+    @staticmethod
+    def _render_family(lines: List[str], name: str, kind: str, help_text: str):
+        lines.append(f"# HELP {name} {_escape(help_text, quote=False)}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def _render_histogram(self, lines: List[str], family: MetricFamily):
+        for labels, child in family.items():
+            with child._lock:
+                counts = list(child.counts)
+                total_sum = child.sum
+            cumulative = 0
+            for bound, count in zip(child.buckets + (math.inf,), counts):
+                cumulative += count
+                le = _format_value(bound)
+                lines.append(f"{family.name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{family.name}_sum{_format_labels(labels)} {_format_value(total_sum)}")
+            lines.append(f"{family.name}_count{_format_labels(labels)} {cumulative}")
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            families = list(self._families.values())
+        for family in families:
+            self._render_family(lines, family.name, family.kind, family.help)
+            if family.kind == "histogram":
+                self._render_histogram(lines, family)
+            else:
+                for labels, child in family.items():
+                    lines.append(f"{family.name}{_format_labels(labels)} {_format_value(child.value)}")
+
+        for collector in self._collectors:
+            try:
+                collected = list(collector())
+            except Exception as e:
+                # 수집기 하나가 실패해도 나머지 메트릭은 노출
+                logger.error(f"메트릭 수집 오류 ({getattr(collector, '__name__', collector)}): {e}")
+                continue
+            for name, kind, help_text, samples in collected:
+                self._render_family(lines, name, kind, help_text)
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+def collect_pipeline() -> List[Family]:
+    """각 서비스가 보관 중인 큐 길이, 폐기 건수, 프레임 수, 갤러리/모델 상태를 노출 시점에 수집"""
+    from services.rtsp_service import rtsp_service
+    from services.recognition_scheduler import recognition_scheduler
+    from services.alert_service import alert_dispatcher
+    from services.event_store import event_store
+    from services.mqtt_outbox import mqtt_outbox
+    from services.dashboard_push_service import dashboard_hub
+    from services.remote_recognition_service import remote_recognizer
+    from services.face_detection_service import face_detection_service
+    from services.model_registry import model_registry
+
+    camera = {"camera": rtsp_service.camera_id}
+    cameras = recognition_scheduler.get_statistics()["cameras"]
+    alerts = alert_dispatcher.get_statistics()
+    outbox = mqtt_outbox.get_statistics()
+    store = event_store.get_statistics()
+    dashboard = dashboard_hub.get_statistics()
+    remote = remote_recognizer.get_statistics()
+
+    families: List[Family] = [
+        ("face_capture_frames_total", "counter", "카메라별 캡처 성공 프레임 수",
+         [(camera, rtsp_service.successful_frames)]),
+        ("face_capture_decode_errors_total", "counter", "카메라별 프레임 읽기/디코딩 실패 수",
+         [(camera, rtsp_service.decode_errors)]),
+        ("face_queue_depth", "gauge", "큐별 대기 항목 수", [
+            ({"queue": "frame"}, rtsp_service.frame_queue.qsize()),
+            ({"queue": "alerts"}, alerts["queue_size"]),
+            ({"queue": "event_store"}, store["queue_size"]),
+            ({"queue": "mqtt_outbox"}, outbox["pending"]),
+            ({"queue": "remote_recognition"}, remote["in_flight"])
+        ]),
+        ("face_recognition_queue_depth", "gauge", "카메라별 인식 대기 작업 수",
+         [({"camera": camera_id}, q["queued"]) for camera_id, q in cameras.items()]),
+        ("face_recognition_in_flight", "gauge", "카메라별 실행 중인 인식 작업 수",
+         [({"camera": camera_id}, q["in_flight"]) for camera_id, q in cameras.items()]),
+        ("face_recognition_dropped_total", "counter", "카메라별 인식 작업 폐기 수 (마감 초과, 대기열 초과)",
+         [({"camera": camera_id, "reason": reason}, q[f"dropped_{reason}"])
+          for camera_id, q in cameras.items() for reason in ("stale", "overflow")]),
+        ("face_dropped_total", "counter", "구성 요소별 폐기된 항목 수", [
+            ({"source": "alerts", "reason": "overflow"}, alerts.get("dropped", 0)),
+            ({"source": "event_store", "reason": "overflow"}, store["dropped"]),
+            ({"source": "mqtt_outbox", "reason": "overflow"}, outbox["dropped_overflow"]),
+            ({"source": "mqtt_outbox", "reason": "rejected"}, outbox["rejected"]),
+            ({"source": "dashboard", "reason": "slow_client"}, dashboard["dropped"]),
+            ({"source": "remote_recognition", "reason": "timeout"}, remote["jobs_timed_out"])
+        ]),
+        ("face_mqtt_published_total", "counter", "스풀에서 브로커로 발행 완료된 메시지 수",
+         [({}, outbox["published"])]),
+        ("face_model_load_seconds", "gauge", "모델 프로필별 마지막 로드 시간",
+         [({"profile": name}, status["load_time_sec"]) for name, status in model_registry.get_status().items()])
+    ]
+
+    # 갤러리는 이미 로드된 경우에만 노출 (수집 때문에 디스크를 읽지 않음)
+    gallery = face_detection_service._known_faces_cache
+    if gallery is not None:
+        families += [
+            ("face_gallery_embeddings", "gauge", "갤러리 임베딩 수", [({}, gallery.size)]),
+            ("face_gallery_identities", "gauge", "갤러리 인물 수", [({}, len(gallery.names))]),
+            ("face_gallery_bytes", "gauge", "갤러리 인덱스 메모리 크기", [({"dtype": gallery.dtype}, gallery.nbytes)])
+        ]
+    return families
+
+# 전역 인스턴스
+metrics = MetricsRegistry()
+metrics.register_collector(collect_pipeline)
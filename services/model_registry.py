@@ -0,0 +1,195 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+from core.config import settings, ModelProfile
+
+try:
+    import onnxruntime
+    from insightface.app import FaceAnalysis
+    INSIGHTFACE_AVAILABLE = True
+except ImportError:
+    onnxruntime = None
+    FaceAnalysis = None
+    INSIGHTFACE_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+def build_session_options(profile: ModelProfile):
+    """프로필 설정으로 onnxruntime SessionOptions 생성"""
+    options = onnxruntime.SessionOptions()
+    level = GRAPH_OPTIMIZATION_LEVELS.get(profile.graph_optimization_level)
+    if level is None:
+        raise ValueError(f"알 수 없는 그래프 최적화 수준: {profile.graph_optimization_level}")
+    options.graph_optimization_level = getattr(onnxruntime.GraphOptimizationLevel, level)
+    if profile.intra_op_threads > 0:
+        options.intra_op_num_threads = profile.intra_op_threads
+    if profile.inter_op_threads > 0:
+        options.inter_op_num_threads = profile.inter_op_threads
+    return options
+
+class ModelRegistry:
+    """프로세스 전역 모델 레지스트리
+
+    프로필마다 FaceAnalysis를 한 번만 로드하고, 탐지/학습 서비스와 라우터가
+    같은 인스턴스를 공유합니다. 사용 중인 모델은 참조 카운트로 추적하며,
+    메모리가 부족한 장치에서는 unload()로 명시적으로 해제할 수 있습니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._models: Dict[str, Any] = {}
+        self._refcounts: Dict[str, int] = {}
+        self._load_times: Dict[str, float] = {}
+
+    def get_profile(self, profile: Optional[str] = None) -> ModelProfile:
+        """프로필 이름으로 설정을 조회"""
+        profile = profile or settings.DEFAULT_MODEL_PROFILE
+        if profile not in settings.MODEL_PROFILES:
+            raise KeyError(f"알 수 없는 모델 프로필: {profile}")
+        return settings.MODEL_PROFILES[profile]
+
+    def _apply_session_options(self, app: Any, profile: ModelProfile, providers: List[str]):
+        """세션 옵션 적용 및 탐지/인식 모델 파일 교체
+
+        insightface의 model_zoo는 세션 옵션을 전달하지 않으므로
+        같은 입출력을 가진 세션을 프로필 설정으로 다시 생성합니다.
+        """
+        overrides = {"detection": profile.det_model_file, "recognition": profile.rec_model_file}
+        options = build_session_options(profile)
+        for taskname, model in app.models.items():
+            model_file = overrides.get(taskname)
+            model_file = os.path.expanduser(model_file) if model_file else model.model_file
+            if not os.path.exists(model_file):
+                raise FileNotFoundError(f"모델 파일이 없습니다: {model_file} (tools/optimize_models.py로 생성)")
+            model.session = onnxruntime.InferenceSession(model_file, sess_options=options, providers=providers)
+            model.model_file = model_file
+
+    def _build(self, profile: ModelProfile, providers: List[str], ctx_id: int) -> Any:
+        app = FaceAnalysis(
+            name=profile.name,
+            root=os.path.expanduser(profile.root),
+            allowed_modules=profile.allowed_modules,
+            providers=providers
+        )
+        self._apply_session_options(app, profile, providers)
+        app.prepare(ctx_id=ctx_id, det_size=tuple(profile.det_size))
+        return app
+
+    def _create_app(self, profile: ModelProfile) -> Any:
+        """FaceAnalysis 생성 (GPU 실패 시 CPU로 재시도)"""
+        try:
+            return self._build(profile, profile.providers, profile.ctx_id)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            logger.error(f"FaceAnalysis 모델 로드 실패: {e}")
+            app = self._build(profile, ["CPUExecutionProvider"], -1)
+            logger.info("CPU 모드로 FaceAnalysis 모델이 로드되었습니다.")
+            return app
+
+    def get(self, profile: Optional[str] = None) -> Any:
+        """모델을 (필요하면 로드해서) 반환. 참조 카운트는 변경하지 않음"""
+        if not INSIGHTFACE_AVAILABLE:
+            raise ImportError("InsightFace가 설치되지 않았습니다.")
+
+        profile = profile or settings.DEFAULT_MODEL_PROFILE
+        app = self._models.get(profile)
+        if app is not None:
+            return app
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(profile, threading.Lock())
+
+        # 같은 프로필을 동시에 두 번 로드하지 않도록 프로필별 잠금
+        with load_lock:
+            app = self._models.get(profile)
+            if app is None:
+                config = self.get_profile(profile)
+                start = time.perf_counter()
+                app = self._create_app(config)
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._models[profile] = app
+                    self._load_times[profile] = elapsed
+                logger.info(f"모델 프로필 '{profile}' 로드 완료 ({elapsed:.2f}초)")
+        return app
+
+    def acquire(self, profile: Optional[str] = None) -> Any:
+        """모델을 가져오고 참조 카운트 증가"""
+        profile = profile or settings.DEFAULT_MODEL_PROFILE
+        app = self.get(profile)
+        with self._lock:
+            self._refcounts[profile] = self._refcounts.get(profile, 0) + 1
+        return app
+
+    def release(self, profile: Optional[str] = None):
+        """참조 카운트 감소"""
+        profile = profile or settings.DEFAULT_MODEL_PROFILE
+        with self._lock:
+            count = self._refcounts.get(profile, 0)
+            if count <= 0:
+                logger.warning(f"모델 프로필 '{profile}'의 참조 카운트가 이미 0입니다.")
+                return
+            self._refcounts[profile] = count - 1
+
+    @contextmanager
+    def use(self, profile: Optional[str] = None):
+        """참조 카운트를 관리하는 컨텍스트 매니저"""
+        app = self.acquire(profile)
+        try:
+            yield app
+        finally:
+            self.release(profile)
+
+    def warmup(self, profiles: Optional[Iterable[str]] = None):
+        """지정된 프로필을 미리 로드"""
+        for profile in profiles or [settings.DEFAULT_MODEL_PROFILE]:
+            self.get(profile)
+
+    def unload(self, profile: Optional[str] = None, force: bool = False) -> bool:
+        """모델 해제. 사용 중이면 force=True일 때만 해제"""
+        profile = profile or settings.DEFAULT_MODEL_PROFILE
+        with self._lock:
+            if profile not in self._models:
+                return False
+            in_use = self._refcounts.get(profile, 0)
+            if in_use > 0 and not force:
+                logger.warning(f"모델 프로필 '{profile}'이 사용 중입니다 (참조 {in_use}개).")
+                return False
+            del self._models[profile]
+            self._load_times.pop(profile, None)
+        logger.info(f"모델 프로필 '{profile}' 해제 완료")
+        return True
+
+    def is_loaded(self, profile: Optional[str] = None) -> bool:
+        return (profile or settings.DEFAULT_MODEL_PROFILE) in self._models
+
+    def get_status(self) -> Dict[str, Any]:
+        """프로필별 로드 상태 반환"""
+        with self._lock:
+            return {
+                name: {
+                    "model": config.name,
+                    "providers": config.providers,
+                    "det_model_file": config.det_model_file,
+                    "rec_model_file": config.rec_model_file,
+                    "loaded": name in self._models,
+                    "refcount": self._refcounts.get(name, 0),
+                    "load_time_sec": self._load_times.get(name)
+                }
+                for name, config in settings.MODEL_PROFILES.items()
+            }
+
+# 전역 인스턴스
+model_registry = ModelRegistry()
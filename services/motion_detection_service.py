@@ -18,6 +18,7 @@ class MotionDetectionService:
         self.motion_callbacks = []
         self.last_motion_time = None
         self.motion_cooldown = 3  # 3초 쿨다운
+        self.last_motion_boxes = []  # 최근 프레임의 움직임 영역 (x, y, w, h)
         
     def add_motion_callback(self, callback: Callable):
         """움직임 감지 콜백 추가"""
@@ -48,16 +49,19 @@ class MotionDetectionService:
             
             motion_detected = False
             motion_frame = frame.copy()
+            motion_boxes = []
             
             for contour in contours:
                 area = cv2.contourArea(contour)
                 if area > 500:  # 최소 면적 임계값
                     motion_detected = True
                     x, y, w, h = cv2.boundingRect(contour)
+                    motion_boxes.append((x, y, w, h))
                     cv2.rectangle(motion_frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
                     cv2.putText(motion_frame, "Motion Detected", (10, 30), 
                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
             
+            self.last_motion_boxes = motion_boxes
             return motion_detected, motion_frame
             
         except Exception as e:
@@ -0,0 +1,106 @@
+import json
+import time
+import base64
+import logging
+from typing import Any, Dict, Optional, Union
+from core.config import settings
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+logger = logging.getLogger(__name__)
+
+# 압축 알림 스키마 버전 (키를 바꾸거나 의미가 달라지면 올림, 필드 추가만으로는 올리지 않음)
+#   v   스키마 버전            ts  발행 시각 (epoch ms)
+#   cam 카메라 ID              p   사람 감지 여부
+#   c   최고 신뢰도 (x1000 정수) ids 식별자 목록 (등록 이름 또는 미등록 클러스터 ID)
+#   box 얼굴 박스 [[x1, y1, x2, y2], ...]
+#   n   병합된 이벤트 수        fs/ls 구간의 처음/마지막 감지 시각 (epoch ms)
+#   co  병합 요약 여부          th  썸네일 참조 경로 (이미지 자체는 싣지 않음)
+#   cap 발행을 일으킨 프레임의 캡처 시각 (epoch ms, ts와의 차이가 파이프라인 지연)
+SCHEMA_VERSION = 1
+
+JSON = "json"
+MSGPACK = "msgpack"
+CBOR = "cbor"
+
+_warned = set()
+
+def _available(encoding: str) -> bool:
+    return (encoding == MSGPACK and msgpack is not None) or (encoding == CBOR and cbor2 is not None)
+
+def topic_encoding(topic: str) -> str:
+    """토픽별 페이로드 인코딩 (MQTT_TOPIC_ENCODING > MQTT_PAYLOAD_ENCODING, 라이브러리가 없으면 JSON)"""
+    encoding = settings.MQTT_TOPIC_ENCODING.get(topic, settings.MQTT_PAYLOAD_ENCODING).lower()
+    if encoding == JSON or _available(encoding):
+        return encoding
+    if encoding not in _warned:
+        _warned.add(encoding)
+        logger.warning(f"MQTT 페이로드 인코딩 '{encoding}'을(를) 사용할 수 없어 JSON으로 발행합니다. "
+                       f"(pip install msgpack 또는 cbor2)")
+    return JSON
+
+def _ms(ts: Optional[float]) -> Optional[int]:
+    return int(ts * 1000) if ts is not None else None
+
+def compact_alert(data: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+    """알림 데이터를 압축 스키마로 변환 (값이 없는 선택 필드는 생략)"""
+    compact = {
+        "v": SCHEMA_VERSION,
+        "ts": _ms(now or time.time()),
+        "cam": data.get("location", "unknown"),
+        "p": bool(data.get("person_detected", False)),
+        "c": int(round(float(data.get("confidence", 0.0)) * 1000)),
+        "ids": list(data.get("identities", []))
+    }
+    optional = {
+        "box": [list(map(int, box)) for box in data["bboxes"]] if data.get("bboxes") else None,
+        "n": data.get("event_count"),
+        "fs": _ms(data.get("first_seen")),
+        "ls": _ms(data.get("last_seen")),
+        "cap": _ms(data.get("captured_at")),
+        "co": data.get("coalesced"),
+        "th": data.get("thumbnail")
+    }
+    compact.update({key: value for key, value in optional.items() if value is not None})
+    return compact
+
+def dumps(encoding: str, data: Dict[str, Any]) -> Union[str, bytes]:
+    """임의의 맵을 인코딩 (바이트 필드는 pack_bytes로 감싸서 넣을 것)"""
+    if encoding == MSGPACK:
+        return msgpack.packb(data, use_bin_type=True)
+    if encoding == CBOR:
+        return cbor2.dumps(data)
+    return json.dumps(data)
+
+def pack_bytes(encoding: str, value: bytes) -> Union[str, bytes]:
+    """바이너리 인코딩은 바이트 그대로, JSON은 base64 문자열로"""
+    return value if encoding in (MSGPACK, CBOR) else base64.b64encode(value).decode("ascii")
+
+def unpack_bytes(value: Union[str, bytes]) -> bytes:
+    return base64.b64decode(value) if isinstance(value, str) else bytes(value)
+
+def encode_payload(encoding: str, legacy: Dict[str, Any], compact: Dict[str, Any]) -> Union[str, bytes]:
+    """JSON이면 기존 형식을 그대로, 바이너리 인코딩이면 압축 스키마를 직렬화"""
+    return dumps(encoding, legacy if encoding == JSON else compact)
+
+def decode_payload(payload: Union[str, bytes]) -> Dict[str, Any]:
+    """구독 측 도구용: JSON, MessagePack, CBOR 페이로드를 자동 판별하여 디코딩"""
+    if isinstance(payload, str):
+        return json.loads(payload)
+    head = payload[:1]
+    if head in (b"{", b"["):
+        return json.loads(payload)
+    # 압축 스키마는 맵이므로 첫 바이트로 구분 (msgpack fixmap 0x80-0x8f/map16/map32, CBOR map 0xa0-0xbb)
+    if msgpack is not None and (0x80 <= payload[0] <= 0x8f or payload[0] in (0xde, 0xdf)):
+        return msgpack.unpackb(payload, raw=False)
+    if cbor2 is not None and 0xa0 <= payload[0] <= 0xbb:
+        return cbor2.loads(payload)
+    raise ValueError("알 수 없는 MQTT 페이로드 형식")
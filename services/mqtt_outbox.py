@@ -0,0 +1,291 @@
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+from core.config import settings
+from services.metrics_service import metrics
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    topic TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    qos INTEGER NOT NULL,
+    retain INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+class MQTTOutbox:
+    """MQTT 발행용 디스크 스풀 (브로커 장애 시에도 메시지를 잃지 않음)
+
+    모든 발행은 먼저 SQLite(WAL) 스풀에 순번과 함께 기록되고, 앱 이벤트 루프의 배출 태스크가
+    연결되어 있을 때만 순번 순서대로 MQTT_OUTBOX_BATCH개씩 발행합니다. QoS 1 이상이면 배치의
+    PUBACK을 모두 받은 뒤에 스풀에서 삭제하므로 프로세스가 재시작되어도 최소 한 번 전달됩니다.
+    스풀은 개수/용량 상한이 있고 넘치면 MQTT_OUTBOX_OVERFLOW 정책(drop_oldest, reject)을 따릅니다.
+
+    SQLite 기록/조회/삭제는 스풀 전용 스레드 하나에서 실행하므로 이벤트 루프를 막지 않고,
+    제출 순서대로 기록되어 발행 순서가 유지됩니다 (루프에서는 enqueue_async 사용).
+
+    로컬 브로커로 확인하는 방법: mosquitto를 멈춘 상태에서 이벤트를 발생시키면 /mqtt/outbox의
+    pending이 늘어나고, 다시 시작하면 재연결 후 순서대로 배출되어 0으로 돌아옵니다.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.MQTT_OUTBOX_PATH
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client = None
+        self._stopping = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mqtt-outbox")
+        self.pending = 0
+        self.pending_bytes = 0
+        self.connected = False
+        self.stats = {"enqueued": 0, "published": 0, "dropped_overflow": 0, "rejected": 0,
+                      "batches": 0, "last_batch_size": 0, "publish_errors": 0, "ack_timeouts": 0,
+                      "disconnects": 0, "last_drain_at": None}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self.pending, self.pending_bytes = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM outbox"
+            ).fetchone()
+            if self.pending:
+                logger.info(f"MQTT 스풀에 이전 실행의 미발행 메시지 {self.pending}개가 있습니다.")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def topic_qos(topic: str) -> int:
+        return settings.MQTT_TOPIC_QOS.get(topic, settings.MQTT_OUTBOX_QOS)
+
+    def enqueue(self, topic: str, payload: Union[str, bytes], qos: Optional[int] = None,
+                retain: bool = False) -> bool:
+        """스풀에 메시지 추가 후 배출 태스크를 깨움. 상한 초과로 거부되면 False"""
+        data = payload.encode("utf-8") if isinstance(payload, str) else bytes(payload)
+        qos = self.topic_qos(topic) if qos is None else qos
+        with self._lock:
+            conn = self._db()
+            if not self._make_room(conn, len(data)):
+                self.stats["rejected"] += 1
+                return False
+            conn.execute(
+                "INSERT INTO outbox (topic, payload, qos, retain, created_at) VALUES (?, ?, ?, ?, ?)",
+                (topic, data, qos, int(retain), time.time())
+            )
+            self.pending += 1
+            self.pending_bytes += len(data)
+            self.stats["enqueued"] += 1
+        self._notify()
+        return True
+
+    async def enqueue_async(self, topic: str, payload: Union[str, bytes], qos: Optional[int] = None,
+                            retain: bool = False) -> bool:
+        """이벤트 루프에서 사용하는 enqueue (SQLite 기록은 스풀 스레드에서 실행)"""
+        return await self._in_spool_thread(self.enqueue, topic, payload, qos, retain)
+
+    async def _in_spool_thread(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _make_room(self, conn: sqlite3.Connection, size: int) -> bool:
+        """상한을 넘으면 정책에 따라 오래된 메시지를 버리거나 거부 (호출 시 _lock 보유)"""
+        over_count = self.pending + 1 - settings.MQTT_OUTBOX_MAX_MESSAGES
+        over_bytes = self.pending_bytes + size - settings.MQTT_OUTBOX_MAX_BYTES
+        if over_count <= 0 and over_bytes <= 0:
+            return True
+        if settings.MQTT_OUTBOX_OVERFLOW != "drop_oldest":
+            return False
+
+        dropped, freed = 0, 0
+        for seq, length in conn.execute("SELECT seq, LENGTH(payload) FROM outbox ORDER BY seq"):
+            if dropped >= over_count and freed >= over_bytes:
+                break
+            dropped += 1
+            freed += length
+            last_seq = seq
+        if dropped < over_count or freed < over_bytes:
+            return False
+        conn.execute("DELETE FROM outbox WHERE seq <= ?", (last_seq,))
+        self.pending -= dropped
+        self.pending_bytes -= freed
+        self.stats["dropped_overflow"] += dropped
+        logger.warning(f"MQTT 스풀 상한 초과: 오래된 메시지 {dropped}개 삭제")
+        return True
+
+    def _notify(self):
+        """다른 스레드에서 호출되어도 안전하게 배출 태스크를 깨움"""
+        if self._wake is None or self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wake.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def set_connected(self, connected: bool):
+        """mqtt_handler의 연결/해제 콜백에서 호출"""
+        if self.connected and not connected:
+            self.stats["disconnects"] += 1
+            logger.warning(f"MQTT 연결 끊김: 재연결될 때까지 스풀에 보관 (대기 {self.pending}개)")
+        elif connected and not self.connected and self.pending:
+            logger.info(f"MQTT 재연결: 스풀 메시지 {self.pending}개 배출 시작")
+        self.connected = connected
+        if connected:
+            self._notify()
+
+    def start(self, client):
+        """앱 이벤트 루프에서 배출 태스크 시작 (client: FastMQTT 인스턴스)"""
+        self._client = client
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        with self._lock:
+            self._db()
+        if self._task is None or self._task.done():
+            self._task = self._loop.create_task(self._run())
+
+    async def stop(self, timeout: float = 3.0):
+        """연결되어 있으면 남은 메시지를 가능한 만큼 발행하고 종료 (나머지는 다음 실행에서 배출)"""
+        if self._task is None:
+            return
+        # wait_for()는 대기 대상이 막 완료된 순간의 취소를 삼킬 수 있으므로 종료 플래그도 함께 사용
+        self._stopping = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        try:
+            await asyncio.wait_for(self._drain_all(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _is_connected(self) -> bool:
+        client = getattr(self._client, "client", None)
+        return bool(client is not None and getattr(client, "is_connected", False))
+
+    def _fetch_batch(self) -> List[Tuple[int, str, bytes, int, int, float]]:
+        with self._lock:
+            return self._db().execute(
+                "SELECT seq, topic, payload, qos, retain, created_at FROM outbox ORDER BY seq LIMIT ?",
+                (settings.MQTT_OUTBOX_BATCH,)
+            ).fetchall()
+
+    def _ack(self, rows: List[Tuple[int, str, bytes, int, int, float]]):
+        """발행 확인된 행 삭제. 배출 중 _make_room이 이미 지운 행이 있을 수 있으므로 실제 삭제분만 차감"""
+        with self._lock:
+            conn = self._db()
+            count, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM outbox WHERE seq <= ?", (rows[-1][0],)
+            ).fetchone()
+            conn.execute("DELETE FROM outbox WHERE seq <= ?", (rows[-1][0],))
+            self.pending = max(0, self.pending - count)
+            self.pending_bytes = max(0, self.pending_bytes - size)
+
+    async def _wait_acks(self) -> bool:
+        """QoS 1/2 메시지의 PUBACK/PUBCOMP 대기 (클라이언트가 미확인 메시지 저장소를 제공하는 경우)"""
+        storage = getattr(getattr(self._client, "client", None), "_persistent_storage", None)
+        if storage is None or not hasattr(storage, "wait_empty"):
+            return True
+        try:
+            await asyncio.wait_for(storage.wait_empty(), settings.MQTT_OUTBOX_ACK_TIMEOUT_SEC)
+            return True
+        except asyncio.TimeoutError:
+            self.stats["ack_timeouts"] += 1
+            return False
+
+    async def _drain_batch(self) -> int:
+        """스풀 앞쪽부터 한 배치 발행. 발행한 개수 반환 (0이면 더 보낼 것이 없거나 연결 없음)"""
+        if not self._is_connected():
+            return 0
+        rows = await self._in_spool_thread(self._fetch_batch)
+        if not rows:
+            return 0
+
+        sent = []
+        for row in rows:
+            _, topic, payload, qos, retain, _ = row
+            try:
+                self._client.publish(topic, payload, qos=qos, retain=bool(retain))
+            except Exception as e:
+                # 연결이 끊긴 경우 등: 이 메시지부터 다음 배출에서 다시 시도 (순서 유지)
+                self.stats["publish_errors"] += 1
+                logger.warning(f"MQTT 발행 실패, 스풀에 보관: {e}")
+                break
+            sent.append(row)
+        if not sent:
+            return 0
+        if any(row[3] > 0 for row in sent) and not await self._wait_acks():
+            # 확인 응답이 없으면 스풀에 남겨 다시 발행 (최소 한 번 전달, 중복 가능)
+            return 0
+
+        await self._in_spool_thread(self._ack, sent)
+        # 발행 단계 지연: 스풀 추가 → 브로커 확인 응답 (연결이 끊긴 동안 스풀에 머문 시간 포함)
+        acked_at = time.time()
+        for row in sent:
+            metrics.observe_stage("publish", acked_at - row[5])
+        self.stats["published"] += len(sent)
+        self.stats["batches"] += 1
+        self.stats["last_batch_size"] = len(sent)
+        self.stats["last_drain_at"] = time.time()
+        return len(sent)
+
+    async def _drain_all(self):
+        while await self._drain_batch():
+            pass
+
+    async def _run(self):
+        while not self._stopping:
+            # 배출 전에 초기화해야 배출 중에 추가된 메시지의 알림을 놓치지 않음
+            self._wake.clear()
+            try:
+                sent = await self._drain_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"MQTT 스풀 배출 오류: {e}")
+                sent = 0
+
+            if sent and self.pending:
+                # 재연결 직후 대량 배출 시 브로커/구독자를 압도하지 않도록 초당 발행 수 제한
+                await asyncio.sleep(sent / settings.MQTT_OUTBOX_MAX_RATE)
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.MQTT_OUTBOX_RETRY_SEC)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "pending": self.pending,
+            "pending_bytes": self.pending_bytes,
+            "connected": self._is_connected(),
+            "path": self.path,
+            "running": self._task is not None and not self._task.done()
+        }
+
+# 전역 인스턴스
+mqtt_outbox = MQTTOutbox()
@@ -1,7 +1,9 @@
-from mqtt_handler import mqtt
+from services.mqtt_outbox import mqtt_outbox
+from services.mqtt_codec import topic_encoding, compact_alert, encode_payload
 from fastapi import HTTPException
 import time
 import json
+import logging
 
 #복호화키를 불려오기 위한 패키지
 from Crypto.PublicKey import RSA  # 오타 수정: Crypdeto -> Crypto
@@ -9,6 +11,11 @@ from Crypto.Cipher import PKCS1_OAEP
 import base64
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
+# 알림 단계(병합/억제)에서 추가하는 선택 필드
+ALERT_EXTRA_FIELDS = ("identity", "event_count", "first_seen", "last_seen", "coalesced", "bboxes", "thumbnail")
+
 class MQTTService:
     @staticmethod
     async def publish_message(topic, message, password):
@@ -18,7 +25,8 @@ class MQTTService:
                 "message": message,
                 "time_Alert":  time.strftime('%c', time.localtime(time.time()))  # 오타 수정: time_Arlet -> time_Alert
             }
-            mqtt.publish(topic, json.dumps(json_data))
+            if not await mqtt_outbox.enqueue_async(topic, json.dumps(json_data)):
+                return {"result": False, "message": "Outbox full"}
             return {"result": True, "message": "Published"}
         else:
           raise HTTPException(status_code=503, detail="Service Unavailable: Invalid password")            
@@ -33,30 +41,44 @@ class MQTTService:
         """
         try:
             topic = "sensors/motion_face_detection"
+            now = time.time()
             
             # 기본값 설정
             location = sensor_data.get("location", "unknown") if sensor_data else "unknown"
             person_detected = sensor_data.get("person_detected", False) if sensor_data else False
             confidence = sensor_data.get("confidence", 0.0) if sensor_data else 0.0
+            identities = sensor_data.get("identities", []) if sensor_data else []
             
             json_data = {
                 "event_type": "motion_and_face_detection",
                 "location": location,
                 "person_detected": person_detected,
                 "confidence": confidence,
-                "timestamp": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time())),
+                "identities": identities,
+                "timestamp": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now)),
+                "published_at_ms": int(now * 1000),
                 "alert_level": "high" if person_detected else "medium",
                 "message": f"Motion detected at {location}" + (" with person identified" if person_detected else " without person identification")
             }
+            # 지연 측정용 프레임 캡처 시각 (mqtt/mqtt_monitor.py가 수신 시각과 비교)
+            if sensor_data and sensor_data.get("captured_at") is not None:
+                json_data["captured_at_ms"] = int(sensor_data["captured_at"] * 1000)
+            for field in ALERT_EXTRA_FIELDS:
+                if sensor_data and sensor_data.get(field) is not None:
+                    json_data[field] = sensor_data[field]
             
-            mqtt.publish(topic, json.dumps(json_data))
-            print(f"Motion and face detection alert published to topic: {topic}")
-            print(f"Data: {json.dumps(json_data, indent=2)}")
+            # 토픽별 인코딩: JSON은 기존 형식 유지, msgpack/cbor는 버전이 있는 압축 스키마
+            encoding = topic_encoding(topic)
+            payload = encode_payload(encoding, json_data, compact_alert(sensor_data or {}, now))
+            # 디스크 스풀에 기록하면 연결 상태와 관계없이 배출 태스크가 순서대로 발행
+            if not await mqtt_outbox.enqueue_async(topic, payload):
+                return {"result": False, "message": "MQTT outbox is full"}
+            logger.debug(f"움직임/얼굴 알림 발행 대기열 추가: {topic} ({encoding}, {len(payload)}B)")
             
             return {"result": True, "message": "Motion and face detection alert published successfully"}
             
         except Exception as e:
-            print(f"Failed to publish motion and face detection alert: {e}")
+            logger.error(f"움직임/얼굴 알림 발행 실패: {e}")
             return {"result": False, "message": f"Failed to publish: {str(e)}"}
 
     @staticmethod  # 데코레이터 추가
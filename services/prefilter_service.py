@@ -0,0 +1,100 @@
+import cv2
+import logging
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class FacePrefilter:
+    """InsightFace 실행 전 얼굴 후보 여부를 빠르게 판단하는 CPU 1차 필터
+
+    Haar cascade를 스레드별로 한 번만 로드하고, 움직임 영역만 축소해서 검사합니다.
+    모드: off(사용 안 함), shadow(통계만 수집, 무거운 추론은 항상 실행), enforce(후보가 없으면 건너뜀)
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.passed = 0
+        self.rejected = 0
+        self.missed = 0
+
+    def _get_cascade(self) -> cv2.CascadeClassifier:
+        # CascadeClassifier는 스레드 안전하지 않으므로 스레드마다 캐시
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(cv2.data.haarcascades + settings.PREFILTER_CASCADE)
+            if cascade.empty():
+                raise RuntimeError(f"cascade 파일 로드 실패: {settings.PREFILTER_CASCADE}")
+            self._local.cascade = cascade
+        return cascade
+
+    def _regions(self, image: np.ndarray, motion_boxes: Optional[List[Tuple[int, int, int, int]]]):
+        """검사할 영역 (움직임 박스를 여유 있게 확장, 없으면 전체 프레임)"""
+        height, width = image.shape[:2]
+        if not motion_boxes:
+            return [(0, 0, width, height)]
+        boxes = sorted(motion_boxes, key=lambda b: b[2] * b[3], reverse=True)[:settings.PREFILTER_MAX_REGIONS]
+        regions = []
+        for x, y, w, h in boxes:
+            margin = int(max(w, h) * 0.25)
+            x1, y1 = max(0, x - margin), max(0, y - margin)
+            x2, y2 = min(width, x + w + margin), min(height, y + h + margin)
+            regions.append((x1, y1, x2 - x1, y2 - y1))
+        return regions
+
+    def detect(self, image: np.ndarray, motion_boxes=None) -> List[Tuple[int, int, int, int]]:
+        """축소한 영역에서 얼굴 후보 박스 (x, y, w, h)를 원본 좌표로 반환"""
+        cascade = self._get_cascade()
+        candidates = []
+        for rx, ry, rw, rh in self._regions(image, motion_boxes):
+            if rw <= 0 or rh <= 0:
+                continue
+            region = image[ry:ry + rh, rx:rx + rw]
+            scale = min(1.0, settings.PREFILTER_MAX_SIDE / float(max(rw, rh)))
+            if scale < 1.0:
+                region = cv2.resize(region, (int(rw * scale), int(rh * scale)), interpolation=cv2.INTER_AREA)
+            gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY) if region.ndim == 3 else region
+            gray = cv2.equalizeHist(gray)
+            min_size = max(12, int(settings.PREFILTER_MIN_FACE_SIZE * scale))
+            faces = cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=4, minSize=(min_size, min_size))
+            for (x, y, w, h) in faces:
+                candidates.append((
+                    int(rx + x / scale), int(ry + y / scale), int(w / scale), int(h / scale)
+                ))
+        return candidates
+
+    def check(self, image: np.ndarray, motion_boxes=None) -> bool:
+        """얼굴 후보가 있는지 확인하고 통과/거부 카운터 갱신"""
+        try:
+            passed = bool(self.detect(image, motion_boxes))
+        except Exception as e:
+            logger.error(f"1차 필터 오류: {e}")
+            passed = True
+        with self._lock:
+            if passed:
+                self.passed += 1
+            else:
+                self.rejected += 1
+        return passed
+
+    def record_miss(self):
+        """shadow 모드에서 필터는 거부했지만 InsightFace가 얼굴을 찾은 경우"""
+        with self._lock:
+            self.missed += 1
+
+    def get_statistics(self) -> Dict[str, Any]:
+        total = self.passed + self.rejected
+        return {
+            "mode": settings.PREFILTER_MODE,
+            "passed": self.passed,
+            "rejected": self.rejected,
+            "pass_rate": self.passed / total if total else None,
+            "reject_rate": self.rejected / total if total else None,
+            "missed": self.missed
+        }
+
+# 전역 인스턴스
+face_prefilter = FacePrefilter()
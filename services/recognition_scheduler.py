@@ -0,0 +1,200 @@
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+from core.config import settings
+from services.load_shedding_service import load_shedder
+
+logger = logging.getLogger(__name__)
+
+class RecognitionJob:
+    """카메라 하나에서 들어온 인식 작업"""
+
+    def __init__(self, camera_id: str, fn: Callable, args: tuple, deadline_ms: Optional[float],
+                 droppable: bool = True):
+        self.camera_id = camera_id
+        self.fn = fn
+        self.args = args
+        self.enqueued_at = time.monotonic()
+        # 마감 시간이 꺼져 있어도(None) 대기열 초과 시에는 버릴 수 있는 작업인지 여부
+        self.droppable = droppable
+        self.deadline_ms = deadline_ms if droppable else None
+
+    def is_stale(self, now: float) -> bool:
+        return self.deadline_ms is not None and (now - self.enqueued_at) * 1000 > self.deadline_ms
+
+class CameraQueue:
+    """카메라별 대기열과 통계"""
+
+    def __init__(self, camera_id: str):
+        self.camera_id = camera_id
+        self.jobs: Deque[RecognitionJob] = deque()
+        self.weight = settings.RECOGNITION_CAMERA_WEIGHTS.get(camera_id, 1.0)
+        self.max_in_flight = settings.RECOGNITION_CAMERA_MAX_IN_FLIGHT.get(camera_id, 1)
+        self.deadline_ms = settings.RECOGNITION_DEADLINE_MS
+        self.current_weight = 0.0
+        self.in_flight = 0
+        self.served = 0
+        self.dropped_stale = 0
+        self.dropped_overflow = 0
+        self.wait_ms_avg = 0.0
+        self.wait_ms_max = 0.0
+
+    def record_wait(self, wait_ms: float):
+        # 지수 이동 평균으로 최근 대기 시간 추적
+        self.wait_ms_avg = wait_ms if self.served == 0 else self.wait_ms_avg * 0.9 + wait_ms * 0.1
+        self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "weight": self.weight,
+            "max_in_flight": self.max_in_flight,
+            "deadline_ms": self.deadline_ms,
+            "queued": len(self.jobs),
+            "in_flight": self.in_flight,
+            "served": self.served,
+            "dropped_stale": self.dropped_stale,
+            "dropped_overflow": self.dropped_overflow,
+            "wait_ms_avg": round(self.wait_ms_avg, 2),
+            "wait_ms_max": round(self.wait_ms_max, 2)
+        }
+
+class RecognitionScheduler:
+    """여러 카메라가 모델을 공유할 때의 인식 작업 스케줄러
+
+    카메라별 가중치로 smooth weighted round-robin을 수행하고, 카메라별 동시 실행 수를 제한하며,
+    마감 시간(deadline)을 넘긴 오래된 프레임 작업은 실행하지 않고 버립니다.
+    """
+
+    def __init__(self):
+        self._cameras: Dict[str, CameraQueue] = {}
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._running = False
+
+    def _camera(self, camera_id: str) -> CameraQueue:
+        queue = self._cameras.get(camera_id)
+        if queue is None:
+            queue = CameraQueue(camera_id)
+            self._cameras[camera_id] = queue
+        return queue
+
+    def configure_camera(self, camera_id: str, weight: Optional[float] = None,
+                         max_in_flight: Optional[int] = None, deadline_ms: Optional[float] = None):
+        """카메라별 우선순위 가중치, 동시 실행 제한, 마감 시간 설정"""
+        with self._cond:
+            queue = self._camera(camera_id)
+            if weight is not None:
+                queue.weight = max(0.01, weight)
+            if max_in_flight is not None:
+                queue.max_in_flight = max(1, max_in_flight)
+            if deadline_ms is not None:
+                queue.deadline_ms = deadline_ms if deadline_ms > 0 else None
+            self._cond.notify_all()
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            for i in range(settings.RECOGNITION_WORKERS):
+                worker = threading.Thread(target=self._worker, name=f"recognition-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"인식 스케줄러 시작 (워커 {settings.RECOGNITION_WORKERS}개)")
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join(timeout=3)
+        self._workers = []
+
+    def submit(self, camera_id: str, fn: Callable, *args, droppable: bool = True) -> bool:
+        """작업 등록. droppable=False인 작업(에피소드 종료 등)은 마감 시간으로 버리지 않음"""
+        if not self._running:
+            self.start()
+        with self._cond:
+            queue = self._camera(camera_id)
+            if droppable and len(queue.jobs) >= settings.RECOGNITION_MAX_QUEUE:
+                # 대기열이 가득 차면 가장 오래된 버릴 수 있는 작업을 제거
+                for job in queue.jobs:
+                    if job.droppable:
+                        queue.jobs.remove(job)
+                        queue.dropped_overflow += 1
+                        break
+                else:
+                    queue.dropped_overflow += 1
+                    return False
+            queue.jobs.append(RecognitionJob(camera_id, fn, args, queue.deadline_ms, droppable))
+            self._cond.notify()
+        return True
+
+    def _next_job(self) -> Optional[RecognitionJob]:
+        """가중치 라운드로빈으로 다음 작업 선택 (호출 시 _cond 보유)"""
+        now = time.monotonic()
+        eligible = []
+        for queue in self._cameras.values():
+            while queue.jobs and queue.jobs[0].is_stale(now):
+                queue.jobs.popleft()
+                queue.dropped_stale += 1
+            if queue.jobs and queue.in_flight < queue.max_in_flight:
+                eligible.append(queue)
+        if not eligible:
+            return None
+
+        total = sum(q.weight for q in eligible)
+        for queue in eligible:
+            queue.current_weight += queue.weight
+        chosen = max(eligible, key=lambda q: q.current_weight)
+        chosen.current_weight -= total
+
+        job = chosen.jobs.popleft()
+        chosen.in_flight += 1
+        wait_ms = (now - job.enqueued_at) * 1000
+        chosen.record_wait(wait_ms)
+        load_shedder.record("queue_wait", wait_ms)
+        return job
+
+    def _worker(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        while True:
+            with self._cond:
+                job = None
+                while self._running:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self._cond.wait(timeout=0.5)
+                if job is None:
+                    break
+
+            try:
+                with load_shedder.measure("recognition"):
+                    result = job.fn(*job.args)
+                    if asyncio.iscoroutine(result):
+                        loop.run_until_complete(result)
+            except Exception as e:
+                logger.error(f"인식 작업 실행 오류 ({job.camera_id}): {e}")
+            finally:
+                with self._cond:
+                    queue = self._cameras[job.camera_id]
+                    queue.in_flight -= 1
+                    queue.served += 1
+                    self._cond.notify_all()
+        loop.close()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "running": self._running,
+                "workers": len(self._workers),
+                "cameras": {camera_id: q.to_dict() for camera_id, q in self._cameras.items()}
+            }
+
+# 전역 인스턴스
+recognition_scheduler = RecognitionScheduler()
@@ -0,0 +1,209 @@
+import os
+import cv2
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple, Union
+from core.config import settings
+from services.mqtt_codec import topic_encoding, dumps, decode_payload, pack_bytes, unpack_bytes
+
+logger = logging.getLogger(__name__)
+
+# 작업/결과 메시지 형식 버전
+JOB_VERSION = 1
+
+Match = Tuple[str, float]
+
+class RemoteRequest:
+    """한 번의 인식 요청 (크롭을 여러 작업으로 나눠 보내고 응답을 원래 순서로 다시 조립)"""
+
+    def __init__(self, size: int):
+        self.embeddings: List[Optional[np.ndarray]] = [None] * size
+        self.matches: List[Optional[Match]] = [None] * size
+        self.remaining = 0
+        self.done = threading.Event()
+
+class RemoteRecognitionClient:
+    """캡처 노드 측 분산 인식 클라이언트
+
+    정렬된 얼굴 크롭(전체 프레임이 아님)을 REMOTE_RECOGNITION_JOB_CROPS개씩 JPEG로 묶어
+    REMOTE_RECOGNITION_JOB_TOPIC에 작업으로 발행합니다. 작업마다 상관 ID와 응답 토픽
+    (REMOTE_RECOGNITION_RESULT_TOPIC/노드 ID)을 넣고, 워커(tools/recognition_worker.py)는
+    공유 구독으로 작업을 나눠 받아 임베딩/매칭 후 응답 토픽으로 결과를 돌려줍니다.
+    호출 스레드(인식 스케줄러 워커)는 모든 작업의 결과가 모이거나 시간이 초과될 때까지 기다리며,
+    응답이 없는 크롭은 None으로 반환되어 호출 측의 폴백 정책을 따릅니다.
+    """
+
+    def __init__(self):
+        self.node_id = settings.REMOTE_RECOGNITION_NODE_ID or f"{socket.gethostname()}-{os.getpid()}"
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        # 작업 ID → (요청, 크롭 시작 위치, 크롭 수, 발행 시각)
+        self._jobs: Dict[str, Tuple[RemoteRequest, int, int, float]] = {}
+        self._rtt_ms_avg = 0.0
+        self.stats = {"requests": 0, "jobs_sent": 0, "jobs_completed": 0, "jobs_timed_out": 0,
+                      "jobs_failed": 0, "late_results": 0, "crops_sent": 0, "unavailable": 0}
+        self.workers: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.RECOGNITION_MODE == "remote"
+
+    @property
+    def reply_topic(self) -> str:
+        return f"{settings.REMOTE_RECOGNITION_RESULT_TOPIC}/{self.node_id}"
+
+    def start(self, client):
+        """앱 이벤트 루프와 MQTT 클라이언트 등록 (client: FastMQTT 인스턴스)"""
+        self._client = client
+        self._loop = asyncio.get_running_loop()
+        # MQTT 연결 콜백이 먼저 실행된 경우 여기서 구독
+        if self._is_connected():
+            self.subscribe()
+
+    def subscribe(self):
+        """MQTT 연결 시 이 노드의 응답 토픽 구독 (mqtt_handler의 연결 콜백에서 호출)"""
+        if self.enabled and self._client is not None:
+            self._client.client.subscribe(self.reply_topic, qos=settings.REMOTE_RECOGNITION_QOS)
+            logger.info(f"분산 인식 응답 토픽 구독: {self.reply_topic}")
+
+    def is_result_topic(self, topic: str) -> bool:
+        return topic == self.reply_topic
+
+    def _is_connected(self) -> bool:
+        client = getattr(self._client, "client", None)
+        return bool(self._loop is not None and client is not None and getattr(client, "is_connected", False))
+
+    def on_loop_thread(self) -> bool:
+        """앱 이벤트 루프 스레드에서 호출되었는지 (이 경우 identify는 응답을 받을 수 없음)"""
+        try:
+            return self._loop is not None and asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _encode_crop(self, crop: np.ndarray) -> bytes:
+        ok, buffer = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, settings.REMOTE_RECOGNITION_JPEG_QUALITY])
+        if not ok:
+            raise ValueError("얼굴 크롭 인코딩 실패")
+        return buffer.tobytes()
+
+    def identify(self, crops: List[np.ndarray], threshold: float
+                 ) -> Tuple[List[Optional[np.ndarray]], List[Optional[Match]]]:
+        """크롭별 (임베딩, (이름, 신뢰도)) 요청. 응답이 없는 크롭은 둘 다 None (이벤트 루프가 아닌 스레드에서 호출)"""
+        request = RemoteRequest(len(crops))
+        if not crops:
+            return request.embeddings, request.matches
+        if self.on_loop_thread():
+            # 루프를 막은 채 기다리면 발행도 응답 처리도 실행되지 않음
+            self.stats["unavailable"] += 1
+            return request.embeddings, request.matches
+        if not self._is_connected():
+            self.stats["unavailable"] += 1
+            return request.embeddings, request.matches
+
+        self.stats["requests"] += 1
+        topic = settings.REMOTE_RECOGNITION_JOB_TOPIC
+        encoding = topic_encoding(topic)
+        timeout = settings.REMOTE_RECOGNITION_TIMEOUT_SEC
+        deadline_ms = int((time.time() + timeout) * 1000)
+        chunk = max(1, settings.REMOTE_RECOGNITION_JOB_CROPS)
+
+        jobs = []
+        for start in range(0, len(crops), chunk):
+            part = crops[start:start + chunk]
+            job_id = uuid.uuid4().hex
+            jobs.append((job_id, start, len(part), dumps(encoding, {
+                "v": JOB_VERSION,
+                "id": job_id,
+                "reply_to": self.reply_topic,
+                "threshold": threshold,
+                "deadline_ms": deadline_ms,
+                "crops": [pack_bytes(encoding, self._encode_crop(crop)) for crop in part]
+            })))
+        job_ids = [job[0] for job in jobs]
+
+        # 첫 응답이 나머지 작업 등록보다 먼저 도착해도 완료로 오인하지 않도록 모두 등록한 뒤 발행
+        sent_at = time.time()
+        with self._lock:
+            request.remaining = len(jobs)
+            for job_id, start, count, _ in jobs:
+                self._jobs[job_id] = (request, start, count, sent_at)
+        for _, _, _, payload in jobs:
+            # gmqtt 클라이언트는 앱 이벤트 루프에 속하므로 발행은 루프에서 실행
+            self._loop.call_soon_threadsafe(self._publish, topic, payload)
+        self.stats["jobs_sent"] += len(jobs)
+        self.stats["crops_sent"] += len(crops)
+
+        if not request.done.wait(timeout):
+            with self._lock:
+                expired = [job_id for job_id in job_ids if self._jobs.pop(job_id, None) is not None]
+            self.stats["jobs_timed_out"] += len(expired)
+            logger.warning(f"분산 인식 응답 시간 초과: 작업 {len(expired)}/{len(job_ids)}개")
+        return request.embeddings, request.matches
+
+    def _publish(self, topic: str, payload: Union[str, bytes]):
+        try:
+            self._client.publish(topic, payload, qos=settings.REMOTE_RECOGNITION_QOS)
+        except Exception as e:
+            # 발행 실패한 작업은 응답이 오지 않으므로 시간 초과 후 폴백 처리됨
+            self.stats["jobs_failed"] += 1
+            logger.error(f"분산 인식 작업 발행 실패: {e}")
+
+    def handle_result(self, payload: bytes):
+        """워커 응답 처리 (mqtt_handler의 메시지 콜백에서 호출)"""
+        try:
+            result = decode_payload(payload)
+        except Exception as e:
+            logger.error(f"분산 인식 응답 디코딩 실패: {e}")
+            return
+
+        with self._lock:
+            entry = self._jobs.pop(result.get("id"), None)
+        if entry is None:
+            # 이미 시간 초과로 폴백 처리된 작업
+            self.stats["late_results"] += 1
+            return
+        request, start, count, sent_at = entry
+
+        rtt_ms = (time.time() - sent_at) * 1000
+        self._rtt_ms_avg = rtt_ms if self.stats["jobs_completed"] == 0 else self._rtt_ms_avg * 0.9 + rtt_ms * 0.1
+        worker = self.workers.setdefault(result.get("worker", "?"), {"jobs": 0, "errors": 0})
+        worker["jobs"] += 1
+        worker["last_seen"] = time.time()
+        worker["profile"] = result.get("profile")
+
+        if result.get("error"):
+            worker["errors"] += 1
+            self.stats["jobs_failed"] += 1
+            logger.warning(f"분산 인식 워커 오류 ({result.get('worker')}): {result['error']}")
+        else:
+            embeddings = result.get("embeddings") or []
+            for i, (name, conf) in enumerate(result.get("matches", [])[:count]):
+                request.matches[start + i] = (name, float(conf))
+                if i < len(embeddings) and embeddings[i] is not None:
+                    request.embeddings[start + i] = np.frombuffer(unpack_bytes(embeddings[i]), dtype=np.float16).astype(np.float32)
+            self.stats["jobs_completed"] += 1
+
+        with self._lock:
+            request.remaining -= 1
+            if request.remaining == 0:
+                request.done.set()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "mode": settings.RECOGNITION_MODE,
+            "node_id": self.node_id,
+            "connected": self._is_connected(),
+            "in_flight": len(self._jobs),
+            "rtt_ms_avg": round(self._rtt_ms_avg, 2),
+            "workers": self.workers
+        }
+
+# 전역 인스턴스
+remote_recognizer = RemoteRecognitionClient()
@@ -6,18 +6,29 @@ import queue
 import time
 import os
 import socket
+from collections import deque
 from typing import Optional, Callable
 from datetime import datetime
 from urllib.parse import urlparse
 from core.config import settings
 from services.motion_detection_service import motion_service
-from services.mqtt_service import MQTTService
+from services.alert_service import alert_dispatcher
+from services.dashboard_push_service import dashboard_hub
+from services.face_tracker import face_tracker_manager
+from services.best_shot_service import best_shot_selector
+from services.prefilter_service import face_prefilter
+from services.recognition_scheduler import recognition_scheduler
+from services.load_shedding_service import load_shedder
+from services.metrics_service import metrics
+from services.event_store import event_store
+from services.unknown_cluster_service import unknown_clusterer
 
 logger = logging.getLogger(__name__)
 
 class RTSPService:
     def __init__(self):
         self.rtsp_url = None
+        self.camera_id = settings.CAMERA_ID
         self.cap = None
         self.is_running = False
         self.is_connected = False
@@ -25,7 +36,7 @@ class RTSPService:
         self.current_frame = None
         self.capture_thread = None
         self.detection_enabled = True
-        self.latest_detections = []
+        self.latest_detections = deque(maxlen=settings.LATEST_DETECTIONS_SIZE)
         self.detection_callbacks = []
         self.connection_timeout = 10  # 10초 타임아웃
         self.last_frame_time = time.time()
@@ -222,6 +233,7 @@ class RTSPService:
         consecutive_failures = 0
         max_consecutive_failures = 20  # 연속 실패 허용 횟수 증가
         rtp_error_count = 0
+        frame_index = 0
         
         while self.is_running and consecutive_failures < max_consecutive_failures:
             try:
@@ -235,7 +247,9 @@ class RTSPService:
                     consecutive_failures = 0
                     rtp_error_count = 0
                 
-                ret, frame = self.cap.read()
+                # read()는 다음 프레임이 도착할 때까지 기다리므로 디코딩 비용이 아닌 프레임 대기 시간으로 기록
+                with metrics.time_stage("capture_wait"):
+                    ret, frame = self.cap.read()
                 
                 # 프레임 읽기 실패 시 처리
                 if not ret or frame is None:
@@ -260,6 +274,7 @@ class RTSPService:
                 # 성공적으로 프레임을 읽었을 때
                 consecutive_failures = 0
                 self.successful_frames += 1
+                metrics.tick_frame(self.camera_id)
                 self.current_frame = frame
                 self.last_frame_time = time.time()
                 
@@ -275,15 +290,21 @@ class RTSPService:
                     except queue.Empty:
                         break
                 
-                # 움직임 감지 및 처리
+                # 부하 제어 상태 갱신 (평가 주기마다 한 번씩만 실제로 계산)
+                load_shedder.evaluate()
+                frame_index += 1
+                
+                # 움직임 감지 및 처리 (부하 제어 시 stride 간격의 프레임만 분석)
                 try:
-                    if self.detection_enabled:
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        processed_frame = loop.run_until_complete(
-                            motion_service.process_motion_detection(frame)
-                        )
-                        loop.close()
+                    if self.detection_enabled and frame_index % load_shedder.motion_stride == 0:
+                        with load_shedder.measure("motion"):
+                            loop = asyncio.new_event_loop()
+                            asyncio.set_event_loop(loop)
+                            processed_frame = loop.run_until_complete(
+                                motion_service.process_motion_detection(frame)
+                            )
+                            loop.run_until_complete(self._advance_episode(frame))
+                            loop.close()
                         
                         try:
                             self.frame_queue.put_nowait(processed_frame)
@@ -319,12 +340,19 @@ class RTSPService:
         """프레임 제너레이터 (스트리밍용)"""
         empty_frame_count = 0
         max_empty_frames = 10
+        last_sent = 0.0
         
         while empty_frame_count < max_empty_frames:
             try:
                 frame = self.frame_queue.get(timeout=2.0)
                 empty_frame_count = 0  # 프레임을 받았으므로 카운트 리셋
                 
+                # 부하 제어에 따른 뷰어 프레임레이트 제한
+                now = time.time()
+                if now - last_sent < 1.0 / load_shedder.stream_fps:
+                    continue
+                last_sent = now
+                
                 # 프레임 크기 조정
                 height, width = frame.shape[:2]
                 if width > 800:
@@ -334,7 +362,8 @@ class RTSPService:
                     frame = cv2.resize(frame, (new_width, new_height))
                 
                 # JPEG 인코딩
-                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+                with metrics.time_stage("encode"):
+                    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, load_shedder.stream_quality])
                 if ret:
                     frame_bytes = buffer.tobytes()
                     yield (b'--frame\r\n'
@@ -353,85 +382,178 @@ class RTSPService:
         logger.error("프레임 제너레이터 종료 - 너무 많은 빈 프레임")
     
     async def handle_motion_detection(self, frame, timestamp):
-        """움직임 감지 시 얼굴 인식 수행"""
+        """움직임 감지 시 얼굴 인식 작업을 스케줄러에 등록 (캡처 스레드는 인식을 기다리지 않음)"""
         try:
-            logger.info("얼굴 인식 시작...")
-            
-            # 프레임 품질 개선
-            enhanced_frame = self._enhance_frame_for_recognition(frame)
-            
-            # 프레임을 바이트로 변환
-            ret, buffer = cv2.imencode('.jpg', enhanced_frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not ret:
-                logger.error("프레임 인코딩 실패")
+            motion_boxes = list(motion_service.last_motion_boxes)
+
+            # 베스트샷 모드: 에피소드를 열고 종료 시점에 상위 얼굴만 인식
+            if settings.BEST_SHOT_ENABLED:
+                episode = best_shot_selector.get(self.camera_id)
+                if episode is None:
+                    logger.info("움직임 에피소드 시작 - 얼굴 후보 수집")
+                    episode = best_shot_selector.open(self.camera_id, timestamp)
+                    self._schedule_episode_sample(frame, episode, motion_boxes)
+                elif episode.is_due_for_sample(time.time()):
+                    self._schedule_episode_sample(frame, episode, motion_boxes)
                 return
-            
-            image_bytes = buffer.tobytes()
-            
-            # 얼굴 인식 수행 (수정된 부분)
-            try:
-                from services.face_detection_service import face_detection_service
-                face_results = await face_detection_service.detect_and_recognize_faces(image_bytes)
-            except ImportError as import_error:
-                logger.error(f"얼굴 인식 서비스 import 실패: {import_error}")
-                face_results = []
-            except Exception as face_error:
-                logger.warning(f"얼굴 인식 서비스 오류: {face_error}")
-                face_results = []
-            
-            # 감지 결과 저장
-            detection_data = {
-                "timestamp": timestamp.isoformat(),
-                "faces": face_results,
-                "image_size": len(image_bytes),
-                "motion_type": "RTSP Motion Detection"
-            }
-            
-            await MQTTService.publish_motion_and_face_detection({
-                "location": "rtsp_camera",
-                "person_detected": bool(face_results),
-                "confidence": max([f.get("confidence", 0.0) for f in face_results], default=0.0)
-            })
-                        
-            self.latest_detections.append(detection_data)
-            
-            if len(self.latest_detections) > 20:
-                self.latest_detections.pop(0)
-            
-            # 결과 로깅
-            if face_results:
-                for face in face_results:
-                    logger.info(f"얼굴 감지: {face['name']}, 신뢰도: {face['confidence']:.3f}")
-                    #만약에 얼굴 감지에 `알 수 없음`이 있으면 경고 울리기 위해 알림 보내기
-            else:
-                logger.info("얼굴이 감지되지 않음")
-                
-            # 콜백 실행
-            for callback in self.detection_callbacks:
-                try:
-                    await callback(detection_data)
-                except Exception as callback_error:
-                    logger.error(f"감지 콜백 실행 오류: {callback_error}")
-                
+
+            if not recognition_scheduler.submit(self.camera_id, self._recognize_frame, frame, timestamp, motion_boxes):
+                logger.debug("인식 대기열이 가득 차 프레임 작업을 버림")
         except Exception as e:
             logger.error(f"얼굴 인식 처리 오류: {e}")
+
+    async def _recognize_frame(self, frame, timestamp, motion_boxes):
+        """스케줄러 워커에서 실행되는 단일 프레임 얼굴 인식"""
+        passed = self._check_prefilter(frame, motion_boxes)
+        if not passed and settings.PREFILTER_MODE == "enforce":
+            logger.debug("1차 필터에서 얼굴 후보 없음 - 얼굴 인식 생략")
+            return
+
+        logger.info("얼굴 인식 시작...")
+        
+        # 프레임 품질 개선
+        enhanced_frame = self._enhance_frame_for_recognition(frame)
+        
+        # 얼굴 인식 수행 (추적기 사용 시 트랙당 필요한 경우에만 인식)
+        try:
+            from services.face_detection_service import face_detection_service
+            if settings.TRACKER_ENABLED:
+                face_results = face_detection_service.recognize_faces_tracked(
+                    enhanced_frame, self.camera_id, include_embeddings=settings.FACE_HISTORY_ENABLED
+                )
+            else:
+                face_results = face_detection_service.recognize_faces(
+                    enhanced_frame, input_size=load_shedder.det_size, include_embeddings=settings.FACE_HISTORY_ENABLED
+                )
+        except ImportError as import_error:
+            logger.error(f"얼굴 인식 서비스 import 실패: {import_error}")
+            face_results = []
+        except Exception as face_error:
+            logger.warning(f"얼굴 인식 서비스 오류: {face_error}")
+            face_results = []
+
+        if not passed and face_results:
+            face_prefilter.record_miss()
+        
+        await self._emit_detection(face_results, timestamp, int(enhanced_frame.nbytes))
+
+    def _schedule_episode_sample(self, frame, episode, motion_boxes):
+        """에피소드 샘플링 작업 등록 (샘플 시각은 등록 시점 기준)"""
+        episode.last_sample_at = time.time()
+        recognition_scheduler.submit(self.camera_id, self._sample_episode_frame, frame, episode, motion_boxes)
+
+    def _sample_episode_frame(self, frame, episode, motion_boxes):
+        """에피소드에 프레임의 얼굴 후보 추가"""
+        episode.frames_sampled += 1
+
+        passed = self._check_prefilter(frame, motion_boxes)
+        if not passed and settings.PREFILTER_MODE == "enforce":
+            return
+        try:
+            from services.face_detection_service import face_detection_service
+            enhanced_frame = self._enhance_frame_for_recognition(frame)
+            found = face_detection_service.collect_episode_candidates(enhanced_frame, episode)
+            if not passed and found:
+                face_prefilter.record_miss()
+        except Exception as e:
+            logger.warning(f"에피소드 얼굴 후보 수집 오류: {e}")
+
+    def _check_prefilter(self, frame, motion_boxes) -> bool:
+        """움직임 영역에 대한 1차 얼굴 후보 검사 (off 모드에서는 항상 통과)"""
+        if settings.PREFILTER_MODE == "off":
+            return True
+        return face_prefilter.check(frame, motion_boxes)
+
+    async def _advance_episode(self, frame):
+        """에피소드 진행: 샘플링 주기마다 후보 수집 작업 등록, 종료 시 인식 작업 등록"""
+        episode = best_shot_selector.get(self.camera_id)
+        if episode is None:
+            return
+
+        now = time.time()
+        if not episode.is_expired(now):
+            if episode.is_due_for_sample(now):
+                self._schedule_episode_sample(frame, episode, list(motion_service.last_motion_boxes))
+            return
+
+        episode = best_shot_selector.close(self.camera_id)
+        if episode is None:
+            return
+        # 에피소드 종료 작업은 마감 시간이 지나도 버리지 않음 (같은 카메라 대기열에서 샘플 작업 뒤에 실행)
+        recognition_scheduler.submit(self.camera_id, self._finalize_episode, episode, int(frame.nbytes), droppable=False)
+
+    async def _finalize_episode(self, episode, image_size: int):
+        """수집된 베스트샷 후보를 인식하고 결과 발행"""
+        try:
+            from services.face_detection_service import face_detection_service
+            face_results = face_detection_service.recognize_episode(
+                episode, include_embeddings=settings.FACE_HISTORY_ENABLED
+            )
+        except Exception as face_error:
+            logger.warning(f"얼굴 인식 서비스 오류: {face_error}")
+            face_results = []
+
+        logger.info(
+            f"움직임 에피소드 종료 (샘플 {episode.frames_sampled}프레임, "
+            f"얼굴 후보 {episode.faces_seen}개, 트랙 {len(episode.candidates)}개)"
+        )
+        await self._emit_detection(face_results, episode.timestamp or datetime.now(), image_size)
+
+    async def _emit_detection(self, face_results, timestamp, image_size: int):
+        """인식 결과 저장, MQTT 발행, 로깅 및 콜백 실행"""
+        # 임베딩/크롭은 얼굴 기록과 미등록 클러스터링에만 사용하고 발행/대시보드 결과에서는 제외
+        embeddings = [face.pop("embedding", None) for face in face_results]
+        crops = [face.pop("crop", None) for face in face_results]
+        unknown_clusterer.label_faces(self.camera_id, face_results, embeddings, crops)
+        # 감지 결과 저장
+        detection_data = {
+            "timestamp": timestamp.isoformat(),
+            "faces": face_results,
+            "image_size": image_size,
+            "motion_type": "RTSP Motion Detection"
+        }
+        
+        # 발행은 알림 단계의 백그라운드 태스크가 (카메라, 식별자)별 병합/억제 후 수행
+        alert_dispatcher.submit(self.camera_id, face_results, crops, timestamp.timestamp())
+                    
+        self.latest_detections.append(detection_data)
+        # 대시보드에는 전체 목록 대신 새 감지만 밀어 넣음
+        dashboard_hub.publish("detection", {"camera_id": self.camera_id, **detection_data}, self.camera_id)
+        # 영구 기록은 백그라운드 쓰기 스레드가 배치로 처리 (여기서는 큐에 넣기만 함)
+        event_store.append(self.camera_id, timestamp.timestamp(), detection_data, embeddings)
+        
+        # 결과 로깅
+        if face_results:
+            for face in face_results:
+                logger.info(f"얼굴 감지: {face['name']}, 신뢰도: {face['confidence']:.3f}")
+                #만약에 얼굴 감지에 `알 수 없음`이 있으면 경고 울리기 위해 알림 보내기
+        else:
+            logger.info("얼굴이 감지되지 않음")
+            
+        # 콜백 실행
+        for callback in self.detection_callbacks:
+            try:
+                await callback(detection_data)
+            except Exception as callback_error:
+                logger.error(f"감지 콜백 실행 오류: {callback_error}")
     
     def _enhance_frame_for_recognition(self, frame):
         """얼굴 인식을 위한 프레임 품질 개선"""
         try:
-            lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            l = clahe.apply(l)
-            enhanced = cv2.merge([l, a, b])
-            enhanced = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
+            with metrics.time_stage("enhance"):
+                lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+                l, a, b = cv2.split(lab)
+                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+                l = clahe.apply(l)
+                enhanced = cv2.merge([l, a, b])
+                enhanced = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
             
             return enhanced
         except:
             return frame
     
     def detect_faces_opencv(self, image_bytes) -> list:
-        """OpenCV를 사용한 기본 얼굴 감지"""
+        """OpenCV를 사용한 기본 얼굴 감지 (캐시된 cascade 사용)"""
         try:
             import numpy as np
             
@@ -442,10 +564,7 @@ class RTSPService:
             if image is None:
                 return []
             
-            # OpenCV Haar Cascade 얼굴 감지
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+            faces = face_prefilter.detect(image)
             
             # 결과 포맷팅
             face_results = []
@@ -469,7 +588,7 @@ class RTSPService:
     
     def get_latest_detections(self):
         """최근 감지 결과 반환"""
-        return self.latest_detections
+        return list(self.latest_detections)
     
     def get_current_snapshot(self) -> Optional[bytes]:
         """현재 프레임 스냅샷 반환"""
@@ -502,7 +621,15 @@ class RTSPService:
             "successful_frames": self.successful_frames,
             "decode_errors": self.decode_errors,
             "last_frame_time": self.last_frame_time,
-            "frame_queue_size": self.frame_queue.qsize()
+            "frame_queue_size": self.frame_queue.qsize(),
+            "tracker": face_tracker_manager.get(self.camera_id).get_statistics(),
+            "best_shot": best_shot_selector.get_statistics(),
+            "prefilter": face_prefilter.get_statistics(),
+            "scheduler": recognition_scheduler.get_statistics(),
+            "load_shedding": load_shedder.get_status(),
+            "unknown_clusters": unknown_clusterer.get_statistics(),
+            "alerts": alert_dispatcher.get_statistics(),
+            "event_store": event_store.get_statistics()
         }
     
     def enable_detection(self, enabled: bool = True):
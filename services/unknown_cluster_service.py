@@ -0,0 +1,221 @@
+import time
+import uuid
+import secrets
+import logging
+import threading
+import itertools
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from core.config import settings
+from services.gallery_service import commit_staged_embeddings, encode_crop
+
+logger = logging.getLogger(__name__)
+
+class UnknownCluster:
+    """같은 사람으로 보이는 미등록 얼굴 묶음 (임시 ID, 중심 벡터, 최근 구성원)"""
+
+    def __init__(self, cluster_id: str, embedding: np.ndarray, now: float):
+        self.cluster_id = cluster_id
+        self.centroid = embedding.copy()
+        self.count = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.cameras: Dict[str, int] = {}
+        # 등록(승격)용 구성원 임베딩과 크롭 (품질 순서가 아닌 최근 순)
+        self.members: List[np.ndarray] = []
+        self.crops: List[Optional[np.ndarray]] = []
+        self.thumbnail: Optional[np.ndarray] = None
+        self.best_score = -1.0
+
+    def add(self, embedding: np.ndarray, camera_id: str, now: float,
+            crop: Optional[np.ndarray] = None, score: float = 0.0):
+        self.count += 1
+        self.last_seen = now
+        self.cameras[camera_id] = self.cameras.get(camera_id, 0) + 1
+        # 누적 평균 후 재정규화 (처음 몇 개가 중심을 고정하지 않도록 단순 평균 사용)
+        centroid = self.centroid + (embedding - self.centroid) / self.count
+        self.centroid = centroid / (np.linalg.norm(centroid) or 1.0)
+        self.members.append(embedding)
+        self.crops.append(crop)
+        if len(self.members) > settings.UNKNOWN_CLUSTER_MAX_MEMBERS:
+            self.members.pop(0)
+            self.crops.pop(0)
+        if crop is not None and score >= self.best_score:
+            self.thumbnail = crop
+            self.best_score = score
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cluster_id": self.cluster_id,
+            "count": self.count,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "cameras": self.cameras,
+            "members": len(self.members),
+            "has_thumbnail": self.thumbnail is not None
+        }
+
+class UnknownClusterer:
+    """미등록 얼굴의 온라인 클러스터링
+
+    새 얼굴은 현재 클러스터 중심 행렬과 한 번의 행렬 곱으로 비교하여 UNKNOWN_CLUSTER_THRESHOLD 이상이면
+    기존 클러스터에, 아니면 새 임시 ID에 배정합니다. UNKNOWN_CLUSTER_TTL_SEC 동안 보이지 않은 클러스터는
+    만료되며, 개수 상한을 넘으면 가장 오래 보이지 않은 클러스터부터 제거합니다.
+    트랙 캐시로 임베딩 없이 반환된 얼굴은 같은 트랙의 이전 배정을 그대로 사용합니다.
+    """
+
+    def __init__(self):
+        self._clusters: Dict[str, UnknownCluster] = {}
+        self._track_clusters: Dict[Tuple[str, Any], Tuple[str, float]] = {}
+        self._ids = itertools.count(1)
+        # 재시작마다 바뀌는 구분자: 같은 날 재시작해도 이전 실행의 ID(이벤트 기록, 알림 키)와 겹치지 않음
+        self._boot = secrets.token_hex(3)
+        self._lock = threading.Lock()
+        # 갤러리에 기록 중인 클러스터 (같은 클러스터를 동시에 두 번 승격하지 않도록)
+        self._promoting = set()
+        self._centroids: Optional[np.ndarray] = None
+        self._centroid_ids: List[str] = []
+        self.stats = {"assigned": 0, "created": 0, "expired": 0, "promoted": 0, "track_hits": 0}
+
+    def _new_id(self) -> str:
+        return f"unknown-{time.strftime('%m%d')}-{self._boot}-{next(self._ids):04d}"
+
+    def _rebuild_index(self):
+        """클러스터 중심 행렬 재생성 (호출 시 _lock 보유)"""
+        self._centroid_ids = list(self._clusters)
+        self._centroids = (np.stack([self._clusters[c].centroid for c in self._centroid_ids])
+                           if self._centroid_ids else None)
+
+    def _expire(self, now: float, reserve: int = 0):
+        """TTL이 지난 클러스터와 트랙 배정 제거 (호출 시 _lock 보유)
+
+        reserve: 새로 만들 클러스터 수. 상한을 넘으면 가장 오래 보이지 않은 클러스터부터 제거해 자리를 만듦
+        """
+        ttl = settings.UNKNOWN_CLUSTER_TTL_SEC
+        expired = [cid for cid, c in self._clusters.items() if now - c.last_seen > ttl]
+        overflow = len(self._clusters) - len(expired) - settings.UNKNOWN_CLUSTER_MAX_CLUSTERS + reserve
+        if overflow > 0:
+            alive = sorted((c for cid, c in self._clusters.items() if cid not in expired), key=lambda c: c.last_seen)
+            expired.extend(c.cluster_id for c in alive[:overflow])
+        for cid in expired:
+            del self._clusters[cid]
+        self._track_clusters = {
+            key: (cid, seen) for key, (cid, seen) in self._track_clusters.items()
+            if cid in self._clusters and now - seen <= settings.TRACKER_MAX_AGE_SEC
+        }
+        if expired:
+            self.stats["expired"] += len(expired)
+            self._rebuild_index()
+
+    def assign(self, embedding: np.ndarray, camera_id: str, track_id: Any = None,
+               crop: Optional[np.ndarray] = None, score: float = 0.0, now: Optional[float] = None) -> str:
+        """미등록 얼굴 임베딩을 클러스터에 배정하고 클러스터 ID 반환"""
+        now = now or time.time()
+        unit = np.asarray(embedding, dtype=np.float32).flatten()
+        unit = unit / (np.linalg.norm(unit) or 1.0)
+
+        with self._lock:
+            self._expire(now)
+            cluster = None
+            if self._centroids is not None and self._centroids.shape[1] == unit.shape[0]:
+                sims = self._centroids @ unit
+                best = int(np.argmax(sims))
+                if sims[best] >= settings.UNKNOWN_CLUSTER_THRESHOLD:
+                    cluster = self._clusters[self._centroid_ids[best]]
+
+            if cluster is None:
+                # 기존 클러스터에 합류할 때는 자리를 만들 필요가 없으므로 새로 만들 때만 상한 확인
+                if len(self._clusters) >= settings.UNKNOWN_CLUSTER_MAX_CLUSTERS:
+                    self._expire(now, reserve=1)
+                cluster = UnknownCluster(self._new_id(), unit, now)
+                self._clusters[cluster.cluster_id] = cluster
+                self.stats["created"] += 1
+            cluster.add(unit, camera_id, now, crop, score)
+            # 중심이 바뀌었으므로 해당 행만 갱신 (새 클러스터면 전체 재생성)
+            if cluster.cluster_id in self._centroid_ids:
+                self._centroids[self._centroid_ids.index(cluster.cluster_id)] = cluster.centroid
+            else:
+                self._rebuild_index()
+
+            if track_id is not None:
+                self._track_clusters[(camera_id, track_id)] = (cluster.cluster_id, now)
+            self.stats["assigned"] += 1
+            return cluster.cluster_id
+
+    def lookup_track(self, camera_id: str, track_id: Any, now: Optional[float] = None) -> Optional[str]:
+        """임베딩 없이 캐시로 반환된 트랙의 클러스터 ID"""
+        now = now or time.time()
+        with self._lock:
+            entry = self._track_clusters.get((camera_id, track_id))
+            if entry is None or entry[0] not in self._clusters:
+                return None
+            cluster = self._clusters[entry[0]]
+            cluster.last_seen = now
+            self._track_clusters[(camera_id, track_id)] = (entry[0], now)
+            self.stats["track_hits"] += 1
+            return entry[0]
+
+    def label_faces(self, camera_id: str, faces: List[Dict[str, Any]], embeddings: List[Optional[np.ndarray]],
+                    crops: Optional[List[Optional[np.ndarray]]] = None):
+        """인식 결과 중 미등록 얼굴에 cluster_id 추가"""
+        if not settings.UNKNOWN_CLUSTER_ENABLED:
+            return
+        now = time.time()
+        for i, face in enumerate(faces):
+            if face.get("is_known"):
+                continue
+            emb = embeddings[i] if i < len(embeddings) else None
+            if emb is not None:
+                crop = crops[i] if crops and i < len(crops) else None
+                score = face.get("quality", face.get("detection_score", 0.0))
+                face["cluster_id"] = self.assign(emb, camera_id, face.get("track_id"), crop, float(score), now)
+            elif face.get("track_id") is not None:
+                cluster_id = self.lookup_track(camera_id, face["track_id"], now)
+                if cluster_id:
+                    face["cluster_id"] = cluster_id
+
+    def get(self, cluster_id: str) -> Optional[UnknownCluster]:
+        return self._clusters.get(cluster_id)
+
+    def remove(self, cluster_id: str) -> Optional[UnknownCluster]:
+        with self._lock:
+            cluster = self._clusters.pop(cluster_id, None)
+            if cluster is not None:
+                self._rebuild_index()
+            return cluster
+
+    def promote(self, cluster_id: str, person_name: str) -> Dict[str, Any]:
+        """클러스터 구성원 임베딩(과 크롭)을 등록된 인물로 갤러리에 추가하고 클러스터 제거
+
+        갤러리 기록에 실패하면 클러스터는 그대로 남아 다시 승격할 수 있습니다.
+        """
+        with self._lock:
+            cluster = self._clusters.get(cluster_id)
+            if cluster is None or cluster_id in self._promoting:
+                raise KeyError(cluster_id)
+            self._promoting.add(cluster_id)
+            members, cluster_crops = list(cluster.members), list(cluster.crops)
+        try:
+            crops = [encode_crop(crop) if crop is not None else None for crop in cluster_crops]
+            saved = commit_staged_embeddings(
+                {person_name: members}, f"promote_{int(time.time())}_{uuid.uuid4().hex[:8]}", {person_name: crops}
+            )
+        finally:
+            with self._lock:
+                self._promoting.discard(cluster_id)
+        self.remove(cluster_id)
+        self.stats["promoted"] += 1
+        logger.info(f"미등록 클러스터 승격: {cluster_id} → {person_name} (임베딩 {saved}개)")
+        return {"cluster_id": cluster_id, "person_name": person_name, "saved_embeddings": saved}
+
+    def list_clusters(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._expire(time.time())
+            clusters = sorted(self._clusters.values(), key=lambda c: c.last_seen, reverse=True)
+            return [c.to_dict() for c in clusters]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {**self.stats, "active_clusters": len(self._clusters), "tracked": len(self._track_clusters)}
+
+# 전역 인스턴스
+unknown_clusterer = UnknownClusterer()
@@ -0,0 +1,101 @@
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class SpooledUpload:
+    """디스크에 저장된 업로드 파일 (경로, 크기, sha256)"""
+
+    def __init__(self, path: str, size: int, sha256: str, filename: Optional[str]):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.filename = filename
+
+    def cleanup(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+            except Exception as e:
+                logger.warning(f"업로드 임시 파일 삭제 실패: {self.path}, {e}")
+
+def _write_chunk(spool, digest, chunk: bytes):
+    digest.update(chunk)
+    spool.write(chunk)
+
+async def spool_upload(upload: UploadFile, max_bytes: int, suffix: str = "") -> SpooledUpload:
+    """업로드를 청크 단위로 스풀 파일에 기록하면서 sha256 계산
+
+    전체 내용을 메모리에 올리지 않으므로 업로드 크기와 관계없이 메모리 사용량이 일정합니다.
+    파일 기록과 해시 계산은 이벤트 루프를 막지 않도록 스레드 풀에서 실행합니다.
+    max_bytes를 넘으면 413, 빈 파일이면 400을 발생시키고 스풀 파일은 삭제합니다.
+    """
+    os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=settings.UPLOAD_SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as spool:
+            while True:
+                chunk = await upload.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413, detail=f"업로드 크기 제한({max_bytes / (1024 * 1024):.1f}MB)을 초과했습니다."
+                    )
+                await run_in_threadpool(_write_chunk, spool, digest, chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="빈 파일입니다.")
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return SpooledUpload(path, size, digest.hexdigest(), upload.filename)
+
+def is_archive_junk(name: str) -> bool:
+    """macOS 메타데이터(__MACOSX/)와 숨김 파일(._사진.jpg, .DS_Store 등) 항목 여부"""
+    return any(part == "__MACOSX" or part.startswith(".") for part in name.split("/") if part)
+
+def read_archive_member(archive: zipfile.ZipFile, name: str, max_bytes: int) -> bytes:
+    """zip 항목 읽기. 압축 해제 크기가 max_bytes를 넘으면 읽기 전에 ValueError (zip 폭탄 방지)
+
+    zipfile은 헤더의 file_size만큼만 압축을 풀므로 헤더 크기로 미리 확인하면 충분합니다.
+    """
+    info = archive.getinfo(name)
+    if info.file_size > max_bytes:
+        raise ValueError(f"압축 해제 크기 제한({max_bytes / (1024 * 1024):.1f}MB) 초과: {name}")
+    return archive.read(info)
+
+class UploadHashIndex:
+    """최근 업로드 해시 기록 (같은 내용의 중복 업로드 감지)"""
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, kind: str, sha256: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._entries.get(f"{kind}:{sha256}")
+
+    def remember(self, kind: str, sha256: str, **info):
+        with self._lock:
+            key = f"{kind}:{sha256}"
+            self._entries[key] = {"sha256": sha256, "at": time.time(), **info}
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.UPLOAD_HASH_HISTORY:
+                self._entries.popitem(last=False)
+
+# 전역 인스턴스
+upload_hash_index = UploadHashIndex()
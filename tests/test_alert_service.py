@@ -0,0 +1,94 @@
+import asyncio
+import pytest
+from core.config import settings
+from services import alert_service
+from services.alert_service import AlertDispatcher, MOTION_ONLY
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(alert_service, "time", clock)
+    monkeypatch.setattr(settings, "ALERT_COALESCE_WINDOW_SEC", 2.0)
+    monkeypatch.setattr(settings, "ALERT_SUPPRESS_SEC", 30.0)
+    monkeypatch.setattr(settings, "ALERT_SUPPRESS_OVERRIDES", {})
+    return clock
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    dispatcher = AlertDispatcher()
+    dispatcher.published = []
+
+    async def publish(window, coalesced):
+        dispatcher.published.append((window.camera_id, window.identity, coalesced,
+                                     window.merged + 1 if coalesced else 1, window.confidence))
+    monkeypatch.setattr(dispatcher, "_publish", publish)
+    return dispatcher
+
+def _face(name, confidence=0.8, box=(0, 0, 10, 10)):
+    return {"name": name, "confidence": confidence, "box": list(box)}
+
+def _step(dispatcher, clock, at, faces=None, camera="cam1"):
+    """at 시각에 이벤트를 넣고 배출/구간 정리를 한 번 실행"""
+    clock.now = 1000.0 + at
+    if faces is not None:
+        dispatcher.submit(camera, faces)
+
+    async def tick():
+        await dispatcher._drain()
+        await dispatcher._close_windows(clock.now)
+    asyncio.run(tick())
+
+def test_first_event_publishes_and_followers_coalesce(dispatcher, clock):
+    _step(dispatcher, clock, 0.0, [_face("alice", 0.7)])
+    assert dispatcher.published == [("cam1", "alice", False, 1, 0.7)]
+
+    _step(dispatcher, clock, 0.5, [_face("alice", 0.9)])
+    _step(dispatcher, clock, 1.0, [_face("alice", 0.8)])
+    _step(dispatcher, clock, 1.5)
+    assert len(dispatcher.published) == 1
+
+    # 구간이 끝나면 병합된 횟수와 최고 신뢰도로 한 번 발행
+    _step(dispatcher, clock, 2.0)
+    assert dispatcher.published[-1] == ("cam1", "alice", True, 3, 0.9)
+    assert dispatcher.stats["coalesced"] == 2
+
+def test_suppression_after_window(dispatcher, clock):
+    _step(dispatcher, clock, 0.0, [_face("alice")])
+    _step(dispatcher, clock, 2.0)
+    # 병합된 이벤트가 없으면 요약은 발행하지 않음
+    assert len(dispatcher.published) == 1
+
+    _step(dispatcher, clock, 10.0, [_face("alice")])
+    _step(dispatcher, clock, 31.9, [_face("alice")])
+    assert len(dispatcher.published) == 1
+    assert dispatcher.stats["suppressed"] == 2
+
+    _step(dispatcher, clock, 32.0)
+    _step(dispatcher, clock, 32.1, [_face("alice")])
+    assert len(dispatcher.published) == 2
+    assert not dispatcher._suppressed_until
+
+def test_suppression_is_per_camera_and_identity(dispatcher, clock, monkeypatch):
+    monkeypatch.setattr(settings, "ALERT_SUPPRESS_OVERRIDES", {"bob": 0.0})
+    _step(dispatcher, clock, 0.0, [_face("alice"), _face("bob")])
+    _step(dispatcher, clock, 2.0)
+    _step(dispatcher, clock, 3.0, [_face("alice"), _face("bob")])
+    _step(dispatcher, clock, 3.0, [_face("alice")], camera="cam2")
+
+    assert [(cam, identity) for cam, identity, *_ in dispatcher.published] == [
+        ("cam1", "alice"), ("cam1", "bob"), ("cam1", "bob"), ("cam2", "alice")]
+
+def test_identities_use_cluster_id_and_best_face():
+    faces = [_face("Unknown", 0.3, (0, 0, 5, 5)), {**_face("Unknown", 0.6), "cluster_id": "unknown-a"},
+             _face("alice", 0.5, (1, 1, 2, 2)), _face("alice", 0.9, (3, 3, 4, 4))]
+    identities = AlertDispatcher._identities(faces, None)
+    assert identities["unknown-a"][0] == 0.6
+    assert identities["alice"][:2] == (0.9, [3, 3, 4, 4])
+    assert AlertDispatcher._identities([], None) == {MOTION_ONLY: (0.0, None, None)}
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from core.config import settings
+from services.face_tracker import UNKNOWN_NAME
+from services.gallery_index import GalleryIndex
+
+THRESHOLD = 0.4
+
+def _gallery(people=40, per_person=5, dim=512, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((people, dim)).astype(np.float32)
+    known = {f"person_{i}": [centers[i] + 0.3 * rng.standard_normal(dim).astype(np.float32)
+                             for _ in range(per_person)]
+             for i in range(people)}
+    queries = centers + 0.3 * rng.standard_normal(centers.shape).astype(np.float32)
+    strangers = rng.standard_normal((10, dim)).astype(np.float32)
+    return known, np.vstack([queries, strangers])
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_compressed_gallery_matches_float32(dtype):
+    known, queries = _gallery()
+    reference = GalleryIndex.from_dict(known, "float32").match_many(queries, THRESHOLD)
+    compressed = GalleryIndex.from_dict(known, dtype).match_many(queries, THRESHOLD)
+
+    assert [name for name, _ in compressed] == [name for name, _ in reference]
+    assert np.allclose([c for _, c in compressed], [c for _, c in reference], atol=0.01)
+    # 등록 인물은 모두 맞히고 무작위 벡터는 미등록으로 남아야 함
+    assert [name for name, _ in reference[:40]] == [f"person_{i}" for i in range(40)]
+    assert all(name == UNKNOWN_NAME for name, _ in reference[40:])
+
+@pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+def test_chunked_search_equals_single_block(dtype, monkeypatch):
+    known, queries = _gallery(people=20)
+    index = GalleryIndex.from_dict(known, dtype)
+    full_idx, full_sim = index.search(queries)
+
+    monkeypatch.setattr(settings, "GALLERY_MATCH_CHUNK", 7)
+    chunk_idx, chunk_sim = index.search(queries)
+
+    assert np.array_equal(full_idx, chunk_idx)
+    assert np.allclose(full_sim, chunk_sim, atol=1e-5)
+
+def test_compressed_storage_is_smaller():
+    known, _ = _gallery()
+    sizes = {dtype: GalleryIndex.from_dict(known, dtype).vectors.nbytes for dtype in ("float32", "float16", "int8")}
+    assert sizes["float16"] * 2 == sizes["float32"]
+    assert sizes["int8"] * 4 == sizes["float32"]
+
+def test_empty_gallery_and_unknown_dtype():
+    index = GalleryIndex.from_dict({}, "int8")
+    assert index.size == 0
+    assert index.match(np.ones(512, dtype=np.float32), THRESHOLD) == (UNKNOWN_NAME, 0.0)
+    with pytest.raises(ValueError):
+        GalleryIndex.from_dict({}, "bfloat16")
@@ -0,0 +1,66 @@
+import json
+import pytest
+from core.config import settings
+from services import mqtt_codec
+from services.mqtt_codec import CBOR, JSON, MSGPACK, compact_alert, decode_payload, dumps, pack_bytes, unpack_bytes
+
+ALERT = {
+    "location": "front_door",
+    "person_detected": True,
+    "confidence": 0.8734,
+    "identities": ["alice", "unknown-1019-a1b2c3-0001"],
+    "bboxes": [[10.7, 20.2, 110.0, 140.9]],
+    "event_count": 3,
+    "first_seen": 1760000000.123,
+    "last_seen": 1760000001.5,
+    "captured_at": 1760000001.25,
+    "coalesced": True,
+    "thumbnail": "/mqtt/alerts/thumbnails/1-1"
+}
+
+def test_compact_alert_fields():
+    compact = compact_alert(ALERT, now=1760000002.0)
+    assert compact == {
+        "v": mqtt_codec.SCHEMA_VERSION, "ts": 1760000002000, "cam": "front_door", "p": True, "c": 873,
+        "ids": ["alice", "unknown-1019-a1b2c3-0001"], "box": [[10, 20, 110, 140]], "n": 3,
+        "fs": 1760000000123, "ls": 1760000001500, "cap": 1760000001250, "co": True,
+        "th": "/mqtt/alerts/thumbnails/1-1"
+    }
+
+def test_compact_alert_omits_missing_optional_fields():
+    compact = compact_alert({"location": "cam1", "confidence": 0.0}, now=1.0)
+    assert set(compact) == {"v", "ts", "cam", "p", "c", "ids"}
+    assert compact["ids"] == [] and compact["p"] is False
+
+@pytest.mark.parametrize("encoding, module", [(JSON, None), (MSGPACK, "msgpack"), (CBOR, "cbor2")])
+def test_round_trip(encoding, module):
+    if module:
+        pytest.importorskip(module)
+    compact = compact_alert(ALERT, now=1760000002.0)
+    payload = dumps(encoding, compact)
+    assert isinstance(payload, str if encoding == JSON else bytes)
+    assert decode_payload(payload) == compact
+    if encoding == JSON:
+        assert decode_payload(payload.encode("utf-8")) == compact
+    else:
+        # 바이너리 인코딩이 JSON보다 작아야 의미가 있음
+        assert len(payload) < len(json.dumps(compact))
+
+@pytest.mark.parametrize("encoding, module", [(JSON, None), (MSGPACK, "msgpack"), (CBOR, "cbor2")])
+def test_bytes_round_trip(encoding, module):
+    if module:
+        pytest.importorskip(module)
+    blob = bytes(range(256))
+    decoded = decode_payload(dumps(encoding, {"jpg": pack_bytes(encoding, blob)}))
+    assert unpack_bytes(decoded["jpg"]) == blob
+
+def test_unknown_payload_rejected():
+    with pytest.raises(ValueError):
+        decode_payload(b"\x00\x01garbage")
+
+def test_topic_encoding_falls_back_to_json(monkeypatch):
+    monkeypatch.setattr(settings, "MQTT_PAYLOAD_ENCODING", "msgpack")
+    monkeypatch.setattr(settings, "MQTT_TOPIC_ENCODING", {"legacy/alerts": "json"})
+    monkeypatch.setattr(mqtt_codec, "msgpack", None)
+    assert mqtt_codec.topic_encoding("legacy/alerts") == JSON
+    assert mqtt_codec.topic_encoding("alerts") == JSON
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from core.config import settings
+from services.mqtt_outbox import MQTTOutbox
+
+class FakeMQTT:
+    """FastMQTT 대용: 연결 상태와 발행 기록만 흉내 (확인 응답 저장소 없음)"""
+
+    def __init__(self, fail_after=None):
+        self.client = type("Client", (), {"is_connected": True})()
+        self.sent = []
+        self.fail_after = fail_after
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        if self.fail_after is not None and len(self.sent) >= self.fail_after:
+            raise ConnectionError("끊김")
+        self.sent.append((topic, payload, qos, retain))
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MQTT_OUTBOX_MAX_MESSAGES", 5)
+    monkeypatch.setattr(settings, "MQTT_OUTBOX_MAX_BYTES", 10 * 1024)
+    monkeypatch.setattr(settings, "MQTT_OUTBOX_OVERFLOW", "drop_oldest")
+    monkeypatch.setattr(settings, "MQTT_OUTBOX_BATCH", 3)
+    outbox = MQTTOutbox(str(tmp_path / "outbox.db"))
+    yield outbox
+    if outbox._conn is not None:
+        outbox._conn.close()
+    outbox._executor.shutdown()
+
+def _payloads(outbox):
+    return [row[2] for row in outbox._db().execute("SELECT seq, topic, payload FROM outbox ORDER BY seq")]
+
+def test_fetch_keeps_enqueue_order(outbox):
+    for i in range(3):
+        assert outbox.enqueue("t", f"m{i}")
+    assert [row[2] for row in outbox._fetch_batch()] == [b"m0", b"m1", b"m2"]
+    assert (outbox.pending, outbox.pending_bytes) == (3, 6)
+
+def test_drop_oldest_on_message_limit(outbox):
+    for i in range(8):
+        assert outbox.enqueue("t", f"m{i}")
+    assert _payloads(outbox) == [b"m3", b"m4", b"m5", b"m6", b"m7"]
+    assert outbox.pending == 5
+    assert outbox.stats["dropped_overflow"] == 3
+
+def test_drop_oldest_on_byte_limit(outbox, monkeypatch):
+    monkeypatch.setattr(settings, "MQTT_OUTBOX_MAX_BYTES", 25)
+    for i in range(3):
+        outbox.enqueue("t", b"x" * 10)
+    assert outbox.pending == 2
+    assert outbox.pending_bytes == 20
+    # 상한보다 큰 메시지는 모두 비워도 들어갈 수 없으므로 거부
+    assert not outbox.enqueue("t", b"y" * 30)
+    assert outbox.stats["rejected"] == 1
+
+def test_reject_policy(outbox, monkeypatch):
+    monkeypatch.setattr(settings, "MQTT_OUTBOX_OVERFLOW", "reject")
+    results = [outbox.enqueue("t", f"m{i}") for i in range(7)]
+    assert results == [True] * 5 + [False] * 2
+    assert _payloads(outbox) == [b"m0", b"m1", b"m2", b"m3", b"m4"]
+    assert outbox.stats["rejected"] == 2
+
+def test_ack_after_overflow_during_drain(outbox):
+    for i in range(5):
+        outbox.enqueue("t", f"m{i}")
+    batch = outbox._fetch_batch()
+    # 배출 중 상한 초과로 배치 일부(m0, m1)가 이미 삭제된 경우 중복 차감하지 않음
+    outbox.enqueue("t", "m5")
+    outbox.enqueue("t", "m6")
+    outbox._ack(batch)
+    assert _payloads(outbox) == [b"m3", b"m4", b"m5", b"m6"]
+    assert (outbox.pending, outbox.pending_bytes) == (4, 8)
+
+def test_drain_publishes_in_order(outbox):
+    client = FakeMQTT()
+    outbox._client = client
+
+    async def run():
+        for i in range(5):
+            await outbox.enqueue_async("t", f"m{i}", qos=1)
+        await outbox._drain_all()
+    asyncio.run(run())
+
+    assert [payload for _, payload, _, _ in client.sent] == [b"m0", b"m1", b"m2", b"m3", b"m4"]
+    assert outbox.pending == 0
+    assert outbox.stats["batches"] == 2
+
+def test_publish_error_keeps_rest_in_order(outbox):
+    client = FakeMQTT(fail_after=2)
+    outbox._client = client
+    for i in range(4):
+        outbox.enqueue("t", f"m{i}")
+
+    assert asyncio.run(outbox._drain_batch()) == 2
+    assert _payloads(outbox) == [b"m2", b"m3"]
+    assert outbox.stats["publish_errors"] == 1
+
+    client.fail_after = None
+    asyncio.run(outbox._drain_all())
+    assert [payload for _, payload, _, _ in client.sent] == [b"m0", b"m1", b"m2", b"m3"]
+    assert outbox.pending == 0
+
+def test_pending_restored_from_disk(outbox):
+    for i in range(3):
+        outbox.enqueue("t", f"m{i}")
+    outbox._conn.close()
+    restarted = MQTTOutbox(outbox.path)
+    restarted._db()
+    assert (restarted.pending, restarted.pending_bytes) == (3, 6)
+    restarted._conn.close()
+    restarted._executor.shutdown()
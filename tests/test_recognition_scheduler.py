@@ -0,0 +1,86 @@
+import time
+import pytest
+from collections import Counter
+from core.config import settings
+from services.recognition_scheduler import RecognitionScheduler
+
+def _noop(*args):
+    return None
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(settings, "RECOGNITION_MAX_QUEUE", 3)
+    monkeypatch.setattr(settings, "RECOGNITION_DEADLINE_MS", 2000.0)
+    scheduler = RecognitionScheduler()
+    # 워커 스레드 없이 _next_job()으로 직접 꺼내 확인
+    scheduler._running = True
+    return scheduler
+
+def _pop(scheduler):
+    with scheduler._cond:
+        return scheduler._next_job()
+
+def _finish(scheduler, job):
+    with scheduler._cond:
+        scheduler._cameras[job.camera_id].in_flight -= 1
+
+def test_overflow_drops_oldest_droppable_job(scheduler):
+    for i in range(4):
+        assert scheduler.submit("cam", _noop, i)
+    queue = scheduler._cameras["cam"]
+    assert [job.args[0] for job in queue.jobs] == [1, 2, 3]
+    assert queue.dropped_overflow == 1
+
+def test_overflow_keeps_non_droppable_jobs(scheduler):
+    scheduler.submit("cam", _noop, "close-1", droppable=False)
+    scheduler.submit("cam", _noop, "frame", droppable=True)
+    scheduler.submit("cam", _noop, "close-2", droppable=False)
+    # 가득 찬 대기열에서는 버릴 수 있는 작업만 밀려남
+    assert scheduler.submit("cam", _noop, "frame-2")
+    assert [job.args[0] for job in scheduler._cameras["cam"].jobs] == ["close-1", "close-2", "frame-2"]
+
+    scheduler.submit("full", _noop, 1, droppable=False)
+    scheduler.submit("full", _noop, 2, droppable=False)
+    scheduler.submit("full", _noop, 3, droppable=False)
+    assert not scheduler.submit("full", _noop, 4)
+    # 종료 작업은 대기열이 가득 차도 항상 들어감
+    assert scheduler.submit("full", _noop, 5, droppable=False)
+    assert [job.args[0] for job in scheduler._cameras["full"].jobs] == [1, 2, 3, 5]
+
+def test_weighted_round_robin(scheduler, monkeypatch):
+    monkeypatch.setattr(settings, "RECOGNITION_MAX_QUEUE", 100)
+    scheduler.configure_camera("front", weight=3, max_in_flight=100)
+    scheduler.configure_camera("back", weight=1, max_in_flight=100)
+    for i in range(40):
+        scheduler.submit("front", _noop, i)
+        scheduler.submit("back", _noop, i)
+
+    order = [_pop(scheduler).camera_id for _ in range(16)]
+    assert Counter(order) == {"front": 12, "back": 4}
+    # smooth WRR: 낮은 가중치 카메라도 4번 중 1번은 차례가 옴
+    for i in range(0, 16, 4):
+        assert order[i:i + 4].count("back") == 1
+
+def test_max_in_flight_limits_camera(scheduler):
+    scheduler.configure_camera("a", max_in_flight=1)
+    scheduler.submit("a", _noop, 1)
+    scheduler.submit("a", _noop, 2)
+    scheduler.submit("b", _noop, 1)
+
+    first = _pop(scheduler)
+    second = _pop(scheduler)
+    assert {first.camera_id, second.camera_id} == {"a", "b"}
+    assert _pop(scheduler) is None
+    _finish(scheduler, first if first.camera_id == "a" else second)
+    assert _pop(scheduler).camera_id == "a"
+
+def test_stale_jobs_are_dropped(scheduler):
+    scheduler.configure_camera("cam", deadline_ms=50)
+    scheduler.submit("cam", _noop, "old")
+    scheduler.submit("cam", _noop, "close", droppable=False)
+    for job in scheduler._cameras["cam"].jobs:
+        job.enqueued_at = time.monotonic() - 1.0
+
+    job = _pop(scheduler)
+    assert job.args == ("close",)
+    assert scheduler._cameras["cam"].dropped_stale == 1
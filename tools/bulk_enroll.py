@@ -0,0 +1,52 @@
+"""
+사진 일괄 등록 도구
+
+인물별 하위 폴더(또는 같은 구조의 zip)에 있는 사진을 프로세스 풀로 임베딩하고,
+모든 결과를 갤러리에 한 번에 반영한 뒤 처리량과 인물별 실패 내역을 출력합니다.
+
+사용 예 (프로젝트 루트에서 실행):
+    python -m tools.bulk_enroll --source ./employees --workers 4
+    python -m tools.bulk_enroll --source ./employees.zip --profile cpu_int8 --chunk 32
+
+폴더 구조:
+    employees/
+        홍길동/ 001.jpg 002.jpg ...
+        김철수/ ...
+"""
+import argparse
+from core.config import settings
+from services.bulk_enrollment_service import bulk_enroll
+
+def print_progress(progress):
+    print(f"\r{progress['images']}/{progress['total']} 처리, {progress['enrolled']}개 등록", end="", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="사진 일괄 얼굴 등록")
+    parser.add_argument("--source", required=True, help="인물별 하위 폴더가 있는 디렉토리 또는 zip")
+    parser.add_argument("--profile", default=None, help="모델 프로필 (기본: DEFAULT_MODEL_PROFILE)")
+    parser.add_argument("--workers", type=int, default=settings.BULK_ENROLL_WORKERS,
+                        help="워커 프로세스 수 (0이면 CPU 코어의 절반)")
+    parser.add_argument("--chunk", type=int, default=settings.BULK_ENROLL_CHUNK, help="워커 작업당 사진 수")
+    parser.add_argument("--show-failures", action="store_true", help="실패한 사진 목록 출력")
+    args = parser.parse_args()
+
+    report = bulk_enroll(args.source, profile=args.profile, workers=args.workers or None,
+                         chunk_size=args.chunk, progress=print_progress)
+    print()
+
+    header = f"{'person':<20}{'images':>8}{'enrolled':>10}{'failed':>8}"
+    print(header)
+    print("-" * len(header))
+    for person, stats in sorted(report["people"].items()):
+        print(f"{person:<20}{stats['images']:>8}{stats['enrolled']:>10}{len(stats['failures']):>8}")
+        if args.show_failures:
+            for failure in stats["failures"]:
+                print(f"    {failure['image']}: {failure['error']}")
+    print("-" * len(header))
+    print(
+        f"사진 {report['images']}장, 등록 {report['enrolled']}개, 실패 {report['failed']}개, "
+        f"워커 {report['workers']}개, {report['elapsed_sec']:.2f}초 ({report['images_per_sec']:.1f}장/초)"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+갤러리 압축 도구 (거의 동일한 임베딩 제거 + 인물별 프로토타입 클러스터링)
+
+사용 예 (프로젝트 루트에서 실행):
+    python -m tools.compact_gallery --report                  # 압축 전후 비교만 출력
+    python -m tools.compact_gallery --dedup 0.95 --prototypes 8
+    python -m tools.compact_gallery --person 홍길동 --dry-run
+
+제거된 임베딩은 기본적으로 인물 폴더의 .archive/로 이동합니다 (--no-archive로 삭제).
+"""
+import argparse
+from core.config import settings
+from services.gallery_service import compact_person, evaluate_compaction, list_person_dirs
+
+def print_report(report):
+    print(f"인물 {report['people']}명, 평가 쿼리 {report['queries']}개")
+    print(f"{'':<10}{'gallery':>10}{'ms/query':>10}{'recall':>9}")
+    for key in ("before", "after"):
+        print(
+            f"{key:<10}{report[f'gallery_size_{key}']:>10}"
+            f"{report[f'match_ms_per_query_{key}']:>10.3f}{report[f'recall_{key}']:>9.3f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="얼굴 갤러리 압축")
+    parser.add_argument("--dedup", type=float, default=settings.GALLERY_DEDUP_THRESHOLD,
+                        help="이 코사인 유사도 이상인 임베딩은 중복으로 간주")
+    parser.add_argument("--prototypes", type=int, default=settings.GALLERY_PROTOTYPES,
+                        help="인물별 프로토타입 수 (0이면 중복 제거만)")
+    parser.add_argument("--person", nargs="*", help="대상 인물 (기본: 전체)")
+    parser.add_argument("--report", action="store_true", help="압축하지 않고 전후 비교만 출력")
+    parser.add_argument("--dry-run", action="store_true", help="결과 크기만 계산")
+    parser.add_argument("--no-archive", action="store_true", help="제거된 임베딩을 보관하지 않고 삭제")
+    args = parser.parse_args()
+
+    print_report(evaluate_compaction(args.dedup, args.prototypes))
+    if args.report:
+        return
+
+    total_before = total_after = 0
+    for person in args.person or list_person_dirs():
+        result = compact_person(person, args.dedup, args.prototypes,
+                                archive=not args.no_archive, dry_run=args.dry_run)
+        total_before += result["before"]
+        total_after += result["after"]
+        if result["before"]:
+            print(f"{person}: {result['before']} -> {result['after']}")
+    print(f"전체: {total_before} -> {total_after}" + (" (dry-run)" if args.dry_run else ""))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+모델 프로필 간 정확도 / 지연 시간 비교 도구
+
+라벨링된 로컬 얼굴 폴더(사람별 하위 폴더)에 대해 각 프로필로 탐지와 임베딩을 수행하고,
+leave-one-out 최근접 이웃 top-1 정확도, 기준 프로필과의 예측 일치율, 단계별 지연 시간을 출력합니다.
+
+사용 예 (프로젝트 루트에서 실행):
+    python -m tools.compare_models --faces ./labelled_faces --profiles default cpu_int8
+
+폴더 구조:
+    labelled_faces/
+        홍길동/ 001.jpg 002.jpg ...
+        김철수/ ...
+"""
+import os
+import time
+import argparse
+import cv2
+import numpy as np
+from core.config import settings
+from services.face_detection_service import FaceDetectionService
+from services.face_tracker import UNKNOWN_NAME
+from services.model_registry import model_registry
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+def load_labelled_images(root: str):
+    items = []
+    for person in sorted(os.listdir(root)):
+        person_dir = os.path.join(root, person)
+        if not os.path.isdir(person_dir):
+            continue
+        for file in sorted(os.listdir(person_dir)):
+            if file.lower().endswith(IMAGE_EXTENSIONS):
+                items.append((person, os.path.join(person_dir, file)))
+    return items
+
+def run_profile(profile: str, items, warmup: int = 3):
+    """프로필 하나로 모든 이미지의 임베딩과 단계별 지연 시간 측정"""
+    service = FaceDetectionService(model_profile=profile)
+    load_start = time.perf_counter()
+    model_registry.warmup([profile])
+    load_time = time.perf_counter() - load_start
+
+    images = [(label, cv2.imread(path)) for label, path in items]
+    for _, image in images[:warmup]:
+        if image is not None:
+            service.extract_face_embeddings(image)
+
+    det_times, rec_times = [], []
+    embeddings = []
+    for label, image in images:
+        if image is None:
+            embeddings.append(None)
+            continue
+        start = time.perf_counter()
+        faces = service.detect_faces(image)
+        det_times.append(time.perf_counter() - start)
+        if not faces:
+            embeddings.append(None)
+            continue
+        # 사진당 가장 큰 얼굴만 사용
+        face = max(faces, key=lambda f: (f["bbox"][2] - f["bbox"][0]) * (f["bbox"][3] - f["bbox"][1]))
+        start = time.perf_counter()
+        emb = service.embed_faces(image, [face])[0]
+        rec_times.append(time.perf_counter() - start)
+        embeddings.append(emb / (np.linalg.norm(emb) + 1e-12))
+
+    model_registry.unload(profile, force=True)
+    return {"embeddings": embeddings, "det_times": det_times, "rec_times": rec_times, "load_time": load_time}
+
+def leave_one_out_predictions(labels, embeddings, threshold: float):
+    valid = [i for i, e in enumerate(embeddings) if e is not None]
+    if len(valid) < 2:
+        return {}
+    matrix = np.stack([embeddings[i] for i in valid])
+    sims = matrix @ matrix.T
+    np.fill_diagonal(sims, -1.0)
+    predictions = {}
+    for row, i in enumerate(valid):
+        best = int(np.argmax(sims[row]))
+        predictions[i] = labels[valid[best]] if sims[row, best] >= threshold else UNKNOWN_NAME
+    return predictions
+
+def percentile_ms(values, q):
+    return float(np.percentile(values, q) * 1000) if values else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="모델 프로필 정확도/지연 시간 비교")
+    parser.add_argument("--faces", required=True, help="라벨링된 얼굴 폴더 (사람별 하위 폴더)")
+    parser.add_argument("--profiles", nargs="+", default=list(settings.MODEL_PROFILES.keys()),
+                        help="비교할 프로필 (첫 번째가 기준)")
+    parser.add_argument("--threshold", type=float, default=settings.SIMILARITY_THRESHOLD)
+    args = parser.parse_args()
+
+    items = load_labelled_images(args.faces)
+    if not items:
+        print("이미지가 없습니다.")
+        return
+    labels = [label for label, _ in items]
+    print(f"이미지 {len(items)}장, 인물 {len(set(labels))}명")
+
+    results = {}
+    for profile in args.profiles:
+        print(f"[{profile}] 측정 중...")
+        results[profile] = run_profile(profile, items)
+        results[profile]["predictions"] = leave_one_out_predictions(
+            labels, results[profile]["embeddings"], args.threshold
+        )
+
+    baseline = args.profiles[0]
+    base = results[baseline]
+    header = f"{'profile':<12}{'load(s)':>9}{'det p50':>9}{'det p95':>9}{'rec p50':>9}{'rec p95':>9}{'top-1':>8}{'agree':>8}{'cos':>7}"
+    print(header)
+    print("-" * len(header))
+    for profile in args.profiles:
+        r = results[profile]
+        preds = r["predictions"]
+        correct = sum(1 for i, p in preds.items() if p == labels[i])
+        accuracy = correct / len(preds) if preds else 0.0
+        common = [i for i in preds if i in base["predictions"]]
+        agree = sum(1 for i in common if preds[i] == base["predictions"][i]) / len(common) if common else 0.0
+        # 기준 프로필 임베딩과의 평균 코사인 유사도 (양자화로 인한 임베딩 변화량)
+        cos = [float(np.dot(e, base["embeddings"][i])) for i, e in enumerate(r["embeddings"])
+               if e is not None and base["embeddings"][i] is not None]
+        print(
+            f"{profile:<12}{r['load_time']:>9.2f}"
+            f"{percentile_ms(r['det_times'], 50):>9.1f}{percentile_ms(r['det_times'], 95):>9.1f}"
+            f"{percentile_ms(r['rec_times'], 50):>9.1f}{percentile_ms(r['rec_times'], 95):>9.1f}"
+            f"{accuracy:>8.3f}{agree:>8.3f}{(np.mean(cos) if cos else 0.0):>7.3f}"
+        )
+    print("(지연 시간 단위: ms, top-1: leave-one-out 정확도, agree: 기준 프로필과 예측 일치율)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+갤러리 압축 형식(float32 / float16 / int8) 비교 리포트
+
+인물별로 일부 임베딩을 쿼리로 떼어 내고, 나머지로 만든 갤러리를 각 형식으로 압축하여
+메모리 사용량, 매칭 처리량, float32 대비 top-1 일치율을 출력합니다.
+
+사용 예 (프로젝트 루트에서 실행):
+    python -m tools.gallery_report
+    python -m tools.gallery_report --batch 16 --repeat 5
+"""
+import os
+import time
+import argparse
+import numpy as np
+from core.config import settings
+from services.gallery_index import GalleryIndex, SUPPORTED_DTYPES
+from services.gallery_service import list_person_dirs, load_person_embeddings, person_dir_path
+
+def load_split(holdout_every: int):
+    gallery, queries, labels = {}, [], []
+    legacy_bytes = 0
+    for person in list_person_dirs():
+        person_dir = person_dir_path(person)
+        files, embeddings = load_person_embeddings(person_dir)
+        if len(embeddings) < 2:
+            continue
+        # 기존 캐시는 파일에 저장된 dtype(float32 또는 float64) 그대로 리스트로 보관
+        legacy_bytes += sum(np.load(os.path.join(person_dir, f)).nbytes for f in files)
+        mask = np.zeros(len(embeddings), dtype=bool)
+        mask[::holdout_every] = True
+        if mask.all():
+            mask[-1] = False
+        queries.extend(embeddings[mask])
+        labels.extend([person] * int(mask.sum()))
+        gallery[person] = list(embeddings[~mask])
+    return gallery, np.array(queries, dtype=np.float32), labels, legacy_bytes
+
+def main():
+    parser = argparse.ArgumentParser(description="갤러리 압축 형식 비교")
+    parser.add_argument("--holdout-every", type=int, default=5, help="인물별 n번째 임베딩을 쿼리로 사용")
+    parser.add_argument("--batch", type=int, default=1, help="한 번에 매칭할 쿼리 수")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    gallery, queries, labels, legacy_bytes = load_split(args.holdout_every)
+    if not len(queries):
+        print("평가할 임베딩이 없습니다.")
+        return
+    print(f"인물 {len(gallery)}명, 쿼리 {len(queries)}개, 기존 리스트 캐시 {legacy_bytes / 1024:.1f}KB")
+
+    reference = None
+    print(f"{'dtype':<9}{'memory(KB)':>12}{'ratio':>8}{'queries/s':>12}{'agree':>8}{'recall':>8}{'max err':>9}")
+    for dtype in SUPPORTED_DTYPES:
+        index = GalleryIndex.from_dict(gallery, dtype=dtype)
+        best_idx, best_sim = index.search(queries)
+        if reference is None:
+            reference = (best_idx, best_sim, index.nbytes)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for i in range(0, len(queries), args.batch):
+                index.search(queries[i:i + args.batch])
+        qps = len(queries) * args.repeat / (time.perf_counter() - start)
+
+        agree = float(np.mean(index.labels[best_idx] == index.labels[reference[0]]))
+        matches = index.match_many(queries, settings.SIMILARITY_THRESHOLD)
+        recall = sum(1 for (name, _), label in zip(matches, labels) if name == label) / len(labels)
+        max_err = float(np.max(np.abs(best_sim - reference[1])))
+        print(
+            f"{dtype:<9}{index.nbytes / 1024:>12.1f}{reference[2] / index.nbytes:>8.2f}"
+            f"{qps:>12.0f}{agree:>8.3f}{recall:>8.3f}{max_err:>9.4f}"
+        )
+    print("(agree: float32 대비 top-1 인물 일치율, max err: top-1 유사도 최대 오차)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+CPU 장비용 INT8 양자화 / 그래프 최적화 ONNX 모델 생성 도구
+
+사용 예 (프로젝트 루트에서 실행):
+    python -m tools.optimize_models --pack ~/.insightface/models/buffalo_l \
+        --output ~/.insightface/models/buffalo_l_int8 --mode dynamic
+    python -m tools.optimize_models --pack ~/.insightface/models/buffalo_l \
+        --output ~/.insightface/models/buffalo_l_int8 --mode static --calibration ./faces
+
+생성된 파일은 core/config.py의 ModelProfile.det_model_file / rec_model_file로 지정합니다.
+"""
+import os
+import glob
+import argparse
+import cv2
+import onnxruntime
+from onnxruntime.quantization import (
+    CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+)
+
+DET_MODEL = "det_10g.onnx"
+REC_MODEL = "w600k_r50.onnx"
+
+class ImageFolderReader(CalibrationDataReader):
+    """정적 양자화 보정용 이미지 입력 (insightface 전처리와 동일한 정규화)"""
+
+    def __init__(self, model_path: str, image_dir: str, mean: float, std: float, limit: int = 200):
+        session = onnxruntime.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        height, width = model_input.shape[2], model_input.shape[3]
+        # 탐지 모델은 입력 크기가 동적이므로 기본 탐지 크기 사용
+        self.size = (width if isinstance(width, int) else 640, height if isinstance(height, int) else 640)
+        self.mean = mean
+        self.std = std
+        paths = sorted(glob.glob(os.path.join(image_dir, "**", "*.*"), recursive=True))
+        self.paths = [p for p in paths if p.lower().endswith((".jpg", ".jpeg", ".png"))][:limit]
+        self._iter = iter(self.paths)
+
+    def get_next(self):
+        for path in self._iter:
+            image = cv2.imread(path)
+            if image is None:
+                continue
+            blob = cv2.dnn.blobFromImage(image, 1.0 / self.std, self.size,
+                                         (self.mean, self.mean, self.mean), swapRB=True)
+            return {self.input_name: blob}
+        return None
+
+def preprocess(model_path: str, output_path: str) -> str:
+    """양자화 전 shape 추론 및 기본 최적화 (가능한 경우)"""
+    try:
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+        quant_pre_process(model_path, output_path, skip_symbolic_shape=True)
+        return output_path
+    except Exception as e:
+        print(f"[경고] 전처리 생략 ({os.path.basename(model_path)}): {e}")
+        return model_path
+
+def optimize_graph(model_path: str, output_path: str, level: str = "extended"):
+    """onnxruntime 그래프 최적화 결과를 파일로 저장 (로드 시 최적화 비용 제거)"""
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = {
+        "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }[level]
+    options.optimized_model_filepath = output_path
+    onnxruntime.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+def quantize(model_path: str, output_path: str, mode: str, calibration: str = None,
+             mean: float = 127.5, std: float = 127.5):
+    tmp_path = output_path + ".pre.onnx"
+    source = preprocess(model_path, tmp_path)
+    try:
+        if mode == "dynamic":
+            quantize_dynamic(source, output_path, weight_type=QuantType.QInt8)
+        else:
+            if not calibration:
+                raise ValueError("정적 양자화에는 --calibration 이미지 폴더가 필요합니다.")
+            reader = ImageFolderReader(source, calibration, mean, std)
+            quantize_static(source, output_path, reader, quant_format=QuantFormat.QDQ,
+                            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                            per_channel=True)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 양자화 / 그래프 최적화 ONNX 모델 생성")
+    parser.add_argument("--pack", required=True, help="원본 모델 팩 디렉토리 (예: ~/.insightface/models/buffalo_l)")
+    parser.add_argument("--output", required=True, help="출력 디렉토리")
+    parser.add_argument("--mode", choices=["dynamic", "static", "optimize"], default="dynamic",
+                        help="dynamic/static: INT8 양자화, optimize: fp32 그래프 최적화만 수행")
+    parser.add_argument("--calibration", help="정적 양자화용 얼굴 이미지 폴더")
+    parser.add_argument("--models", nargs="+", default=[DET_MODEL, REC_MODEL])
+    args = parser.parse_args()
+
+    pack = os.path.expanduser(args.pack)
+    output = os.path.expanduser(args.output)
+    os.makedirs(output, exist_ok=True)
+
+    for model_name in args.models:
+        src = os.path.join(pack, model_name)
+        dst = os.path.join(output, model_name)
+        if not os.path.exists(src):
+            print(f"[건너뜀] 모델 파일 없음: {src}")
+            continue
+
+        if args.mode == "optimize":
+            optimize_graph(src, dst)
+        else:
+            # 탐지 모델(SCRFD)과 인식 모델(ArcFace)의 입력 정규화 값
+            mean, std = (127.5, 128.0) if model_name == DET_MODEL else (127.5, 127.5)
+            quantize(src, dst, args.mode, args.calibration, mean, std)
+
+        before = os.path.getsize(src) / 1024 / 1024
+        after = os.path.getsize(dst) / 1024 / 1024
+        print(f"{model_name}: {before:.1f}MB -> {after:.1f}MB ({args.mode})")
+
+if __name__ == "__main__":
+    main()
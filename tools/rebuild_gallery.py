@@ -0,0 +1,75 @@
+"""
+갤러리 재생성 도구
+
+등록 시 임베딩과 함께 저장한 정렬된 얼굴 크롭(인물 폴더의 crops.zip)을 새 모델 프로필로
+다시 임베딩하여 새 갤러리 버전(.versions/)을 만들고, 완료되면 활성 갤러리를 원자적으로 전환합니다.
+크롭이 없거나 임베딩에 실패한 인물이 있으면 버전만 만들고 전환하지 않습니다 (--force로 전환).
+탐지/정렬 없이 인식 모델만 배치로 실행하므로 사진 재등록보다 훨씬 빠릅니다.
+
+사용 예 (프로젝트 루트에서 실행):
+    python -m tools.rebuild_gallery --profile cpu_int8 --workers 4
+    python -m tools.rebuild_gallery --profile cpu_int8 --no-activate
+    python -m tools.rebuild_gallery --profile cpu_int8 --force
+    python -m tools.rebuild_gallery --list
+    python -m tools.rebuild_gallery --activate root
+"""
+import argparse
+from core.config import settings
+from services.gallery_rebuild_service import rebuild_gallery
+from services.gallery_service import activate_gallery_version, list_gallery_versions
+
+def print_progress(progress):
+    print(f"\r{progress['crops']}/{progress['total']} 크롭, {progress['embedded']}개 임베딩", end="", flush=True)
+
+def print_versions():
+    for v in list_gallery_versions():
+        mark = "*" if v["active"] else " "
+        print(f"{mark} {v['version']:<32}{v.get('profile') or settings.DEFAULT_MODEL_PROFILE:<16}{v.get('embeddings', '')}")
+
+def main():
+    parser = argparse.ArgumentParser(description="저장된 얼굴 크롭으로 갤러리 재생성")
+    parser.add_argument("--profile", default=None, help="새 갤러리에 사용할 모델 프로필")
+    parser.add_argument("--workers", type=int, default=settings.GALLERY_REBUILD_WORKERS,
+                        help="워커 프로세스 수 (0이면 CPU 코어의 절반)")
+    parser.add_argument("--no-activate", action="store_true", help="생성만 하고 활성 갤러리는 전환하지 않음")
+    parser.add_argument("--force", action="store_true",
+                        help="크롭이 없거나 임베딩에 실패한 인물이 빠져도 전환")
+    parser.add_argument("--list", action="store_true", help="갤러리 버전 목록 출력")
+    parser.add_argument("--activate", default=None, metavar="VERSION", help="기존 갤러리 버전으로 전환")
+    args = parser.parse_args()
+
+    if args.list:
+        print_versions()
+        return
+    if args.activate:
+        versions = {v["version"]: v for v in list_gallery_versions()}
+        if args.activate not in versions:
+            parser.error(f"갤러리 버전을 찾을 수 없습니다: {args.activate}")
+        activate_gallery_version(args.activate, versions[args.activate].get("profile"))
+        print_versions()
+        return
+    if not args.profile:
+        parser.error("--profile이 필요합니다")
+
+    report = rebuild_gallery(args.profile, workers=args.workers or None,
+                             activate=not args.no_activate, force=args.force,
+                             progress=print_progress)
+    print()
+
+    for person, count in sorted(report["people"].items()):
+        failed = len(report["failures"].get(person, []))
+        print(f"{person:<20}{count:>8}{failed:>8}")
+    if report["skipped_people"]:
+        print(f"크롭이 없어 제외된 인물: {', '.join(report['skipped_people'])}")
+    if "incomplete" in report["activation_blocked"]:
+        print("제외/실패한 인물이 있어 전환하지 않았습니다. 확인 후 --force 또는 --activate로 전환하세요.")
+    if "source_changed" in report["activation_blocked"]:
+        print("재생성 중 원본 갤러리가 변경되어 전환하지 않았습니다. 다시 실행하세요.")
+    print(
+        f"버전 {report['version'] or '-'} ({'활성화' if report['activated'] else '비활성'}), "
+        f"크롭 {report['crops']}개 중 {report['embedded']}개 임베딩, 워커 {report['workers']}개, "
+        f"{report['elapsed_sec']:.2f}초 ({report['crops_per_sec']:.1f}개/초)"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+분산 인식 워커
+
+캡처 노드(RECOGNITION_MODE=remote)가 MQTT로 보낸 정렬된 얼굴 크롭 작업을 공유 구독
+($share/REMOTE_RECOGNITION_GROUP/REMOTE_RECOGNITION_JOB_TOPIC)으로 나눠 받아 FaceDetectionService로
+임베딩/갤러리 매칭을 수행하고, 작업의 응답 토픽(reply_to)으로 상관 ID와 함께 결과를 돌려줍니다.
+워커는 상태가 없으며 갤러리는 이 장비의 KNOWN_FACES_DIR(활성 버전)을 사용하므로 캡처 노드와
+같은 갤러리/모델 프로필을 배포해야 합니다.
+
+MQTT v5 수신 최대치(--prefetch)와 수동 확인 응답을 사용하므로 브로커는 처리 중인 워커에 작업을
+더 보내지 않고 한가한 워커에 넘깁니다. 마감 시간이 지난 작업(캡처 노드가 이미 폴백 처리)은 건너뜁니다.
+
+사용 예 (프로젝트 루트에서 실행, 한 장비에서 로컬 브로커와 워커 여러 개로 시험 가능):
+    python -m tools.recognition_worker --host localhost --processes 3
+    python -m tools.recognition_worker --profile cpu_int8 --prefetch 2
+"""
+import os
+import time
+import queue
+import socket
+import argparse
+import multiprocessing
+import cv2
+import numpy as np
+import paho.mqtt.client as mqtt
+from paho.mqtt.properties import Properties
+from paho.mqtt.packettypes import PacketTypes
+from core.config import settings
+from services.mqtt_codec import topic_encoding, dumps, decode_payload, pack_bytes, unpack_bytes
+
+# 처리와 응답에 필요한 작업 필드
+REQUIRED_JOB_KEYS = ("id", "reply_to", "crops")
+
+class RecognitionWorker:
+    """MQTT 작업을 받아 인식 결과를 돌려주는 워커 (프로세스당 하나)"""
+
+    def __init__(self, args):
+        from services.face_detection_service import FaceDetectionService
+
+        self.args = args
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        self.service = FaceDetectionService(args.profile)
+        self.encoding = topic_encoding(settings.REMOTE_RECOGNITION_RESULT_TOPIC)
+        self.messages: "queue.Queue[mqtt.MQTTMessage]" = queue.Queue()
+        self.stats = {"jobs": 0, "crops": 0, "expired": 0, "errors": 0, "busy_ms": 0.0}
+
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"recognizer-{self.worker_id}",
+                                  protocol=mqtt.MQTTv5, manual_ack=True)
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+
+    def on_connect(self, client, userdata, flags, reason_code, properties):
+        topic = f"$share/{self.args.group}/{settings.REMOTE_RECOGNITION_JOB_TOPIC}"
+        client.subscribe(topic, qos=1)
+        print(f"[{self.worker_id}] 연결됨 ({reason_code}), 구독: {topic}")
+
+    def on_message(self, client, userdata, msg):
+        # 네트워크 스레드를 막지 않도록 처리 스레드(메인)로 넘김
+        self.messages.put(msg)
+
+    def process(self, job: dict) -> dict:
+        started = time.perf_counter()
+        crops = [cv2.imdecode(np.frombuffer(unpack_bytes(c), np.uint8), cv2.IMREAD_COLOR) for c in job["crops"]]
+        embeddings = self.service.embed_crops(crops)
+        threshold = job.get("threshold", settings.SIMILARITY_THRESHOLD)
+        matches = self.service.load_known_faces().match_many(np.stack(embeddings), threshold) if embeddings else []
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats["busy_ms"] += elapsed_ms
+        return {
+            "v": job.get("v", 1),
+            "id": job["id"],
+            "worker": self.worker_id,
+            "profile": self.service.model_profile,
+            "matches": [[name, float(conf)] for name, conf in matches],
+            "embeddings": [pack_bytes(self.encoding, emb.astype(np.float16).tobytes()) for emb in embeddings],
+            "elapsed_ms": round(elapsed_ms, 2)
+        }
+
+    def handle(self, msg: mqtt.MQTTMessage):
+        try:
+            job = decode_payload(msg.payload)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[{self.worker_id}] 작업 디코딩 실패: {e}")
+            return
+        if not isinstance(job, dict) or any(key not in job for key in REQUIRED_JOB_KEYS) \
+                or not isinstance(job["crops"], list):
+            # 응답할 곳이 없거나 형식이 맞지 않는 작업은 버림 (캡처 노드는 시간 초과 후 폴백)
+            self.stats["errors"] += 1
+            print(f"[{self.worker_id}] 잘못된 작업 무시: 필수 필드 {REQUIRED_JOB_KEYS} 누락")
+            return
+        if job.get("deadline_ms") and time.time() * 1000 > job["deadline_ms"]:
+            self.stats["expired"] += 1
+            return
+
+        try:
+            result = self.process(job)
+            self.stats["jobs"] += 1
+            self.stats["crops"] += len(job["crops"])
+        except Exception as e:
+            # 오류도 바로 알려 캡처 노드가 시간 초과를 기다리지 않고 폴백하게 함
+            self.stats["errors"] += 1
+            result = {"v": job.get("v", 1), "id": job.get("id"), "worker": self.worker_id, "error": str(e)}
+        self.client.publish(job["reply_to"], dumps(self.encoding, result), qos=settings.REMOTE_RECOGNITION_QOS)
+
+    def run(self):
+        if self.args.warmup:
+            self.service.embed_crops([np.zeros((112, 112, 3), dtype=np.uint8)])
+        self.service.load_known_faces()
+
+        properties = Properties(PacketTypes.CONNECT)
+        properties.ReceiveMaximum = max(1, self.args.prefetch)
+        self.client.connect(self.args.host, self.args.port, clean_start=True, properties=properties)
+        self.client.loop_start()
+
+        last_report = time.time()
+        try:
+            while True:
+                try:
+                    msg = self.messages.get(timeout=1.0)
+                except queue.Empty:
+                    msg = None
+                if msg is not None:
+                    try:
+                        self.handle(msg)
+                    except Exception as e:
+                        # 작업 하나의 오류로 워커 프로세스가 종료되지 않도록 함
+                        self.stats["errors"] += 1
+                        print(f"[{self.worker_id}] 작업 처리 오류: {e}")
+                    finally:
+                        # 처리 후 확인 응답해야 수신 최대치만큼만 작업을 받음
+                        self.client.ack(msg.mid, msg.qos)
+
+                if self.args.report_sec and time.time() - last_report >= self.args.report_sec:
+                    last_report = time.time()
+                    avg = self.stats["busy_ms"] / self.stats["jobs"] if self.stats["jobs"] else 0.0
+                    print(f"[{self.worker_id}] 작업 {self.stats['jobs']} (크롭 {self.stats['crops']}), "
+                          f"만료 {self.stats['expired']}, 오류 {self.stats['errors']}, 평균 {avg:.1f} ms")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.client.loop_stop()
+            self.client.disconnect()
+
+def run_worker(args):
+    RecognitionWorker(args).run()
+
+def main():
+    parser = argparse.ArgumentParser(description="MQTT 분산 인식 워커")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--group", default=settings.REMOTE_RECOGNITION_GROUP, help="공유 구독 그룹")
+    parser.add_argument("--profile", default=None, help="모델 프로필 (기본: 활성 갤러리를 만든 프로필)")
+    parser.add_argument("--processes", type=int, default=1, help="이 장비에서 실행할 워커 프로세스 수")
+    parser.add_argument("--prefetch", type=int, default=1, help="워커당 동시에 받아 둘 작업 수 (MQTT v5 수신 최대치)")
+    parser.add_argument("--report-sec", type=float, default=10.0, help="통계 출력 주기(초, 0이면 출력 안 함)")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false", help="시작 시 모델 예열 생략")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker(args)
+        return
+
+    # 워커마다 모델 세션과 MQTT 연결을 따로 가지도록 spawn으로 프로세스 생성
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=run_worker, args=(args,), daemon=True) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join(timeout=5)
+
+if __name__ == "__main__":
+    main()